@@ -0,0 +1,110 @@
+"""
+Per-route admission control for the AstroLearn backend.
+
+Each route has a bounded number of requests in flight. A request that finds
+its route full may wait up to the route's queue-time budget for a slot; after
+that it is rejected so the caller can answer 503 straight away instead of
+parking another worker behind a slow upstream. Requests that can be answered
+entirely from cache are expected to skip admission (see app.admission_controlled).
+
+Limits and budgets are dicts keyed by route rule; the 'default' entry applies
+to every route not listed.
+"""
+
+import math
+import threading
+import time
+
+# Weight of the newest sample in the per-route hold-time average
+EWMA_ALPHA = 0.2
+
+
+class _RouteState:
+    __slots__ = ('limit', 'budget', 'in_flight', 'waiting', 'avg_hold')
+
+    def __init__(self, limit, budget):
+        self.limit = limit
+        self.budget = budget
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_hold = 1.0  # seconds, until the first request completes
+
+
+class AdmissionController:
+    """
+    Bounded in-flight counter per route with an optional wait budget.
+
+    Optional metrics (labelled by `route`): an in-flight gauge and a
+    histogram of time spent waiting for admission.
+    """
+
+    def __init__(self, limits, budgets=None, in_flight_gauge=None, wait_histogram=None):
+        self.limits = dict(limits)
+        self.budgets = dict(budgets or {})
+        self._routes = {}
+        self._cond = threading.Condition()
+        self._in_flight_gauge = in_flight_gauge
+        self._wait_histogram = wait_histogram
+
+    def _state(self, route):
+        state = self._routes.get(route)
+        if state is None:
+            state = self._routes[route] = _RouteState(
+                int(self.limits.get(route, self.limits.get('default', 32))),
+                float(self.budgets.get(route, self.budgets.get('default', 0.0))),
+            )
+        return state
+
+    def enter(self, route):
+        """Take a slot for `route`; False if none freed up within its budget"""
+        start = time.monotonic()
+        with self._cond:
+            state = self._state(route)
+            if state.in_flight >= state.limit:
+                if not state.budget:
+                    return False
+                deadline = start + state.budget
+                state.waiting += 1
+                try:
+                    while state.in_flight >= state.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        self._cond.wait(remaining)
+                finally:
+                    state.waiting -= 1
+            state.in_flight += 1
+            if self._in_flight_gauge is not None:
+                self._in_flight_gauge.set(state.in_flight, route=route)
+        if self._wait_histogram is not None:
+            self._wait_histogram.observe(time.monotonic() - start, route=route)
+        return True
+
+    def leave(self, route, held):
+        """Release a slot taken by enter(); `held` is how long it was held (seconds)"""
+        with self._cond:
+            state = self._routes[route]
+            state.in_flight -= 1
+            state.avg_hold += EWMA_ALPHA * (held - state.avg_hold)
+            if self._in_flight_gauge is not None:
+                self._in_flight_gauge.set(state.in_flight, route=route)
+            self._cond.notify_all()
+
+    def retry_after(self, route):
+        """Whole seconds a rejected caller should wait: the route's typical hold time"""
+        with self._cond:
+            state = self._state(route)
+            return max(1, int(math.ceil(state.avg_hold * (state.waiting + 1))))
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                route: {
+                    'limit': state.limit,
+                    'in_flight': state.in_flight,
+                    'waiting': state.waiting,
+                    'budget_seconds': state.budget,
+                    'avg_hold_seconds': round(state.avg_hold, 3),
+                }
+                for route, state in self._routes.items()
+            }
@@ -2,27 +2,72 @@
 Flask Backend for AstroLearn - Vedic Astrology SVG Chart Generator
 Integrates with Free Astrology API for professional chart generation
 Returns SVG in JSON format for Flutter flutter_svg package
+
+Routes live on the `api` blueprint; create_app() builds the Flask app.
+Development:  python app.py
+Production:   gunicorn -c gunicorn.conf.py wsgi:app   (pre-fork, preloaded)
 """
 
-from flask import Flask, jsonify, request, Response
+from flask import Blueprint, Flask, jsonify, request, Response, g, has_request_context
 from flask_cors import CORS
 import requests
 import os
 import re
 import time
-from datetime import datetime, timedelta
 import hashlib
+import hmac
 import json
+import zlib
+import gzip
+import logging
+import threading
+import functools
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import RequestTimer, SlowRequestProfiler
+from log_config import configure_logging, get_logger
+from ephemeris import AYANAMSHA_ALIASES, AYANAMSHA_J2000, compute_planets
+from transits import TransitService, natal_overlay, parse_utc
+from dasha import MAX_DEPTH as DASHA_MAX_DEPTH, VimshottariTimeline
+from ashtakavarga import ashtakavarga, contributions as ashtakavarga_tables, yogas
+from placement_index import PlacementIndex
+from upstream_queue import PRIORITIES as UPSTREAM_PRIORITIES, UpstreamDispatcher, UpstreamQueueTimeout, parse_class_setting
+from admission import AdmissionController
+from peer_cache import PeerCache, SingleFlight
+from cache_snapshot import KIND_CHART, KIND_PLANET, SnapshotError, iter_chunks, open_source, read_snapshot
+from compact_encoding import CompactCodec, content_type as compact_content_type, negotiate as negotiate_compact
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for Flutter web/mobile
+# Leveled logging through a background queue (see log_config.py); the
+# handler and its listener thread are installed by create_app()
+logger = get_logger()
+
+api = Blueprint('api', __name__)
 
 # Free Astrology API Configuration
-BASE_URL = "https://json.freeastrologyapi.com"
+# ASTRO_API_BASE_URL can point at a local stand-in (see mock_upstream.py)
+BASE_URL = os.environ.get("ASTRO_API_BASE_URL", "https://json.freeastrologyapi.com")
+UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", 30))
+# Seconds a call may wait for an upstream dispatch slot, per priority class
+# (0 = as long as it takes); see UPSTREAM_QUEUE
+UPSTREAM_CLASS_MAX_WAIT = parse_class_setting(
+    os.environ.get("UPSTREAM_CLASS_MAX_WAIT", "interactive=30,prefetch=0,bulk=0"))
+
+# Where /planets data comes from (see ephemeris.py):
+#   upstream - Free Astrology API only (default)
+#   local    - in-process ephemeris only, no upstream call
+#   fallback - upstream first, local ephemeris when every key fails
+EPHEMERIS_MODE = os.environ.get("EPHEMERIS_MODE", "upstream")
+EPHEMERIS_NODE_TYPE = os.environ.get("EPHEMERIS_NODE_TYPE", "mean")  # mean | true
+
+# Shared transit snapshots (see transits.py): one /planets call per grid point
+TRANSIT_GRID_HOURS = float(os.environ.get("TRANSIT_GRID_HOURS", 1))
+TRANSIT_MAX_SNAPSHOTS = int(os.environ.get("TRANSIT_MAX_SNAPSHOTS", 24 * 31))
 
 # API Keys loaded from .env (rotate if one fails)
 API_KEYS = [
@@ -34,14 +79,300 @@ API_KEYS = [
 API_KEYS = [k for k in API_KEYS if k]
 
 # In-memory cache for charts and planetary data
-# Format: { cache_key: {'svg': str, 'timestamp': datetime, 'chart_name': str} }
+# Format: { cache_key: ChartCacheEntry } and { cache_key: PlanetCacheEntry }
 CHART_CACHE = {}
 PLANET_CACHE = {}  # Cache for planetary data
 CACHE_EXPIRY_HOURS = 128  # Cache charts for 128 hours
+CACHE_EXPIRY_SECONDS = CACHE_EXPIRY_HOURS * 3600
+
+# Ready-to-send /kundali/full bodies, keyed by birth key + division set
+# Format: { response_key: ResponseCacheEntry }
+RESPONSE_CACHE = {}
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+RESPONSE_CACHE_GZIP = os.environ.get("RESPONSE_CACHE_GZIP", "1") != "0"
+
+# MessagePack/CBOR bodies for /kundali/full and /charts/batch when the Accept
+# header asks for them (see compact_encoding.py)
+COMPACT_RESPONSES_ENABLED = os.environ.get("COMPACT_RESPONSES_ENABLED", "1") != "0"
+
+# Vimshottari timelines by birth key; they never go stale, so only size-bounded
+DASHA_CACHE = {}
+DASHA_CACHE_MAX_ENTRIES = int(os.environ.get("DASHA_CACHE_MAX_ENTRIES", 50000))
+
+# Inverted index over extracted placements of cached charts (see placement_index.py)
+PLACEMENT_INDEX_ENABLED = os.environ.get("PLACEMENT_INDEX_ENABLED", "1") != "0"
+PLACEMENT_INDEX = PlacementIndex()
+
+# Admin endpoints (/admin/...) are disabled unless ADMIN_TOKEN is set;
+# callers send it as X-Admin-Token
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Warm CHART_CACHE/PLANET_CACHE at startup from a snapshot file or a peer's
+# base URL (see cache_snapshot.py), optionally only entries newer than N hours
+CACHE_WARM_FROM = os.environ.get("CACHE_WARM_FROM", "")
+CACHE_WARM_MAX_AGE_HOURS = float(os.environ.get("CACHE_WARM_MAX_AGE_HOURS", 0))
+
+# POST /admin/cache/snapshot?source=<path> only reads files inside this
+# directory (file sources are refused when unset). ADMIN_TOKEN is only sent
+# to PEER_NODES and the CACHE_WARM_FROM host.
+CACHE_SNAPSHOT_DIR = os.environ.get("CACHE_SNAPSHOT_DIR", "")
+
+# Optional peer cache (see peer_cache.py): PEER_NODES lists every node's base
+# URL, PEER_SELF is this node's own entry. Unset = every node goes upstream.
+PEER_NODES = [u.strip() for u in os.environ.get("PEER_NODES", "").split(",") if u.strip()]
+PEER_SELF = os.environ.get("PEER_SELF", "")
+PEER_TOKEN = os.environ.get("PEER_TOKEN", "")
+# The owner's fill tries each API key in turn, and every attempt queues for
+# an interactive slot first, so the default covers that worst case
+PEER_TIMEOUT = float(os.environ.get(
+    "PEER_TIMEOUT",
+    max(1, len(API_KEYS)) * (UPSTREAM_CLASS_MAX_WAIT.get('interactive', 0.0) + UPSTREAM_TIMEOUT) + 5,
+))
+PEER_RETRY_SECONDS = float(os.environ.get("PEER_RETRY_SECONDS", 30))
 
 # API Base URL
 API_BASE_URL = BASE_URL
 
+# Opt-in per-request timing: send `X-Debug-Timing: 1` or `?debug_timing=1`
+DEBUG_TIMING_ENABLED = os.environ.get("DEBUG_TIMING_ENABLED", "0") == "1"
+
+# cProfile a sample of requests, keeping dumps of the N slowest (0 = off)
+SLOW_REQUEST_PROFILER = SlowRequestProfiler(
+    keep_slowest=int(os.environ.get("PROFILE_SLOWEST_N", 0)),
+    sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0.1)),
+    output_dir=os.environ.get("PROFILE_DIR", "profiles"),
+)
+
+# Metrics (exposed in Prometheus text format on /metrics)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'astrolearn_upstream_request_seconds',
+    'Latency of Free Astrology API calls by endpoint and API key',
+    ('endpoint', 'key'),
+)
+UPSTREAM_RATE_LIMITED = REGISTRY.counter(
+    'astrolearn_upstream_rate_limited_total',
+    'Upstream 429 responses by endpoint and API key',
+    ('endpoint', 'key'),
+)
+UPSTREAM_TIMEOUTS = REGISTRY.counter(
+    'astrolearn_upstream_timeouts_total',
+    'Upstream request timeouts by endpoint and API key',
+    ('endpoint', 'key'),
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    'astrolearn_upstream_errors_total',
+    'Upstream failures other than 429/timeout by endpoint and API key',
+    ('endpoint', 'key'),
+)
+CACHE_HITS = REGISTRY.counter('astrolearn_cache_hits_total', 'Cache hits', ('cache',))
+CACHE_MISSES = REGISTRY.counter('astrolearn_cache_misses_total', 'Cache misses', ('cache',))
+CACHE_EVICTIONS = REGISTRY.counter(
+    'astrolearn_cache_evictions_total',
+    'Entries dropped from a cache (expired or over capacity)',
+    ('cache',),
+)
+CACHE_ENTRIES = REGISTRY.gauge('astrolearn_cache_entries', 'Entries currently held', ('cache',))
+REQUEST_LATENCY = REGISTRY.histogram(
+    'astrolearn_http_request_seconds',
+    'Request latency by route',
+    ('route', 'method', 'status'),
+)
+SVG_EXTRACTION_LATENCY = REGISTRY.histogram(
+    'astrolearn_svg_extraction_seconds',
+    'Time spent in extract_positions_from_svg',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+RESPONSE_FORMATS = REGISTRY.counter(
+    'astrolearn_response_format_total',
+    'Responses of negotiable routes by encoding',
+    ('route', 'format'),
+)
+UPSTREAM_QUEUE_DEPTH = REGISTRY.gauge(
+    'astrolearn_upstream_queue_depth',
+    'Upstream calls waiting for a dispatch slot by priority class',
+    ('priority',),
+)
+UPSTREAM_QUEUE_WAIT = REGISTRY.histogram(
+    'astrolearn_upstream_queue_wait_seconds',
+    'Time upstream calls spent queued before dispatch by priority class',
+    ('priority',),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+UPSTREAM_QUEUE_TIMEOUTS = REGISTRY.counter(
+    'astrolearn_upstream_queue_timeouts_total',
+    'Upstream calls that gave up waiting for a dispatch slot by priority class',
+    ('priority',),
+)
+
+# Priority dispatch of upstream calls (see upstream_queue.py). Classes are
+# interactive > prefetch > bulk; per-class settings are "class=value" lists.
+# UPSTREAM_CALLS_PER_MINUTE = 0 leaves the per-minute quota unmetered, and a
+# class max wait of 0 waits for as long as it takes.
+UPSTREAM_QUEUE = UpstreamDispatcher(
+    total_concurrency=int(os.environ.get("UPSTREAM_CONCURRENCY", 16)),
+    concurrency=parse_class_setting(
+        os.environ.get("UPSTREAM_CLASS_CONCURRENCY", "interactive=16,prefetch=4,bulk=4"), int),
+    shares=parse_class_setting(
+        os.environ.get("UPSTREAM_CLASS_SHARE", "interactive=0.6,prefetch=0.25,bulk=0.15")),
+    max_wait=UPSTREAM_CLASS_MAX_WAIT,
+    calls_per_minute=float(os.environ.get("UPSTREAM_CALLS_PER_MINUTE", 0)),
+    depth_gauge=UPSTREAM_QUEUE_DEPTH,
+    wait_histogram=UPSTREAM_QUEUE_WAIT,
+    timeout_counter=UPSTREAM_QUEUE_TIMEOUTS,
+)
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    'astrolearn_admission_in_flight',
+    'Admitted requests currently running by route',
+    ('route',),
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    'astrolearn_admission_wait_seconds',
+    'Time admitted requests waited for an in-flight slot by route',
+    ('route',),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    'astrolearn_admission_rejected_total',
+    'Requests shed with 503 because their route was at its in-flight limit',
+    ('route',),
+)
+ADMISSION_BYPASSED = REGISTRY.counter(
+    'astrolearn_admission_bypassed_total',
+    'Requests served from cache without taking an in-flight slot',
+    ('route',),
+)
+
+PEER_REQUESTS = REGISTRY.counter(
+    'astrolearn_peer_requests_total',
+    'Owner lookups sent to peer nodes by outcome (ok, error, timeout, down = skipped)',
+    ('outcome',),
+)
+PEER_LATENCY = REGISTRY.histogram(
+    'astrolearn_peer_request_seconds',
+    'Latency of owner lookups on peer nodes',
+)
+PEER_FILLS_SERVED = REGISTRY.counter(
+    'astrolearn_peer_fills_served_total',
+    'Fill requests answered for other nodes by kind',
+    ('kind',),
+)
+FILLS_COALESCED = REGISTRY.counter(
+    'astrolearn_fills_coalesced_total',
+    'Cache fills that waited on an identical in-progress fill instead of calling upstream',
+    ('cache',),
+)
+
+
+def record_peer_request(outcome, seconds):
+    PEER_REQUESTS.inc(outcome=outcome)
+    if outcome != 'down':
+        PEER_LATENCY.observe(seconds)
+
+
+PEER_CACHE = PeerCache(
+    PEER_SELF, PEER_NODES, timeout=PEER_TIMEOUT, retry_after=PEER_RETRY_SECONDS,
+    token=PEER_TOKEN, on_request=record_peer_request,
+) if PEER_NODES and PEER_SELF else None
+
+# One upstream fill per cache key at a time; concurrent misses share it
+CHART_FILLS = SingleFlight(on_coalesced=lambda: FILLS_COALESCED.inc(cache='chart'))
+PLANET_FILLS = SingleFlight(on_coalesced=lambda: FILLS_COALESCED.inc(cache='planet'))
+
+# Admission control for routes that may call upstream. Limits (requests in
+# flight) and queue-time budgets (seconds to wait for a slot before a 503) are
+# "route=value" lists; the `default` entry covers unlisted routes.
+ADMISSION_CONTROL_ENABLED = os.environ.get("ADMISSION_CONTROL_ENABLED", "1") != "0"
+ADMISSION = AdmissionController(
+    limits=parse_class_setting(os.environ.get("ADMISSION_LIMITS", "default=32,/kundali/full=16"), int),
+    budgets=parse_class_setting(os.environ.get("ADMISSION_QUEUE_BUDGETS", "default=0.05")),
+    in_flight_gauge=ADMISSION_IN_FLIGHT,
+    wait_histogram=ADMISSION_WAIT,
+)
+
+
+class ChartCacheEntry:
+    """
+    Compact CHART_CACHE record.
+
+    The SVG is held zlib-compressed, the timestamp as integer epoch seconds,
+    and the chart name is derived from the division key rather than stored.
+    `positions` is filled lazily with a PackedPositions on first extraction.
+    """
+    __slots__ = ('svg_z', 'timestamp', 'chart_type', 'positions')
+
+    def __init__(self, svg, chart_type, timestamp=None):
+        self.svg_z = zlib.compress(svg.encode('utf-8'))
+        self.timestamp = int(time.time()) if timestamp is None else int(timestamp)
+        self.chart_type = chart_type
+        self.positions = None
+
+    @classmethod
+    def from_compressed(cls, svg_z, chart_type, timestamp):
+        """Rebuild an entry from its stored fields (cache snapshots)"""
+        entry = cls.__new__(cls)
+        entry.svg_z = svg_z
+        entry.timestamp = int(timestamp)
+        entry.chart_type = chart_type
+        entry.positions = None
+        return entry
+
+    @property
+    def svg(self):
+        return zlib.decompress(self.svg_z).decode('utf-8')
+
+    @property
+    def chart_name(self):
+        return CHART_NAMES.get(self.chart_type, f'Chart {self.chart_type.upper()}')
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) - self.timestamp < CACHE_EXPIRY_SECONDS
+
+
+class PlanetCacheEntry:
+    """Compact PLANET_CACHE record: compressed JSON output + epoch seconds"""
+    __slots__ = ('data_z', 'timestamp')
+
+    def __init__(self, data, timestamp=None):
+        self.data_z = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        self.timestamp = int(time.time()) if timestamp is None else int(timestamp)
+
+    @classmethod
+    def from_compressed(cls, data_z, timestamp):
+        entry = cls.__new__(cls)
+        entry.data_z = data_z
+        entry.timestamp = int(timestamp)
+        return entry
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(self.data_z))
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) - self.timestamp < CACHE_EXPIRY_SECONDS
+
+
+class ResponseCacheEntry:
+    """Serialized body of a complete response, plus its gzip form once requested"""
+    __slots__ = ('body', 'body_gz', 'content_type', 'timestamp')
+
+    def __init__(self, body, content_type='application/json'):
+        self.body = body
+        self.body_gz = None
+        self.content_type = content_type
+        self.timestamp = int(time.time())
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) - self.timestamp < CACHE_EXPIRY_SECONDS
+
+
+def timed_phase(name, division=None):
+    """Time a phase of the current request when debug timing is active"""
+    timer = g.get('request_timer') if has_request_context() else None
+    if timer is None:
+        return nullcontext()
+    return timer.phase(name, division)
+
 
 def generate_chart_id(payload):
     """
@@ -59,23 +390,119 @@ def get_cache_key(chart_type, data):
     return f"{chart_type}_{data['year']}_{data['month']}_{data['date']}_{data['hours']}_{data['minutes']}_{data['latitude']}_{data['longitude']}"
 
 
+def get_planet_cache_key(data):
+    """PLANET_CACHE key: the positions also depend on the ayanamsha and observation point"""
+    return (f"{get_cache_key('planets', data)}_{data.get('ayanamsha', 'lahiri')}"
+            f"_{data.get('observation_point', 'topocentric')}")
+
+
+def parse_ayanamsha(value):
+    """Requested ayanamsha -> lower-case name; raises ValueError for unsupported ones"""
+    name = value.lower() if isinstance(value, str) else None
+    if name not in AYANAMSHA_J2000 and name not in AYANAMSHA_ALIASES:
+        raise ValueError(f'Unknown ayanamsha: {value}')
+    return name
+
+
+def split_cache_key(cache_key):
+    """get_cache_key() result -> (birth key, chart type)"""
+    chart_type, birth_key = cache_key.split('_', 1)
+    return birth_key, chart_type
+
+
 def get_cached_chart(cache_key):
     """Get chart from cache if valid"""
-    if cache_key in CHART_CACHE:
-        cached = CHART_CACHE[cache_key]
-        if datetime.now() - cached['timestamp'] < timedelta(hours=CACHE_EXPIRY_HOURS):
-            print(f"[CACHE] Hit for {cache_key[:8]}...")
+    cached = CHART_CACHE.get(cache_key)
+    if cached is not None:
+        if cached.is_fresh():
+            CACHE_HITS.inc(cache='chart')
+            logger.debug("cache hit %s", cache_key, extra={'event': 'cache.hit', 'cache': 'chart', 'sample': True})
             return cached
+        # Another thread may have evicted it first: only the one that pops it counts
+        if CHART_CACHE.pop(cache_key, None) is not None:
+            CACHE_EVICTIONS.inc(cache='chart')
+            PLACEMENT_INDEX.remove(*split_cache_key(cache_key))
+    CACHE_MISSES.inc(cache='chart')
     return None
 
-def set_cached_chart(cache_key, svg, chart_name):
+def store_chart_entry(cache_key, entry):
+    """Put an entry in CHART_CACHE; the chart it replaces leaves the placement index"""
+    previous = CHART_CACHE.get(cache_key)
+    CHART_CACHE[cache_key] = entry
+    if previous is not None:
+        PLACEMENT_INDEX.remove(*split_cache_key(cache_key))
+
+
+def set_cached_chart(cache_key, svg, chart_type):
     """Store chart in cache"""
-    CHART_CACHE[cache_key] = {
-        'svg': svg,
-        'timestamp': datetime.now(),
-        'chart_name': chart_name
-    }
-    print(f"[CACHE] Stored {cache_key[:8]}... ({len(svg)} chars)")
+    store_chart_entry(cache_key, ChartCacheEntry(svg, chart_type))
+    logger.debug("cache store %s (%d chars)", cache_key, len(svg), extra={'event': 'cache.store', 'cache': 'chart', 'sample': True})
+
+
+def get_response_cache_key(data, divisions):
+    """
+    Key for RESPONSE_CACHE: canonical birth key + requested division set.
+    The raw chart_id is echoed in the body, so it is part of the key too.
+    """
+    birth_key = generate_chart_id(create_payload(data))
+    return (birth_key, tuple(d.lower() for d in divisions), generate_chart_id(data))
+
+
+def full_kundali_response_key(data, divisions, compact):
+    """RESPONSE_CACHE key of a /kundali/full body; compact bodies are stored per (format, svg mode)"""
+    key = get_response_cache_key(data, divisions)
+    return key + compact if compact is not None else key
+
+
+def set_vary(response):
+    """
+    Same Vary on every negotiated body, cache hit or miss: the format follows
+    Accept, and cached bodies may be served gzipped per Accept-Encoding.
+    """
+    response.headers['Vary'] = 'Accept, Accept-Encoding' if RESPONSE_CACHE_GZIP else 'Accept'
+    return response
+
+
+def get_cached_response(response_key):
+    """Build a response straight from RESPONSE_CACHE if a fresh body is stored"""
+    cached = RESPONSE_CACHE.get(response_key)
+    if cached is not None and not cached.is_fresh():
+        if RESPONSE_CACHE.pop(response_key, None) is not None:
+            CACHE_EVICTIONS.inc(cache='response')
+        cached = None
+    if cached is None:
+        CACHE_MISSES.inc(cache='response')
+        return None
+    CACHE_HITS.inc(cache='response')
+
+    if RESPONSE_CACHE_GZIP and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        if cached.body_gz is None:
+            cached.body_gz = gzip.compress(cached.body, compresslevel=6)
+        response = Response(cached.body_gz, content_type=cached.content_type)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(cached.body, content_type=cached.content_type)
+    return set_vary(response)
+
+
+def evict_oldest(cache, name):
+    """
+    Drop the oldest entry of a size-bounded cache dict. Other request threads
+    may insert or evict at the same time, so losing that race is not an error.
+    """
+    try:
+        if cache.pop(next(iter(cache)), None) is not None:
+            CACHE_EVICTIONS.inc(cache=name)
+    except (StopIteration, RuntimeError):
+        pass
+
+
+def set_cached_response(response_key, body, content_type='application/json'):
+    """Store a serialized body, dropping the oldest entry when full"""
+    if response_key not in RESPONSE_CACHE and len(RESPONSE_CACHE) >= RESPONSE_CACHE_MAX_ENTRIES:
+        evict_oldest(RESPONSE_CACHE, 'response')
+    RESPONSE_CACHE[response_key] = ResponseCacheEntry(body, content_type)
+
 
 # Chart endpoint mapping (API uses South Indian style by default)
 CHART_ENDPOINTS = {
@@ -125,7 +552,161 @@ CHART_NAMES = {
 }
 
 
-@app.route('/')
+# ============== Admission Control ==============
+def admission_controlled(fully_cached):
+    """
+    Route decorator (goes below @api.route). Requests for which
+    fully_cached(**view_args) is true are served without admission; the rest
+    take one of the route's in-flight slots or get a fast 503 + Retry-After.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_CONTROL_ENABLED:
+                return view(*args, **kwargs)
+            route = request.url_rule.rule
+            if fully_cached(*args, **kwargs):
+                ADMISSION_BYPASSED.inc(route=route)
+                return view(*args, **kwargs)
+            if not ADMISSION.enter(route):
+                ADMISSION_REJECTED.inc(route=route)
+                retry_after = ADMISSION.retry_after(route)
+                logger.info("shedding %s, retry after %ds", route, retry_after, extra={'event': 'admission.rejected', 'sample': True})
+                response = jsonify({'success': False, 'error': 'Server busy, please retry', 'retry_after': retry_after})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                ADMISSION.leave(route, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# Cache probes: side-effect free (no metrics, no eviction), False on bad input
+def request_json():
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+
+def chart_cached(division, data):
+    try:
+        entry = CHART_CACHE.get(get_cache_key(division.lower(), data))
+    except (KeyError, TypeError, AttributeError):
+        return False
+    return entry is not None and entry.is_fresh()
+
+
+def planets_cached(data):
+    if EPHEMERIS_MODE == 'local':
+        return True
+    try:
+        entry = PLANET_CACHE.get(get_planet_cache_key(data))
+    except (KeyError, TypeError, AttributeError):
+        return False
+    return entry is not None and entry.is_fresh()
+
+
+def transits_cached(at, ayanamsha):
+    try:
+        return TRANSITS.has(parse_utc(at), parse_ayanamsha(ayanamsha))
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+
+def dasha_cached(data):
+    try:
+        chart_key = generate_chart_id(create_payload(data))
+    except (TypeError, ValueError, AttributeError):
+        return False
+    return chart_key in DASHA_CACHE or planets_cached(data)
+
+
+def full_kundali_cached():
+    data = request_json()
+    divisions = data.get('divisions', list(CHART_ENDPOINTS.keys()))
+    try:
+        cached = RESPONSE_CACHE.get(full_kundali_response_key(data, divisions, response_encoding()))
+    except (TypeError, ValueError, AttributeError):
+        return False
+    if cached is not None and cached.is_fresh():
+        return True
+    return planets_cached(data) and all(
+        chart_cached(d, data) for d in divisions if str(d).lower() in CHART_ENDPOINTS
+    )
+
+
+@api.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if DEBUG_TIMING_ENABLED and (
+        request.headers.get('X-Debug-Timing') == '1' or request.args.get('debug_timing') == '1'
+    ):
+        g.request_timer = RequestTimer()
+    g.profiler = SLOW_REQUEST_PROFILER.start()
+
+
+# Batch clients (bulk_import.py --server) send "X-Upstream-Priority: bulk" so
+# their upstream calls queue behind this node's interactive ones. A request can
+# only lower its own class, never raise it.
+UPSTREAM_PRIORITY_HEADER = 'X-Upstream-Priority'
+
+
+@api.before_app_request
+def apply_upstream_priority():
+    name = request.headers.get(UPSTREAM_PRIORITY_HEADER, '').strip().lower()
+    if name in UPSTREAM_PRIORITIES and name != 'interactive':
+        g.upstream_priority = UPSTREAM_QUEUE.priority(name)
+        g.upstream_priority.__enter__()
+
+
+@api.after_app_request
+def record_request_latency(response):
+    start = g.get('request_start')
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(
+            elapsed, route=route, method=request.method, status=response.status_code,
+        )
+
+    timer = g.get('request_timer')
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.server_timing_header()
+    return response
+
+
+@api.teardown_app_request
+def reset_upstream_priority(exc):
+    """Worker threads are reused, so the class must not outlive the request"""
+    priority = g.pop('upstream_priority', None)
+    if priority is not None:
+        priority.__exit__(None, None, None)
+
+
+@api.teardown_app_request
+def finish_request_profile(exc):
+    """Runs even when the view raised, so a sampled profiler never stays attached to the thread"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        SLOW_REQUEST_PROFILER.finish(profiler, time.perf_counter() - g.get('request_start', time.perf_counter()), route)
+
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint: upstream, cache and route metrics"""
+    CACHE_ENTRIES.set(len(CHART_CACHE), cache='chart')
+    CACHE_ENTRIES.set(len(PLANET_CACHE), cache='planet')
+    CACHE_ENTRIES.set(len(RESPONSE_CACHE), cache='response')
+    CACHE_ENTRIES.set(len(TRANSITS), cache='transit')
+    CACHE_ENTRIES.set(len(DASHA_CACHE), cache='dasha')
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@api.route('/')
 def home():
     """Health check endpoint"""
     return jsonify({
@@ -138,6 +719,15 @@ def home():
             'GET /kundali': 'Get D1 Rasi chart with query parameters',
             'POST /chart/<division>': 'Get any divisional chart (d1, d2, d3, d9, etc.)',
             'POST /charts/batch': 'Get multiple charts at once',
+            'GET /transits': 'Current planetary transits (shared hourly snapshots)',
+            'POST /transits/natal': 'Transits overlaid on a natal D1 chart',
+            'POST /dasha': 'Vimshottari dasha periods to a given depth (streamable)',
+            'POST /dasha/at': 'Running dasha periods at a date',
+            'POST /search/placements': 'Find cached charts by placement (division, body, sign/house)',
+            'POST /peer/fill': 'Owner-side cache fill for peer nodes (PEER_NODES)',
+            'GET /admin/cache/snapshot': 'Stream a chart/planet cache snapshot (X-Admin-Token)',
+            'POST /admin/cache/snapshot': 'Load a cache snapshot from the body or ?source= (X-Admin-Token)',
+            'GET /metrics': 'Prometheus metrics (upstream latency, cache stats)',
         }
     })
 
@@ -161,17 +751,83 @@ def create_payload(data):
     }
 
 
-def fetch_chart_svg(endpoint, data, chart_type=None):
-    """Fetch SVG chart from Free Astrology API with caching and key rotation"""
+_upstream_session = None
+_upstream_session_lock = threading.Lock()
+
+
+def upstream_session():
+    """
+    Pooled HTTP session for upstream calls, built on first use. Never created
+    before a fork: a pre-fork worker must not share the master's sockets.
+    """
+    global _upstream_session
+    if _upstream_session is None:
+        with _upstream_session_lock:
+            if _upstream_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=UPSTREAM_QUEUE.total_concurrency)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _upstream_session = session
+    return _upstream_session
+
+
+def _drop_upstream_session():
+    global _upstream_session
+    _upstream_session = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_drop_upstream_session)
+
+
+def valid_peer_result(result, field, expected_type):
+    """
+    Whether a successful owner answer carries `field` as `expected_type` and a
+    numeric (or no) timestamp. Anything else (e.g. from a peer on another
+    version) is not cached; the caller fills locally instead.
+    """
+    timestamp = result.get('timestamp')
+    if isinstance(result.get(field), expected_type) and (timestamp is None or isinstance(timestamp, (int, float))):
+        return True
+    logger.warning("malformed peer answer (%s), filling locally", field, extra={'event': 'peer.malformed'})
+    return False
+
+
+def fetch_chart_svg(endpoint, data, chart_type=None, ask_peers=True):
+    """
+    Fetch SVG chart from Free Astrology API with caching and key rotation.
+    On a miss the key's owner node is asked first when the peer cache is on
+    (ask_peers=False when serving a peer's /peer/fill).
+    """
     
     # Check cache first
     cache_key = None
     if chart_type:
         cache_key = get_cache_key(chart_type, data)
-        cached = get_cached_chart(cache_key)
+        with timed_phase('cache_lookup', chart_type):
+            cached = get_cached_chart(cache_key)
         if cached:
-            return {'success': True, 'svg': cached['svg'], 'chart_name': cached['chart_name'], 'cached': True}
+            return {'success': True, 'svg': cached.svg, 'chart_name': cached.chart_name, 'cached': True}
     
+    if cache_key is None:
+        return upstream_chart_svg(endpoint, data, chart_type, cache_key)
+    
+    if ask_peers and PEER_CACHE is not None:
+        with timed_phase('peer', chart_type):
+            result = PEER_CACHE.ask_owner(cache_key, {'kind': 'chart', 'chart_type': chart_type, 'data': data})
+        if result is not None:
+            if not result.get('success'):
+                return result
+            if valid_peer_result(result, 'svg', str):
+                store_chart_entry(cache_key, ChartCacheEntry(result['svg'], chart_type, result.get('timestamp')))
+                return {'success': True, 'svg': result['svg']}
+    
+    return CHART_FILLS.do(cache_key, lambda: upstream_chart_svg(endpoint, data, chart_type, cache_key))
+
+
+def upstream_chart_svg(endpoint, data, chart_type, cache_key):
+    """Call the chart endpoint, rotating API keys; stores the SVG under cache_key"""
     payload = create_payload(data)
     url = f"{API_BASE_URL}/{endpoint}"
     
@@ -185,14 +841,21 @@ def fetch_chart_svg(endpoint, data, chart_type=None):
                 'x-api-key': api_key
             }
             
-            print(f"[API] Calling: {url} (Key #{i+1})")
-            # Only print payload on first attempt to reduce log noise
-            if i == 0:
-                print(f"[API] Payload: {json.dumps(payload, indent=2)}")
+            logger.info("upstream call %s key #%d", url, i + 1, extra={'event': 'upstream.call', 'sample': True})
+            # Only dump the payload on first attempt, and only at debug level
+            if i == 0 and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("upstream payload %s", json.dumps(payload, indent=2), extra={'event': 'upstream.payload'})
             
-            response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
+            # Every attempt queues separately, so a retry yields to higher classes
+            with UPSTREAM_QUEUE.slot():
+                start = time.perf_counter()
+                try:
+                    with timed_phase('upstream' if i == 0 else 'upstream_retry', chart_type):
+                        response = upstream_session().post(url, headers=headers, data=json.dumps(payload), timeout=UPSTREAM_TIMEOUT)
+                finally:
+                    UPSTREAM_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, key=f'key{i+1}')
             
-            print(f"[API] Status: {response.status_code}")
+            logger.debug("upstream status %d", response.status_code, extra={'event': 'upstream.status', 'sample': True})
             
             if response.status_code == 200:
                 # Success!
@@ -200,12 +863,11 @@ def fetch_chart_svg(endpoint, data, chart_type=None):
                     api_response = response.json()
                     if 'output' in api_response:
                         svg_content = api_response['output']
-                        print(f"[API] SVG extracted: {len(svg_content)} chars")
+                        logger.debug("upstream svg %d chars", len(svg_content), extra={'event': 'upstream.svg', 'sample': True})
                         
                         # Cache the result
                         if chart_type and cache_key:
-                            chart_name = CHART_NAMES.get(chart_type, f'Chart {chart_type.upper()}')
-                            set_cached_chart(cache_key, svg_content, chart_name)
+                            set_cached_chart(cache_key, svg_content, chart_type)
                         
                         return {'success': True, 'svg': svg_content}
                     else:
@@ -215,19 +877,28 @@ def fetch_chart_svg(endpoint, data, chart_type=None):
                     return {'success': True, 'svg': response.text}
             
             elif response.status_code == 429:
-                print(f"⚠️ [API] Rate limit exceeded for key #{i+1}. Trying next key...")
+                UPSTREAM_RATE_LIMITED.inc(endpoint=endpoint, key=f'key{i+1}')
+                logger.warning("rate limit exceeded for key #%d, trying next key", i + 1, extra={'event': 'upstream.rate_limited', 'endpoint': endpoint})
                 last_error = f"API error: {response.status_code} (Rate Limit)"
                 continue # Try next key
             else:
                 # Other error, probably bad request, don't retry same bad data
+                UPSTREAM_ERRORS.inc(endpoint=endpoint, key=f'key{i+1}')
                 return {'success': False, 'error': f"API error: {response.status_code}", 'details': response.text}
                 
+        except UpstreamQueueTimeout as e:
+            # The next key would queue behind the same backlog
+            logger.warning("%s", e, extra={'event': 'upstream.queue_timeout', 'endpoint': endpoint})
+            last_error = str(e)
+            break
         except requests.Timeout:
-            print(f"⚠️ [API] Timeout for key #{i+1}")
+            UPSTREAM_TIMEOUTS.inc(endpoint=endpoint, key=f'key{i+1}')
+            logger.warning("timeout for key #%d", i + 1, extra={'event': 'upstream.timeout', 'endpoint': endpoint})
             last_error = 'API request timed out'
             continue
         except Exception as e:
-            print(f"⚠️ [API] Error for key #{i+1}: {str(e)}")
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, key=f'key{i+1}')
+            logger.warning("error for key #%d: %s", i + 1, e, extra={'event': 'upstream.error', 'endpoint': endpoint})
             last_error = str(e)
             continue
             
@@ -235,17 +906,51 @@ def fetch_chart_svg(endpoint, data, chart_type=None):
     return {'success': False, 'error': last_error or 'All API keys failed'}
 
 
-def fetch_planetary_data(data):
-    """Fetch planetary data (D1) from API with caching and rotation"""
+def compute_local_planets(payload):
+    """Planetary data from the in-process ephemeris, same shape as upstream output"""
+    try:
+        with timed_phase('ephemeris', 'planets'):
+            output = compute_planets(payload, node_type=EPHEMERIS_NODE_TYPE)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    return {'success': True, 'output': output, 'source': 'local'}
+
+
+def fetch_planetary_data(data, ask_peers=True):
+    """Fetch planetary data (D1) from API with caching, peer owner lookup and rotation"""
+    
+    # Local ephemeris is cheaper than a cache lookup + decode, so skip both
+    if EPHEMERIS_MODE == 'local':
+        return compute_local_planets(create_payload(data))
     
     # Check cache
-    cache_key = get_cache_key('planets', data)
-    if cache_key in PLANET_CACHE:
-        cached = PLANET_CACHE[cache_key]
-        if datetime.now() - cached['timestamp'] < timedelta(hours=CACHE_EXPIRY_HOURS):
-            print(f"[CACHE] Hit for planets {cache_key[:8]}...")
-            return {'success': True, 'output': cached['data'], 'cached': True}
+    cache_key = get_planet_cache_key(data)
+    with timed_phase('cache_lookup', 'planets'):
+        cached = PLANET_CACHE.get(cache_key)
+        if cached is not None:
+            if cached.is_fresh():
+                CACHE_HITS.inc(cache='planet')
+                logger.debug("cache hit %s", cache_key, extra={'event': 'cache.hit', 'cache': 'planet', 'sample': True})
+                return {'success': True, 'output': cached.data, 'cached': True}
+            if PLANET_CACHE.pop(cache_key, None) is not None:
+                CACHE_EVICTIONS.inc(cache='planet')
+        CACHE_MISSES.inc(cache='planet')
 
+    if ask_peers and PEER_CACHE is not None:
+        with timed_phase('peer', 'planets'):
+            result = PEER_CACHE.ask_owner(cache_key, {'kind': 'planets', 'data': data})
+        if result is not None:
+            if not result.get('success'):
+                return result
+            if valid_peer_result(result, 'output', list):
+                PLANET_CACHE[cache_key] = PlanetCacheEntry(result['output'], result.get('timestamp'))
+                return {'success': True, 'output': result['output']}
+
+    return PLANET_FILLS.do(cache_key, lambda: upstream_planetary_data(data, cache_key))
+
+
+def upstream_planetary_data(data, cache_key):
+    """Call /planets, rotating API keys (local ephemeris in fallback mode); stores under cache_key"""
     payload = create_payload(data)
     url = f"{API_BASE_URL}/planets"
     
@@ -255,39 +960,75 @@ def fetch_planetary_data(data):
     for i, api_key in enumerate(API_KEYS):
         try:
             headers = {'Content-Type': 'application/json', 'x-api-key': api_key}
-            print(f"[API] Fetching Planets: {url} (Key #{i+1})")
+            logger.info("upstream call %s key #%d", url, i + 1, extra={'event': 'upstream.call', 'sample': True})
             
-            response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
+            # Every attempt queues separately, so a retry yields to higher classes
+            with UPSTREAM_QUEUE.slot():
+                start = time.perf_counter()
+                try:
+                    with timed_phase('upstream' if i == 0 else 'upstream_retry', 'planets'):
+                        response = upstream_session().post(url, headers=headers, data=json.dumps(payload), timeout=UPSTREAM_TIMEOUT)
+                finally:
+                    UPSTREAM_LATENCY.observe(time.perf_counter() - start, endpoint='planets', key=f'key{i+1}')
             
             if response.status_code == 200:
                 result = response.json()
                 output = result.get('output', result) # Handle if wrapped or raw
                 
                 # Cache
-                PLANET_CACHE[cache_key] = {
-                    'data': output,
-                    'timestamp': datetime.now()
-                }
-                print(f"[CACHE] Stored planets {cache_key[:8]}...")
+                PLANET_CACHE[cache_key] = PlanetCacheEntry(output)
+                logger.debug("cache store %s", cache_key, extra={'event': 'cache.store', 'cache': 'planet', 'sample': True})
                 return {'success': True, 'output': output}
             
             elif response.status_code == 429:
-                print(f"⚠️ [API] Planets Rate limit (Key #{i+1})")
+                UPSTREAM_RATE_LIMITED.inc(endpoint='planets', key=f'key{i+1}')
+                logger.warning("rate limit exceeded for key #%d, trying next key", i + 1, extra={'event': 'upstream.rate_limited', 'endpoint': 'planets'})
                 last_error = "Rate Limit"
                 continue
             else:
+                UPSTREAM_ERRORS.inc(endpoint='planets', key=f'key{i+1}')
                 return {'success': False, 'error': f"Status {response.status_code}", 'details': response.text}
         
+        except UpstreamQueueTimeout as e:
+            logger.warning("%s", e, extra={'event': 'upstream.queue_timeout', 'endpoint': 'planets'})
+            last_error = str(e)
+            break
         except Exception as e:
-            print(f"⚠️ [API] Planets Error (Key #{i+1}): {e}")
+            if isinstance(e, requests.Timeout):
+                UPSTREAM_TIMEOUTS.inc(endpoint='planets', key=f'key{i+1}')
+            else:
+                UPSTREAM_ERRORS.inc(endpoint='planets', key=f'key{i+1}')
+            logger.warning("error for key #%d: %s", i + 1, e, extra={'event': 'upstream.error', 'endpoint': 'planets'})
             last_error = str(e)
             continue
 
+    if EPHEMERIS_MODE == 'fallback':
+        logger.warning("all keys failed (%s), using local ephemeris", last_error, extra={'event': 'ephemeris.fallback'})
+        return compute_local_planets(payload)
+
     return {'success': False, 'error': last_error or "All keys failed"}
 
 
 # ============== GET Endpoint for Kundali Chart ==============
-@app.route('/kundali', methods=['GET'])
+def kundali_query_data():
+    """Birth details from the /kundali query string, with its defaults"""
+    return {
+        'year': request.args.get('year', 2024),
+        'month': request.args.get('month', 1),
+        'date': request.args.get('date', 1),
+        'hours': request.args.get('hours', 12),
+        'minutes': request.args.get('minutes', 0),
+        'seconds': request.args.get('seconds', 0),
+        'latitude': request.args.get('latitude', 28.6139),
+        'longitude': request.args.get('longitude', 77.2090),
+        'timezone': request.args.get('timezone', 5.5),
+        'observation_point': request.args.get('observation_point', 'topocentric'),
+        'ayanamsha': request.args.get('ayanamsha', 'lahiri'),
+    }
+
+
+@api.route('/kundali', methods=['GET'])
+@admission_controlled(lambda: chart_cached(request.args.get('division', 'd1'), kundali_query_data()))
 def get_kundali_chart():
     """
     GET endpoint for Kundali chart - returns D1 Rasi chart SVG in JSON
@@ -302,19 +1043,7 @@ def get_kundali_chart():
         /kundali?year=2022&month=8&date=11&hours=6&minutes=0&latitude=17.38333&longitude=78.4666&timezone=5.5
     """
     # Get parameters from query string
-    data = {
-        'year': request.args.get('year', 2024),
-        'month': request.args.get('month', 1),
-        'date': request.args.get('date', 1),
-        'hours': request.args.get('hours', 12),
-        'minutes': request.args.get('minutes', 0),
-        'seconds': request.args.get('seconds', 0),
-        'latitude': request.args.get('latitude', 28.6139),
-        'longitude': request.args.get('longitude', 77.2090),
-        'timezone': request.args.get('timezone', 5.5),
-        'observation_point': request.args.get('observation_point', 'topocentric'),
-        'ayanamsha': request.args.get('ayanamsha', 'lahiri'),
-    }
+    data = kundali_query_data()
     
     division = request.args.get('division', 'd1').lower()
     
@@ -355,7 +1084,8 @@ def get_kundali_chart():
 
 
 # ============== POST Endpoint for Any Chart ==============
-@app.route('/chart/<division>', methods=['POST'])
+@api.route('/chart/<division>', methods=['POST'])
+@admission_controlled(lambda division: chart_cached(division, request_json()))
 def get_chart_by_division(division):
     """
     POST endpoint for any divisional chart
@@ -405,7 +1135,8 @@ def get_chart_by_division(division):
 
 
 # ============== GET Planetary Data Endpoint ==============
-@app.route('/planets', methods=['POST'])
+@api.route('/planets', methods=['POST'])
+@admission_controlled(lambda: planets_cached(request_json()))
 def get_planetary_data():
     """
     Get planetary positions (D1 Rasi)
@@ -427,7 +1158,10 @@ def get_planetary_data():
 
 
 # ============== Batch Charts Endpoint ==============
-@app.route('/charts/batch', methods=['POST'])
+@api.route('/charts/batch', methods=['POST'])
+@admission_controlled(lambda: all(
+    chart_cached(c, request_json()) for c in request_json().get('charts', ['d1', 'd9'])
+))
 def get_batch_charts():
     """
     Get multiple charts at once
@@ -440,9 +1174,13 @@ def get_batch_charts():
         "timezone": 5.5,
         "charts": ["d1", "d9", "d10"]
     }
+    
+    Accept: application/msgpack or application/cbor returns the same document
+    in compact form (see compact_encoding.py).
     """
     data = request.get_json() or {}
     requested_charts = data.get('charts', ['d1', 'd9'])
+    compact = response_encoding()
     
     results = {}
     errors = {}
@@ -465,23 +1203,28 @@ def get_batch_charts():
     # Generate chart_id from birth data
     batch_chart_id = generate_chart_id(data)
     
-    return jsonify({
+    return render_body({
         'success': len(results) > 0,
         'chart_id': batch_chart_id,
         'charts': results,
         'errors': errors if errors else None,
         'count': len(results)
-    })
+    }, compact, data)
 
 
 # ============== Shortcut endpoints for common charts ==============
-@app.route('/rasi', methods=['GET', 'POST'])
+def shortcut_request_data():
+    """Birth details from the query string (GET) or JSON body (POST)"""
+    if request.method == 'GET':
+        return dict(request.args)
+    return request.get_json() or {}
+
+
+@api.route('/rasi', methods=['GET', 'POST'])
+@admission_controlled(lambda: chart_cached('d1', shortcut_request_data()))
 def get_rasi_chart():
     """Shortcut for D1 Rasi chart"""
-    if request.method == 'GET':
-        data = dict(request.args)
-    else:
-        data = request.get_json() or {}
+    data = shortcut_request_data()
     
     result = fetch_chart_svg('horoscope-chart-svg-code', data, chart_type='d1')
     
@@ -495,13 +1238,11 @@ def get_rasi_chart():
     return jsonify({'success': False, 'error': result.get('error')}), 500
 
 
-@app.route('/navamsa', methods=['GET', 'POST'])
+@api.route('/navamsa', methods=['GET', 'POST'])
+@admission_controlled(lambda: chart_cached('d9', shortcut_request_data()))
 def get_navamsa_chart():
     """Shortcut for D9 Navamsa chart"""
-    if request.method == 'GET':
-        data = dict(request.args)
-    else:
-        data = request.get_json() or {}
+    data = shortcut_request_data()
     
     result = fetch_chart_svg('navamsa-chart-svg-code', data, chart_type='d9')
     
@@ -535,6 +1276,12 @@ SIGN_NAMES = [
 
 VALID_PLANETS = ['Su', 'Mo', 'Ma', 'Me', 'Ju', 'Ve', 'Sa', 'Ra', 'Ke']
 
+# /planets names -> SVG abbreviations
+PLANET_ABBREVIATIONS = {
+    'Ascendant': 'As', 'Sun': 'Su', 'Moon': 'Mo', 'Mars': 'Ma', 'Mercury': 'Me',
+    'Jupiter': 'Ju', 'Venus': 'Ve', 'Saturn': 'Sa', 'Rahu': 'Ra', 'Ketu': 'Ke',
+}
+
 # 27 Nakshatras with lords
 NAKSHATRAS = [
     'Ashwini', 'Bharani', 'Krittika', 'Rohini', 'Mrigashira', 'Ardra',
@@ -700,6 +1447,93 @@ def extract_positions_from_svg(svg_content):
     }
 
 
+class PackedPositions:
+    """
+    Array-backed form of the extract_positions_from_svg() result.
+
+    `signs` is a small bytes object: byte 0 is the ascendant sign (0 = unknown),
+    each following byte is (planet index << 4) | sign for one extracted planet,
+    kept in SVG order so planets_in_houses lists come back in the same order.
+    Everything else in the result dict is derived from these bytes.
+    """
+    __slots__ = ('signs', 'raw_text_node_count')
+
+    def __init__(self, signs, raw_text_node_count):
+        self.signs = signs
+        self.raw_text_node_count = raw_text_node_count
+
+    @classmethod
+    def from_dict(cls, positions):
+        packed = bytearray([positions['ascendant_sign']])
+        for planet, sign in positions['planet_signs'].items():
+            packed.append((VALID_PLANETS.index(planet) << 4) | sign)
+        return cls(bytes(packed), positions['raw_text_node_count'])
+
+    @property
+    def ascendant_sign(self):
+        return self.signs[0]
+
+    def planet_signs(self):
+        return {VALID_PLANETS[b >> 4]: b & 0x0F for b in self.signs[1:]}
+
+    def to_dict(self):
+        """Rebuild the exact dict extract_positions_from_svg() returns"""
+        ascendant_sign = self.signs[0]
+        planet_signs = self.planet_signs()
+
+        planets_in_houses = {i: [] for i in range(1, 13)}
+        if ascendant_sign > 0:
+            for planet, sign in planet_signs.items():
+                house = ((sign - ascendant_sign + 12) % 12) + 1
+                planets_in_houses[house].append(planet)
+
+        house_signs = {}
+        for house in range(1, 13):
+            if ascendant_sign > 0:
+                sign = ((ascendant_sign + house - 2) % 12) + 1
+                house_signs[house] = {'sign_number': sign, 'sign_name': SIGN_NAMES[sign - 1]}
+            else:
+                house_signs[house] = {'sign_number': 0, 'sign_name': 'Unknown'}
+
+        if ascendant_sign > 0 and planet_signs:
+            extraction_status = 'ok'
+        elif ascendant_sign > 0 or planet_signs:
+            extraction_status = 'partial'
+        else:
+            extraction_status = 'failed'
+
+        return {
+            'ascendant_sign': ascendant_sign,
+            'planet_signs': planet_signs,
+            'planets_in_houses': planets_in_houses,
+            'house_signs': house_signs,
+            'raw_text_node_count': self.raw_text_node_count,
+            'extracted_planet_count': len(planet_signs),
+            'extraction_status': extraction_status,
+        }
+
+
+def get_chart_positions(cache_key, svg):
+    """
+    Extract positions for a chart, reusing the packed copy stored on its
+    CHART_CACHE entry so cached charts are parsed only once.
+    """
+    entry = CHART_CACHE.get(cache_key)
+    if entry is None:
+        with SVG_EXTRACTION_LATENCY.time():
+            return extract_positions_from_svg(svg)
+    if entry.positions is None:
+        with SVG_EXTRACTION_LATENCY.time():
+            entry.positions = PackedPositions.from_dict(extract_positions_from_svg(svg))
+        if PLACEMENT_INDEX_ENABLED:
+            birth_key, chart_type = split_cache_key(cache_key)
+            PLACEMENT_INDEX.add(
+                birth_key, chart_type, entry.positions.ascendant_sign, entry.positions.planet_signs(),
+                expires_at=entry.timestamp + CACHE_EXPIRY_SECONDS,
+            )
+    return entry.positions.to_dict()
+
+
 def calculate_nakshatra(full_degree):
     """
     Calculate Nakshatra, Pada, and Lord from full degree (0-360).
@@ -724,8 +1558,105 @@ def calculate_nakshatra(full_degree):
     }
 
 
+def build_d1_planets(output):
+    """
+    Turn /planets output into the d1_planets and nakshatras maps
+    returned by /kundali/full.
+    """
+    d1_planets = {}
+    nakshatras_result = {}
+    
+    # Parse the output list [{"0": {...}}, {"1": {...}}, ...]
+    if isinstance(output, list):
+        for item in output:
+            if isinstance(item, dict):
+                for key, planet_data in item.items():
+                    if isinstance(planet_data, dict) and 'name' in planet_data:
+                        name = planet_data['name']
+                        full_degree = planet_data.get('fullDegree', 0)
+                        
+                        # Calculate nakshatra from degree
+                        nak_data = calculate_nakshatra(full_degree)
+                        
+                        d1_planets[name] = {
+                            'fullDegree': full_degree,
+                            'normDegree': planet_data.get('normDegree', 0),
+                            'sign': planet_data.get('current_sign', 0),
+                            'sign_name': SIGN_NAMES[planet_data.get('current_sign', 1) - 1] if planet_data.get('current_sign', 0) > 0 else 'Unknown',
+                            'house': planet_data.get('house_number', 0),
+                            'isRetro': planet_data.get('isRetro', False),
+                            'nakshatra': nak_data['nakshatra'],
+                            'nakshatra_pada': nak_data['pada'],
+                            'nakshatra_lord': nak_data['lord'],
+                        }
+                        
+                        # Also build separate nakshatras map
+                        if name != 'Ascendant':
+                            nakshatras_result[name] = nak_data
+    
+    return d1_planets, nakshatras_result
+
+
+def d1_sign_placements(d1_planets, divisions_result):
+    """
+    {'As': sign, 'Su': sign, ...} for the D1 chart: positions extracted from
+    the D1 SVG, overridden by /planets data where both are present.
+    """
+    signs = {}
+    d1 = divisions_result.get('d1')
+    if d1:
+        signs.update(d1['planet_signs'])
+        if d1['ascendant_sign'] > 0:
+            signs['As'] = d1['ascendant_sign']
+    for name, planet in d1_planets.items():
+        if name in PLANET_ABBREVIATIONS and planet['sign']:
+            signs[PLANET_ABBREVIATIONS[name]] = planet['sign']
+    return signs
+
+
+# ============== Compact Binary Responses ==============
+COMPACT_CODEC = CompactCodec(VALID_PLANETS, SIGN_NAMES)
+
+
+def response_encoding():
+    """(format, svg mode) negotiated from the Accept header, or None for JSON"""
+    if not COMPACT_RESPONSES_ENABLED:
+        return None
+    return negotiate_compact(request.accept_mimetypes)
+
+
+def cached_svg_blobs(data, chart_types):
+    """zlib SVGs held in CHART_CACHE, so compact bodies reuse them as-is"""
+    blobs = {}
+    for chart_type in chart_types:
+        entry = CHART_CACHE.get(get_cache_key(chart_type, data))
+        if entry is not None:
+            blobs[chart_type] = entry.svg_z
+    return blobs
+
+
+def render_body(body, compact, data):
+    """jsonify(body), or its MessagePack/CBOR form when the client negotiated one"""
+    route = request.url_rule.rule
+    if compact is None:
+        RESPONSE_FORMATS.inc(route=route, format='json')
+        response = jsonify(body)
+    else:
+        fmt, svg_mode = compact
+        RESPONSE_FORMATS.inc(route=route, format=fmt)
+        svg_blobs = None
+        if svg_mode == 'zlib':
+            svg_blobs = cached_svg_blobs(data, body.get('divisions') or body.get('charts') or {})
+        response = Response(
+            COMPACT_CODEC.encode(body, fmt, svg_mode, svg_blobs),
+            content_type=compact_content_type(fmt, svg_mode),
+        )
+    return set_vary(response)
+
+
 # ============== Full Kundali Endpoint ==============
-@app.route('/kundali/full', methods=['POST'])
+@api.route('/kundali/full', methods=['POST'])
+@admission_controlled(full_kundali_cached)
 def get_full_kundali():
     """
     Combined endpoint: returns SVG + extracted positions for all requested divisions.
@@ -741,6 +1672,9 @@ def get_full_kundali():
         "divisions": ["d1", "d9", "d10"]  // optional, defaults to all
     }
     
+    Accept: application/msgpack or application/cbor returns the same document
+    in compact form (see compact_encoding.py).
+    
     Returns:
     {
         "success": true,
@@ -766,11 +1700,21 @@ def get_full_kundali():
         "nakshatras": {
             "Sun": {"nakshatra": "Jyeshtha", "pada": 3, "lord": "Mercury"},
             ...
-        }
+        },
+        "ashtakavarga": {"bav": {"Sun": [4, 5, ...], ...}, "sav": [28, 31, ...], "sav_total": 337},
+        "yogas": {"Gajakesari": true, "Budhaditya": false, ...}
     }
     """
     data = request.get_json() or {}
     requested_divisions = data.get('divisions', list(CHART_ENDPOINTS.keys()))
+    compact = response_encoding()
+    
+    # 0. Fully assembled responses are served from RESPONSE_CACHE as-is
+    response_key = full_kundali_response_key(data, requested_divisions, compact)
+    with timed_phase('response_cache'):
+        cached_response = get_cached_response(response_key)
+    if cached_response is not None:
+        return cached_response
     
     divisions_result = {}
     errors = {}
@@ -787,7 +1731,8 @@ def get_full_kundali():
         
         if result['success']:
             svg = result['svg']
-            positions = extract_positions_from_svg(svg)
+            with timed_phase('extraction', div_key):
+                positions = get_chart_positions(get_cache_key(div_key, data), svg)
             
             divisions_result[div_key] = {
                 'svg': svg,
@@ -810,49 +1755,643 @@ def get_full_kundali():
     
     planet_result = fetch_planetary_data(data)
     if planet_result['success']:
-        output = planet_result['output']
-        
-        # Parse the output list [{"0": {...}}, {"1": {...}}, ...]
-        if isinstance(output, list):
-            for item in output:
-                if isinstance(item, dict):
-                    for key, planet_data in item.items():
-                        if isinstance(planet_data, dict) and 'name' in planet_data:
-                            name = planet_data['name']
-                            full_degree = planet_data.get('fullDegree', 0)
-                            
-                            # Calculate nakshatra from degree
-                            nak_data = calculate_nakshatra(full_degree)
-                            
-                            d1_planets[name] = {
-                                'fullDegree': full_degree,
-                                'normDegree': planet_data.get('normDegree', 0),
-                                'sign': planet_data.get('current_sign', 0),
-                                'sign_name': SIGN_NAMES[planet_data.get('current_sign', 1) - 1] if planet_data.get('current_sign', 0) > 0 else 'Unknown',
-                                'house': planet_data.get('house_number', 0),
-                                'isRetro': planet_data.get('isRetro', False),
-                                'nakshatra': nak_data['nakshatra'],
-                                'nakshatra_pada': nak_data['pada'],
-                                'nakshatra_lord': nak_data['lord'],
-                            }
-                            
-                            # Also build separate nakshatras map
-                            if name != 'Ascendant':
-                                nakshatras_result[name] = nak_data
+        with timed_phase('nakshatra'):
+            d1_planets, nakshatras_result = build_d1_planets(planet_result['output'])
+    
+    with timed_phase('ashtakavarga'):
+        d1_signs = d1_sign_placements(d1_planets, divisions_result)
+        ashtakavarga_result = ashtakavarga(d1_signs)
+        yogas_result = yogas(d1_signs)
     
     chart_id = generate_chart_id(data)
     
-    return jsonify({
+    body = {
         'success': len(divisions_result) > 0,
         'chart_id': chart_id,
         'divisions': divisions_result,
         'd1_planets': d1_planets,
         'nakshatras': nakshatras_result,
+        'ashtakavarga': ashtakavarga_result,
+        'yogas': yogas_result,
         'errors': errors if errors else None,
         'count': len(divisions_result),
+    }
+    
+    timer = g.get('request_timer')
+    if timer is not None:
+        body['debug_timing'] = timer.breakdown()
+    
+    with timed_phase('serialize'):
+        response = render_body(body, compact, data)
+    
+    # Only complete results are worth replaying (and never debug bodies)
+    if not errors and planet_result['success'] and timer is None:
+        set_cached_response(response_key, response.get_data(), response.content_type)
+    
+    return response
+
+
+# ============== Transit Endpoints ==============
+def transit_snapshot_source(when, ayanamsha):
+    """Geocentric sidereal positions at one UTC grid point, via fetch_planetary_data"""
+    # Snapshots are shared fills rather than one user's request: dispatch as prefetch
+    with UPSTREAM_QUEUE.priority('prefetch'):
+        result = fetch_planetary_data({
+            'year': when.year, 'month': when.month, 'date': when.day,
+            'hours': when.hour, 'minutes': when.minute, 'seconds': when.second,
+            'latitude': 0.0, 'longitude': 0.0, 'timezone': 0.0,
+            'observation_point': 'geocentric', 'ayanamsha': ayanamsha,
+        })
+    if not result['success']:
+        raise RuntimeError(result.get('error') or 'Planetary data unavailable')
+    planets, _ = build_d1_planets(result['output'])
+    # The ascendant depends on the observer, so it is never part of a shared snapshot
+    return {name: float(p['fullDegree']) for name, p in planets.items() if name != 'Ascendant'}
+
+
+def record_transit_lookup(hit):
+    (CACHE_HITS if hit else CACHE_MISSES).inc(cache='transit')
+
+
+TRANSITS = TransitService(
+    transit_snapshot_source,
+    step_hours=TRANSIT_GRID_HOURS,
+    max_snapshots=TRANSIT_MAX_SNAPSHOTS,
+    on_lookup=record_transit_lookup,
+)
+
+
+def current_transits(at, ayanamsha):
+    """Interpolated transit positions with nakshatra details"""
+    with timed_phase('transits'):
+        positions = TRANSITS.positions(at, ayanamsha)
+    for planet in positions.values():
+        nak_data = calculate_nakshatra(planet['fullDegree'])
+        planet['sign_name'] = SIGN_NAMES[planet['current_sign'] - 1]
+        planet['nakshatra'] = nak_data['nakshatra']
+        planet['nakshatra_pada'] = nak_data['pada']
+        planet['nakshatra_lord'] = nak_data['lord']
+    return positions
+
+
+@api.route('/transits', methods=['GET'])
+@admission_controlled(lambda: transits_cached(request.args.get('at'), request.args.get('ayanamsha', 'lahiri')))
+def get_transits():
+    """
+    Current (or ?at=<ISO 8601 UTC>) geocentric sidereal positions.
+    Shared by every user, so it costs one upstream call per grid point.
+    """
+    try:
+        ayanamsha = parse_ayanamsha(request.args.get('ayanamsha', 'lahiri'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        at = parse_utc(request.args.get('at'))
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid at: {e}'}), 400
+    
+    try:
+        transits = current_transits(at, ayanamsha)
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'at': at.isoformat(),
+        'ayanamsha': ayanamsha,
+        'grid_hours': TRANSIT_GRID_HOURS,
+        'transits': transits,
+    })
+
+
+@api.route('/transits/natal', methods=['POST'])
+@admission_controlled(lambda: planets_cached(request_json()) and transits_cached(
+    request_json().get('at'), request_json().get('ayanamsha', 'lahiri')
+))
+def get_natal_transits():
+    """
+    Shared transits overlaid on the user's (cached) D1.
+    
+    JSON Body: birth details as for /planets, plus optional "at" (ISO 8601 UTC).
+    """
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Request body must be a JSON object'}), 400
+    try:
+        ayanamsha = parse_ayanamsha(data.get('ayanamsha', 'lahiri'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    data = {**data, 'ayanamsha': ayanamsha}
+    try:
+        at = parse_utc(data.get('at'))
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid at: {e}'}), 400
+    
+    natal_result = fetch_planetary_data(data)
+    if not natal_result['success']:
+        return jsonify({
+            'success': False,
+            'error': natal_result.get('error'),
+            'details': natal_result.get('details')
+        }), 500
+    natal_planets, _ = build_d1_planets(natal_result['output'])
+    
+    try:
+        transits = current_transits(at, ayanamsha)
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'chart_id': generate_chart_id(data),
+        'at': at.isoformat(),
+        'ayanamsha': ayanamsha,
+        'natal': {
+            'ascendant_sign': natal_planets.get('Ascendant', {}).get('sign'),
+            'moon_sign': natal_planets.get('Moon', {}).get('sign'),
+            'moon_nakshatra': natal_planets.get('Moon', {}).get('nakshatra'),
+        },
+        'transits': natal_overlay(transits, natal_planets),
     })
 
 
+# ============== Dasha Endpoints ==============
+def birth_utc_seconds(payload):
+    """Birth moment of a create_payload() payload as UTC epoch seconds"""
+    local = datetime(
+        payload['year'], payload['month'], payload['date'],
+        payload['hours'], payload['minutes'], payload['seconds'], tzinfo=timezone.utc,
+    )
+    return local.timestamp() - payload['timezone'] * 3600.0
+
+
+def get_dasha_timeline(data):
+    """
+    Cached VimshottariTimeline for a birth, built from the D1 Moon.
+    Returns (chart_key, timeline, error).
+    """
+    payload = create_payload(data)
+    chart_key = generate_chart_id(payload)
+    timeline = DASHA_CACHE.get(chart_key)
+    if timeline is not None:
+        CACHE_HITS.inc(cache='dasha')
+        return chart_key, timeline, None
+    CACHE_MISSES.inc(cache='dasha')
+
+    result = fetch_planetary_data(data)
+    if not result['success']:
+        return chart_key, None, result.get('error')
+    planets, _ = build_d1_planets(result['output'])
+    if 'Moon' not in planets:
+        return chart_key, None, 'Moon position missing from planetary data'
+
+    moon = float(planets['Moon']['fullDegree']) % 360
+    nakshatra_span = 360.0 / 27.0
+    timeline = VimshottariTimeline(
+        calculate_nakshatra(moon)['lord'],
+        (moon % nakshatra_span) / nakshatra_span,
+        birth_utc_seconds(payload),
+    )
+    if len(DASHA_CACHE) >= DASHA_CACHE_MAX_ENTRIES:
+        evict_oldest(DASHA_CACHE, 'dasha')
+    DASHA_CACHE[chart_key] = timeline
+    return chart_key, timeline, None
+
+
+# Birth details a /dasha request must carry (they make up the cache keys)
+DASHA_BIRTH_FIELDS = ('year', 'month', 'date', 'hours', 'minutes', 'latitude', 'longitude')
+
+
+def dasha_request_data():
+    """JSON body of a /dasha request with its birth details checked; raises ValueError"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    missing = [field for field in DASHA_BIRTH_FIELDS if field not in data]
+    if missing:
+        raise ValueError(f"Missing birth details: {', '.join(missing)}")
+    try:
+        birth_utc_seconds(create_payload(data))
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f'Invalid birth details: {e}')
+    return data
+
+
+def parse_dasha_depth(value, default):
+    depth = int(value if value is not None else default)
+    if not 1 <= depth <= DASHA_MAX_DEPTH:
+        raise ValueError(f'depth must be between 1 and {DASHA_MAX_DEPTH}')
+    return depth
+
+
+@api.route('/dasha', methods=['POST'])
+@admission_controlled(lambda: dasha_cached(request_json()))
+def get_dasha():
+    """
+    Vimshottari periods in chronological (pre-order) order down to `depth`.
+    
+    JSON Body: birth details plus
+        "depth": 1-5 (mahadasha .. prana, default 2)
+        "from", "to": optional ISO 8601 window; periods outside it are not generated
+        "stream": true (or ?stream=1) for NDJSON, one period per line
+    """
+    try:
+        data = dasha_request_data()
+        depth = parse_dasha_depth(data.get('depth'), 2)
+        window_start = parse_utc(data['from']).timestamp() if data.get('from') else None
+        window_end = parse_utc(data['to']).timestamp() if data.get('to') else None
+        chart_key, timeline, error = get_dasha_timeline(data)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if timeline is None:
+        return jsonify({'success': False, 'error': error}), 500
+    
+    summary = {
+        'success': True,
+        'chart_id': chart_key,
+        'birth_dasha_lord': timeline.birth_lord,
+        'balance_years': round(timeline.balance_years, 6),
+        'depth': depth,
+    }
+    periods = timeline.walk(depth, window_start, window_end)
+    
+    if data.get('stream') or request.args.get('stream') == '1':
+        def generate():
+            yield json.dumps(summary) + '\n'
+            for period in periods:
+                yield json.dumps(period.to_dict()) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    return jsonify({**summary, 'periods': [period.to_dict() for period in periods]})
+
+
+@api.route('/dasha/at', methods=['POST'])
+@admission_controlled(lambda: dasha_cached(request_json()))
+def get_running_dasha():
+    """
+    Periods running at a date, mahadasha first.
+    
+    JSON Body: birth details plus "at" (ISO 8601, default now) and "depth" (default 3)
+    """
+    try:
+        data = dasha_request_data()
+        depth = parse_dasha_depth(data.get('depth'), 3)
+        at = parse_utc(data.get('at'))
+        chart_key, timeline, error = get_dasha_timeline(data)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if timeline is None:
+        return jsonify({'success': False, 'error': error}), 500
+    
+    return jsonify({
+        'success': True,
+        'chart_id': chart_key,
+        'at': at.isoformat(),
+        'running': [period.to_dict() for period in timeline.running(at.timestamp(), depth)],
+    })
+
+
+# ============== Placement Search Endpoint ==============
+def parse_placement_constraint(constraint):
+    """{"division": "d9", "body": "Ju", "house": 1} -> index term; raises ValueError"""
+    division = str(constraint.get('division', 'd1')).lower()
+    if division not in CHART_ENDPOINTS:
+        raise ValueError(f'Unknown division: {division}')
+    
+    body = constraint.get('body')
+    body = PLANET_ABBREVIATIONS.get(body, body)
+    if body not in VALID_PLANETS and body != 'As':
+        raise ValueError(f"Unknown body: {constraint.get('body')}")
+    
+    if 'house' in constraint:
+        if body == 'As':
+            raise ValueError('The ascendant is always in house 1; query its sign instead')
+        field, value = 'house', constraint['house']
+    elif 'sign' in constraint:
+        field, value = 'sign', constraint['sign']
+        if isinstance(value, str) and not value.isdigit():
+            if value.capitalize() not in SIGN_NAMES:
+                raise ValueError(f'Unknown sign: {value}')
+            value = SIGN_NAMES.index(value.capitalize()) + 1
+    else:
+        raise ValueError('Each constraint needs "sign" or "house"')
+    
+    value = int(value)
+    if not 1 <= value <= 12:
+        raise ValueError(f'{field} must be between 1 and 12')
+    return (division, body, field, value)
+
+
+@api.route('/search/placements', methods=['POST'])
+def search_placements():
+    """
+    Cached charts matching every placement constraint.
+    
+    JSON Body:
+    {
+        "constraints": [
+            {"division": "d9", "body": "Ju", "house": 1},
+            {"division": "d1", "body": "Moon", "sign": "Cancer"}
+        ],
+        "limit": 100
+    }
+    Only charts whose positions have been extracted (e.g. via /kundali/full)
+    and are still cached are indexed. Returns birth keys
+    (year_month_date_hours_minutes_lat_lon).
+    """
+    data = request.get_json() or {}
+    constraints = data.get('constraints') or []
+    if not constraints:
+        return jsonify({'success': False, 'error': 'At least one constraint is required'}), 400
+    try:
+        terms = [parse_placement_constraint(c) for c in constraints]
+        limit = max(0, int(data.get('limit', 100)))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    start = time.perf_counter()
+    total, chart_keys = PLACEMENT_INDEX.search(terms, limit=limit)
+    took_ms = (time.perf_counter() - start) * 1000.0
+    
+    return jsonify({
+        'success': True,
+        'total': total,
+        'chart_keys': chart_keys,
+        'limit': limit,
+        'took_ms': round(took_ms, 3),
+        'indexed_charts': len(PLACEMENT_INDEX),
+    })
+
+
+# ============== Peer Cache Endpoint ==============
+@api.route('/peer/fill', methods=['POST'])
+def peer_fill():
+    """
+    Serve a cache entry this node owns to another node, filling it (once,
+    however many nodes ask at the same time) on a miss. Never forwards.
+    
+    JSON Body: {"kind": "chart", "chart_type": "d9", "data": {...}} or {"kind": "planets", "data": {...}}
+    """
+    if PEER_CACHE is None:
+        return jsonify({'success': False, 'error': 'Peer cache is disabled'}), 404
+    if PEER_TOKEN and not hmac.compare_digest(request.headers.get('X-Peer-Token', ''), PEER_TOKEN):
+        return jsonify({'success': False, 'error': 'Invalid peer token'}), 403
+    
+    body = request.get_json() or {}
+    kind, data = body.get('kind'), body.get('data') or {}
+    try:
+        if kind == 'chart':
+            chart_type = str(body.get('chart_type', '')).lower()
+            if chart_type not in CHART_ENDPOINTS:
+                return jsonify({'success': False, 'error': f'Unknown division: {chart_type}'}), 400
+            result = fetch_chart_svg(CHART_ENDPOINTS[chart_type], data, chart_type=chart_type, ask_peers=False)
+            entry = CHART_CACHE.get(get_cache_key(chart_type, data))
+            if result['success']:
+                result = {'success': True, 'svg': result['svg']}
+        elif kind == 'planets':
+            result = fetch_planetary_data(data, ask_peers=False)
+            entry = PLANET_CACHE.get(get_planet_cache_key(data))
+            if result['success']:
+                result = {'success': True, 'output': result['output']}
+        else:
+            return jsonify({'success': False, 'error': f'Unknown kind: {kind}'}), 400
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid birth data: {e}'}), 400
+    
+    if result['success'] and entry is not None:
+        result['timestamp'] = entry.timestamp
+    PEER_FILLS_SERVED.inc(kind=kind)
+    return jsonify(result)
+
+
+# ============== Admin: Cache Snapshots ==============
+def iter_cache_records(since=None, include_positions=True):
+    """CHART_CACHE/PLANET_CACHE entries as cache_snapshot records, fresh ones only"""
+    now = time.time()
+    for key, entry in list(CHART_CACHE.items()):
+        if entry.is_fresh(now) and (since is None or entry.timestamp >= since):
+            positions = entry.positions if include_positions else None
+            yield (
+                KIND_CHART, key, entry.timestamp, entry.svg_z,
+                positions.signs if positions is not None else b'',
+                positions.raw_text_node_count if positions is not None else 0,
+            )
+    for key, entry in list(PLANET_CACHE.items()):
+        if entry.is_fresh(now) and (since is None or entry.timestamp >= since):
+            yield KIND_PLANET, key, entry.timestamp, entry.data_z, b'', 0
+
+
+def valid_packed_signs(signs):
+    """True if `signs` is a well-formed PackedPositions byte string"""
+    if not signs or signs[0] > 12:
+        return False
+    return all(b >> 4 < len(VALID_PLANETS) and 1 <= b & 0x0F <= 12 for b in signs[1:])
+
+
+def load_cache_records(records):
+    """
+    Insert snapshot records into the caches. Stale records and records older
+    than the entry already held are skipped. Returns counts by outcome.
+    Raises SnapshotError on a malformed chart record.
+    """
+    counts = {'charts': 0, 'planets': 0, 'skipped': 0}
+    now = time.time()
+    for kind, key, timestamp, blob, positions, raw_count in records:
+        if kind == KIND_CHART:
+            current = CHART_CACHE.get(key)
+            if now - timestamp >= CACHE_EXPIRY_SECONDS or (current is not None and current.timestamp >= timestamp):
+                counts['skipped'] += 1
+                continue
+            try:
+                birth_key, chart_type = split_cache_key(key)
+            except ValueError:
+                raise SnapshotError(f'Malformed chart key in snapshot: {key!r}')
+            if chart_type not in CHART_ENDPOINTS or (positions and not valid_packed_signs(positions)):
+                raise SnapshotError(f'Malformed chart record in snapshot: {key!r}')
+            entry = ChartCacheEntry.from_compressed(blob, chart_type, timestamp)
+            if positions:
+                entry.positions = PackedPositions(positions, raw_count)
+            store_chart_entry(key, entry)
+            if entry.positions is not None and PLACEMENT_INDEX_ENABLED:
+                PLACEMENT_INDEX.add(
+                    birth_key, chart_type, entry.positions.ascendant_sign, entry.positions.planet_signs(),
+                    expires_at=entry.timestamp + CACHE_EXPIRY_SECONDS,
+                )
+            counts['charts'] += 1
+        elif kind == KIND_PLANET:
+            current = PLANET_CACHE.get(key)
+            if now - timestamp >= CACHE_EXPIRY_SECONDS or (current is not None and current.timestamp >= timestamp):
+                counts['skipped'] += 1
+                continue
+            PLANET_CACHE[key] = PlanetCacheEntry.from_compressed(blob, timestamp)
+            counts['planets'] += 1
+        else:
+            counts['skipped'] += 1
+    return counts
+
+
+def url_origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def admin_token_origins():
+    """Hosts trusted with ADMIN_TOKEN: the peer nodes and the CACHE_WARM_FROM host"""
+    origins = {url_origin(node) for node in PEER_NODES}
+    if CACHE_WARM_FROM.startswith(('http://', 'https://')):
+        origins.add(url_origin(CACHE_WARM_FROM))
+    return origins
+
+
+def request_snapshot_source(source):
+    """
+    Check a ?source= given to the import endpoint: URLs pass (the token is only
+    sent to trusted hosts), file paths must resolve inside CACHE_SNAPSHOT_DIR.
+    """
+    if source.startswith(('http://', 'https://')):
+        return source
+    if not CACHE_SNAPSHOT_DIR:
+        raise ValueError('File sources are disabled (set CACHE_SNAPSHOT_DIR)')
+    root = os.path.realpath(CACHE_SNAPSHOT_DIR)
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError('Snapshot files must be inside CACHE_SNAPSHOT_DIR')
+    return path
+
+
+def warm_cache_from(source, max_age_hours=0):
+    """Load a snapshot from a file path or a peer's base URL; returns counts"""
+    since = time.time() - max_age_hours * 3600 if max_age_hours else None
+    headers = {}
+    if source.startswith(('http://', 'https://')):
+        if '/admin/cache/snapshot' not in source:
+            source = source.rstrip('/') + '/admin/cache/snapshot'
+            if max_age_hours:
+                source += f'?max_age_hours={max_age_hours:g}'
+        if url_origin(source) in admin_token_origins():
+            headers['X-Admin-Token'] = ADMIN_TOKEN
+    start = time.perf_counter()
+    stream = open_source(source, timeout=UPSTREAM_TIMEOUT, headers=headers)
+    try:
+        counts = load_cache_records(read_snapshot(stream, since))
+    finally:
+        stream.close()
+    logger.info(
+        "cache snapshot loaded from %s: %d charts, %d planets, %d skipped in %.2fs",
+        source, counts['charts'], counts['planets'], counts['skipped'], time.perf_counter() - start,
+        extra={'event': 'cache.snapshot.load'},
+    )
+    return counts
+
+
+def admin_denied():
+    """Error response unless the request carries the admin token"""
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'success': False, 'error': 'Invalid admin token'}), 403
+    return None
+
+
+def parse_max_age_hours(value):
+    hours = float(value or 0)
+    if hours < 0:
+        raise ValueError('max_age_hours must be >= 0')
+    return hours
+
+
+@api.route('/admin/cache/snapshot', methods=['GET'])
+def export_cache_snapshot():
+    """
+    Stream CHART_CACHE and PLANET_CACHE as a binary snapshot.
+    
+    Query Parameters:
+        max_age_hours - only entries cached within this many hours (default: all fresh)
+        positions     - 0 to leave out extracted chart positions (default 1)
+    """
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+    try:
+        max_age_hours = parse_max_age_hours(request.args.get('max_age_hours'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    since = time.time() - max_age_hours * 3600 if max_age_hours else None
+    records = iter_cache_records(since, include_positions=request.args.get('positions', '1') != '0')
+    return Response(
+        iter_chunks(records),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': 'attachment; filename="astrolearn-cache.snap"'},
+    )
+
+
+@api.route('/admin/cache/snapshot', methods=['POST'])
+def import_cache_snapshot():
+    """
+    Load a snapshot into the caches: the request body, or ?source=<path or peer URL>.
+    ?max_age_hours=N skips entries older than N hours.
+    """
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+    try:
+        max_age_hours = parse_max_age_hours(request.args.get('max_age_hours'))
+        source = request.args.get('source')
+        if source:
+            counts = warm_cache_from(request_snapshot_source(source), max_age_hours)
+        else:
+            since = time.time() - max_age_hours * 3600 if max_age_hours else None
+            counts = load_cache_records(read_snapshot(request.stream, since))
+    except (SnapshotError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except (OSError, requests.RequestException) as e:
+        return jsonify({'success': False, 'error': f'Could not read snapshot: {e}'}), 502
+    return jsonify({'success': True, **counts})
+
+
+# ============== App Factory ==============
+def create_app(config=None, preload=False):
+    """
+    Build the Flask app around the `api` blueprint.
+    
+    Importing this module only defines things; the log listener, route map and
+    startup cache warm-up (CACHE_WARM_FROM) are set up here, and the upstream
+    session and lookup tables on first use. preload=True builds the tables
+    now as well, so a pre-fork master can share them with its workers.
+    """
+    start = time.perf_counter()
+    configure_logging()
+    flask_app = Flask(__name__)
+    flask_app.config.update(config or {})
+    CORS(flask_app)  # Enable CORS for Flutter web/mobile
+    flask_app.register_blueprint(api)
+    
+    if CACHE_WARM_FROM:
+        try:
+            warm_cache_from(CACHE_WARM_FROM, CACHE_WARM_MAX_AGE_HOURS)
+        except (SnapshotError, ValueError, OSError, requests.RequestException) as e:
+            # A cold start is slower, not broken
+            logger.warning("cache warm-up from %s failed: %s", CACHE_WARM_FROM, e, extra={'event': 'cache.snapshot.load_failed'})
+    if preload:
+        ashtakavarga_tables()
+    
+    logger.info("app ready in %.1f ms", (time.perf_counter() - start) * 1000, extra={'event': 'app.ready'})
+    return flask_app
+
+
+_default_app = None
+
+
+def __getattr__(name):
+    """`app.app` builds the default app on first access (scripts, tests, flask run)"""
+    global _default_app
+    if name == 'app':
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
     print("\n" + "=" * 50)
     print("   AstroLearn Chart API Server v3.0.0")
@@ -866,8 +2405,19 @@ if __name__ == '__main__':
     print("  POST /planets          - D1 planetary data")
     print("  GET  /rasi             - Quick D1 chart")
     print("  GET  /navamsa          - Quick D9 chart")
+    print("  GET  /transits         - Current transits (shared)")
+    print("  POST /transits/natal   - Transits over a natal D1")
+    print("  POST /dasha            - Vimshottari dasha periods")
+    print("  POST /dasha/at         - Running dasha at a date")
+    print("  POST /search/placements - Search cached charts")
+    print("  POST /peer/fill        - Peer cache fill (cluster mode)")
+    print("  GET  /admin/cache/snapshot - Export cache snapshot")
+    print("  POST /admin/cache/snapshot - Load cache snapshot")
+    print("  GET  /metrics          - Prometheus metrics")
+    port = int(os.environ.get("PORT", 5000))
     print(f"\nCaching: {CACHE_EXPIRY_HOURS} hours")
-    print("\nStarting server on http://0.0.0.0:5000")
+    print(f"\nStarting development server on http://0.0.0.0:{port}")
+    print("(production: gunicorn -c gunicorn.conf.py wsgi:app)")
     print("=" * 50 + "\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=port, debug=os.environ.get("FLASK_DEBUG", "1") == "1")
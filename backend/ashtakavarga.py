@@ -0,0 +1,218 @@
+"""
+Ashtakavarga and sign-based yoga checks for the AstroLearn backend.
+
+Input is a D1 sign placement: {'As': sign, 'Su': sign, ..., 'Ke': sign} with
+signs 1-12, as produced by extract_positions_from_svg (planet_signs plus
+ascendant_sign) or /planets (current_sign).
+
+Bhinnashtakavarga: every contributor (7 grahas + ascendant) in a given sign
+adds one bindu to a fixed set of signs in each graha's table (BPHS). Those
+contributions are precomputed per (contributor, sign) as one integer holding
+7 x 12 byte-wide counters, so a whole chart is the sum of 8 table lookups
+and the BAV/SAV tables are read straight out of its bytes (no lane can carry:
+at most 8 bindus per BAV cell, 56 per SAV cell).
+
+Yogas are bit tests on 12-bit sign-occupancy masks against precomputed
+house-from-sign masks.
+"""
+
+GRAHAS = ('Su', 'Mo', 'Ma', 'Me', 'Ju', 'Ve', 'Sa')
+CONTRIBUTORS = GRAHAS + ('As',)
+GRAHA_NAMES = {
+    'Su': 'Sun', 'Mo': 'Moon', 'Ma': 'Mars', 'Me': 'Mercury',
+    'Ju': 'Jupiter', 'Ve': 'Venus', 'Sa': 'Saturn',
+}
+
+# BINDUS[graha][contributor] = houses, counted from the contributor's sign,
+# that receive a bindu in graha's Bhinnashtakavarga (BPHS ch. 66)
+BINDUS = {
+    'Su': {
+        'Su': (1, 2, 4, 7, 8, 9, 10, 11), 'Mo': (3, 6, 10, 11), 'Ma': (1, 2, 4, 7, 8, 9, 10, 11),
+        'Me': (3, 5, 6, 9, 10, 11, 12), 'Ju': (5, 6, 9, 11), 'Ve': (6, 7, 12),
+        'Sa': (1, 2, 4, 7, 8, 9, 10, 11), 'As': (3, 4, 6, 10, 11, 12),
+    },
+    'Mo': {
+        'Su': (3, 6, 7, 8, 10, 11), 'Mo': (1, 3, 6, 7, 10, 11), 'Ma': (2, 3, 5, 6, 9, 10, 11),
+        'Me': (1, 3, 4, 5, 7, 8, 10, 11), 'Ju': (1, 4, 7, 8, 10, 11, 12), 'Ve': (3, 4, 5, 7, 9, 10, 11),
+        'Sa': (3, 5, 6, 11), 'As': (3, 6, 10, 11),
+    },
+    'Ma': {
+        'Su': (3, 5, 6, 10, 11), 'Mo': (3, 6, 11), 'Ma': (1, 2, 4, 7, 8, 10, 11),
+        'Me': (3, 5, 6, 11), 'Ju': (6, 10, 11, 12), 'Ve': (6, 8, 11, 12),
+        'Sa': (1, 4, 7, 8, 9, 10, 11), 'As': (1, 3, 6, 10, 11),
+    },
+    'Me': {
+        'Su': (5, 6, 9, 11, 12), 'Mo': (2, 4, 6, 8, 10, 11), 'Ma': (1, 2, 4, 7, 8, 9, 10, 11),
+        'Me': (1, 3, 5, 6, 9, 10, 11, 12), 'Ju': (6, 8, 11, 12), 'Ve': (1, 2, 3, 4, 5, 8, 9, 11),
+        'Sa': (1, 2, 4, 7, 8, 9, 10, 11), 'As': (1, 2, 4, 6, 8, 10, 11),
+    },
+    'Ju': {
+        'Su': (1, 2, 3, 4, 7, 8, 9, 10, 11), 'Mo': (2, 5, 7, 9, 11), 'Ma': (1, 2, 4, 7, 8, 10, 11),
+        'Me': (1, 2, 4, 5, 6, 9, 10, 11), 'Ju': (1, 2, 3, 4, 7, 8, 10, 11), 'Ve': (2, 5, 6, 9, 10, 11),
+        'Sa': (3, 5, 6, 12), 'As': (1, 2, 4, 5, 6, 7, 9, 10, 11),
+    },
+    'Ve': {
+        'Su': (8, 11, 12), 'Mo': (1, 2, 3, 4, 5, 8, 9, 11, 12), 'Ma': (3, 5, 6, 9, 11, 12),
+        'Me': (3, 5, 6, 9, 11), 'Ju': (5, 8, 9, 10, 11), 'Ve': (1, 2, 3, 4, 5, 8, 9, 10, 11),
+        'Sa': (3, 4, 5, 8, 9, 10, 11), 'As': (1, 2, 3, 4, 5, 8, 9, 11),
+    },
+    'Sa': {
+        'Su': (1, 2, 4, 7, 8, 10, 11), 'Mo': (3, 6, 11), 'Ma': (3, 5, 6, 10, 11, 12),
+        'Me': (6, 8, 9, 10, 11, 12), 'Ju': (5, 6, 11, 12), 'Ve': (6, 11, 12),
+        'Sa': (3, 5, 6, 11), 'As': (1, 3, 4, 6, 10, 11),
+    },
+}
+
+LANE_BITS = 8
+TABLE_BYTES = len(GRAHAS) * 12
+_SAV_MASK = (1 << (12 * LANE_BITS)) - 1
+
+
+def _sign_from(sign, house):
+    """Sign (1-12) that is `house` houses from `sign`"""
+    return (sign + house - 2) % 12 + 1
+
+
+def _build_contributions():
+    """contributor -> 13-slot list (index = contributor's sign) of packed bindu counters"""
+    table = {}
+    for contributor in CONTRIBUTORS:
+        row = [0] * 13
+        for sign in range(1, 13):
+            packed = 0
+            for lane, graha in enumerate(GRAHAS):
+                for house in BINDUS[graha][contributor]:
+                    target = _sign_from(sign, house)
+                    packed |= 1 << ((lane * 12 + target - 1) * LANE_BITS)
+            row[sign] = packed
+        table[contributor] = row
+    return table
+
+
+_contributions = None
+
+
+def contributions():
+    """The packed contribution table, built on first use"""
+    global _contributions
+    if _contributions is None:
+        _contributions = _build_contributions()
+    return _contributions
+
+
+def ashtakavarga(signs):
+    """
+    {'bav': {graha name: [bindus in Aries..Pisces]}, 'sav': [...], 'sav_total': int},
+    or None if the ascendant or one of the seven grahas is missing.
+    """
+    # Row index 0 (and negative indexes) would silently read the table
+    if any(signs.get(c) not in _VALID_SIGNS for c in CONTRIBUTORS):
+        return None
+    table = _contributions or contributions()
+    total = sum(table[c][signs[c]] for c in CONTRIBUTORS)
+    sav = 0
+    for lane in range(len(GRAHAS)):
+        sav += (total >> (lane * 12 * LANE_BITS)) & _SAV_MASK
+    counts = total.to_bytes(TABLE_BYTES, 'little')
+    sav_counts = list(sav.to_bytes(12, 'little'))
+    return {
+        'bav': {GRAHA_NAMES[g]: list(counts[i * 12:(i + 1) * 12]) for i, g in enumerate(GRAHAS)},
+        'sav': sav_counts,
+        'sav_total': sum(sav_counts),
+    }
+
+
+def ashtakavarga_reference(signs):
+    """Straightforward nested-loop version of ashtakavarga(), kept for benchmarks and cross-checks"""
+    if any(signs.get(c) not in range(1, 13) for c in CONTRIBUTORS):
+        return None
+    bav = {}
+    for graha in GRAHAS:
+        row = [0] * 12
+        for contributor in CONTRIBUTORS:
+            for house in BINDUS[graha][contributor]:
+                row[_sign_from(signs[contributor], house) - 1] += 1
+        bav[GRAHA_NAMES[graha]] = row
+    sav = [sum(row[i] for row in bav.values()) for i in range(12)]
+    return {'bav': bav, 'sav': sav, 'sav_total': sum(sav)}
+
+
+# ============== Yogas ==============
+
+def _houses_mask(houses):
+    """sign -> 12-bit mask of the signs `houses` away from it (index 0 unused)"""
+    table = [0] * 13
+    for sign in range(1, 13):
+        for house in houses:
+            table[sign] |= 1 << (_sign_from(sign, house) - 1)
+    return table
+
+
+KENDRA = _houses_mask((1, 4, 7, 10))
+SECOND = _houses_mask((2,))
+TWELFTH = _houses_mask((12,))
+TENTH = _houses_mask((10,))
+SIX_SEVEN_EIGHT = _houses_mask((6, 7, 8))
+FIRST_TO_SEVENTH = _houses_mask(range(1, 8))
+
+
+SIGN_BIT = [0] + [1 << i for i in range(12)]
+_VALID_SIGNS = frozenset(range(1, 13))
+
+
+def _signs_mask(*signs):
+    mask = 0
+    for sign in signs:
+        mask |= 1 << (sign - 1)
+    return mask
+
+
+# Own and exaltation signs, for the Pancha Mahapurusha yogas
+DIGNITY = {
+    'Ma': _signs_mask(1, 8, 10),
+    'Me': _signs_mask(3, 6),
+    'Ju': _signs_mask(9, 12, 4),
+    'Ve': _signs_mask(2, 7, 12),
+    'Sa': _signs_mask(10, 11, 7),
+}
+MAHAPURUSHA = {'Ma': 'Ruchaka', 'Me': 'Bhadra', 'Ju': 'Hamsa', 'Ve': 'Malavya', 'Sa': 'Sasa'}
+
+
+def yogas(signs):
+    """{yoga name: bool} for common sign-based yogas; None unless the ascendant and all seven grahas are placed"""
+    if any(signs.get(body) not in _VALID_SIGNS for body in CONTRIBUTORS):
+        return None
+    asc, sun, moon = signs['As'], signs['Su'], signs['Mo']
+    bit = {body: SIGN_BIT[sign] for body, sign in signs.items() if sign in _VALID_SIGNS}
+    get = bit.get
+
+    tara = get('Ma', 0) | get('Me', 0) | get('Ju', 0) | get('Ve', 0) | get('Sa', 0)  # no Sun, Moon or nodes
+    grahas = tara | bit['Su'] | bit['Mo']
+    from_moon_2, from_moon_12 = SECOND[moon] & tara, TWELFTH[moon] & tara
+    from_sun_2, from_sun_12 = SECOND[sun] & tara, TWELFTH[sun] & tara
+    benefics = get('Me', 0) | get('Ju', 0) | get('Ve', 0)
+    adhi = SIX_SEVEN_EIGHT[moon]
+    rahu, ketu = signs.get('Ra'), signs.get('Ke')
+
+    result = {
+        'Gajakesari': bool(get('Ju', 0) & KENDRA[moon]),
+        'Budhaditya': bool(bit['Su'] & get('Me', 0)),
+        'Chandra-Mangala': bool(bit['Mo'] & get('Ma', 0)),
+        'Guru-Chandala': bool(get('Ju', 0) & (get('Ra', 0) | get('Ke', 0))),
+        'Sunapha': bool(from_moon_2) and not from_moon_12,
+        'Anapha': bool(from_moon_12) and not from_moon_2,
+        'Durudhura': bool(from_moon_2 and from_moon_12),
+        'Kemadruma': not (from_moon_2 or from_moon_12),
+        'Vesi': bool(from_sun_2) and not from_sun_12,
+        'Vasi': bool(from_sun_12) and not from_sun_2,
+        'Ubhayachari': bool(from_sun_2 and from_sun_12),
+        'Adhi': bool(get('Me', 0) & adhi and get('Ju', 0) & adhi and get('Ve', 0) & adhi),
+        'Amala': bool(benefics & TENTH[asc]),
+        'Kala Sarpa': rahu in _VALID_SIGNS and ketu in _VALID_SIGNS and (
+            not grahas & ~FIRST_TO_SEVENTH[rahu] or not grahas & ~FIRST_TO_SEVENTH[ketu]
+        ),
+    }
+    kendra = KENDRA[asc]
+    for body, name in MAHAPURUSHA.items():
+        result[name] = bool(get(body, 0) & DIGNITY[body] & kendra)
+    return result
@@ -0,0 +1,131 @@
+"""
+Response encoding benchmark: jsonify vs the compact MessagePack/CBOR bodies.
+
+Builds real /kundali/full (every division) and /charts/batch responses
+through the test client from caches seeded with the recorded corpus in
+fixtures/upstream/, so no upstream call is made. For each encoding it
+reports encode and decode time per response, body size and gzip size.
+Compact decode includes restoring the JSON document (CompactCodec.decode);
+unpack is the format alone, for consumers that read the compact fields.
+
+    python benchmarks/bench_encoding.py
+    python benchmarks/bench_encoding.py --output encoding.json --min-time 0.5
+"""
+
+import argparse
+import gzip
+import json
+import platform
+import sys
+import time
+
+from flask import jsonify
+
+from bench_hot_paths import BIRTH, FIXTURES_DIR, load_corpus, measure
+
+import app  # noqa: E402  (bench_hot_paths has set up the import path)
+import compact_encoding  # noqa: E402
+
+BATCH_CHARTS = ['d1', 'd9', 'd10']
+
+
+def seed_caches(svgs, planet_outputs):
+    """Every division's chart plus /planets output for BIRTH, from the corpus"""
+    for i, chart_type in enumerate(app.CHART_ENDPOINTS):
+        app.set_cached_chart(app.get_cache_key(chart_type, BIRTH), svgs[i % len(svgs)], chart_type)
+    app.PLANET_CACHE[app.get_planet_cache_key(BIRTH)] = app.PlanetCacheEntry(planet_outputs[0])
+
+
+def build_documents(flask_app):
+    client = flask_app.test_client()
+    birth = {k: v for k, v in BIRTH.items() if k != 'divisions'}
+    documents = {
+        'kundali_full': client.post('/kundali/full', json=birth).get_json(),
+        'charts_batch': client.post('/charts/batch', json={**birth, 'charts': BATCH_CHARTS}).get_json(),
+    }
+    for name, document in documents.items():
+        if not document.get('success'):
+            raise SystemExit(f'{name}: could not build a response from the corpus: {document}')
+    return birth, documents
+
+
+def build_cases(flask_app, birth, document):
+    """encoding -> (encode fn, decode fn, unpack fn) for one response document"""
+    codec = app.COMPACT_CODEC
+    svg_blobs = app.cached_svg_blobs(birth, document.get('divisions') or document.get('charts'))
+
+    def json_encode():
+        with flask_app.app_context():
+            return jsonify(document).get_data()
+
+    cases = {'json': (json_encode, json.loads, json.loads)}
+    for fmt in compact_encoding.available_formats():
+        for svg_mode in compact_encoding.SVG_MODES:
+            content_type = compact_encoding.content_type(fmt, svg_mode)
+            blobs = svg_blobs if svg_mode == 'zlib' else None
+            cases[f'{fmt}/svg={svg_mode}'] = (
+                lambda fmt=fmt, svg_mode=svg_mode, blobs=blobs: codec.encode(document, fmt, svg_mode, blobs),
+                lambda data, content_type=content_type: codec.decode(data, content_type),
+                lambda data, fmt=fmt: compact_encoding.loads(data, fmt),
+            )
+    return cases
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark compact response encodings against jsonify')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per repeat')
+    parser.add_argument('--output', help='write results JSON here')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not compact_encoding.available_formats():
+        raise SystemExit('Neither msgpack nor cbor2 is installed (pip install msgpack cbor2)')
+    svgs, planet_outputs = load_corpus(args.fixtures)
+    flask_app = app.create_app()
+    seed_caches(svgs, planet_outputs)
+    birth, documents = build_documents(flask_app)
+
+    results = {}
+    for doc_name, document in documents.items():
+        print(f"\n{doc_name}")
+        print(f"{'encoding':<20}{'encode us':>11}{'decode us':>11}{'unpack us':>11}{'bytes':>9}{'gzip':>8}"
+              f"{'encode':>8}{'decode':>8}{'size':>7}")
+        results[doc_name] = {}
+        for name, (encode, decode, unpack) in build_cases(flask_app, birth, document).items():
+            data = encode()
+            if decode(data) != document:
+                raise SystemExit(f'{doc_name} {name}: decoded body differs from the JSON document')
+            result = {
+                'encode_us': measure(encode, args.repeat, args.min_time)['best_us'],
+                'decode_us': measure(lambda: decode(data), args.repeat, args.min_time)['best_us'],
+                'unpack_us': measure(lambda: unpack(data), args.repeat, args.min_time)['best_us'],
+                'bytes': len(data),
+                'gzip_bytes': len(gzip.compress(data, compresslevel=6)),
+            }
+            results[doc_name][name] = result
+            base = results[doc_name]['json']
+            print(f"{name:<20}{result['encode_us']:>11,.1f}{result['decode_us']:>11,.1f}{result['unpack_us']:>11,.1f}"
+                  f"{result['bytes']:>9,}{result['gzip_bytes']:>8,}"
+                  f"{base['encode_us'] / result['encode_us']:>7.1f}x{base['decode_us'] / result['decode_us']:>7.1f}x"
+                  f"{result['bytes'] / base['bytes']:>7.0%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'corpus': {'svgs': len(svgs), 'planet_outputs': len(planet_outputs)},
+                    'timestamp': int(time.time()),
+                },
+                'results': results,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Microbenchmarks for the per-request CPU hot paths in app.py.
+
+Runs each case over the corpus in fixtures/upstream/ (chart SVGs for several
+divisions and births, and /planets output), reports ops/sec, saves the results as JSON and compares
+them with a stored baseline.
+
+    python benchmarks/bench_hot_paths.py                      # compare with baseline
+    python benchmarks/bench_hot_paths.py --save-baseline      # refresh the baseline
+    python benchmarks/bench_hot_paths.py --output results.json --threshold 0.2
+
+Cases are compared on median time per op. Exits with status 1 if any case is
+slower than baseline by more than --threshold, or by more than the case's own
+median-vs-best spread when that is wider.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BACKEND_DIR, 'fixtures', 'upstream')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline_hot_paths.json')
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import app  # noqa: E402
+import ashtakavarga  # noqa: E402
+
+BIRTH = {
+    "year": 2003, "month": 11, "date": 22,
+    "hours": 13, "minutes": 30, "seconds": 0,
+    "latitude": 14.82, "longitude": 74.1359,
+    "timezone": 5.5, "ayanamsha": "lahiri",
+    "divisions": ["d1", "d9", "d10"],
+}
+
+# Sign placements per op for the ashtakavarga/yoga cases (they are batch workloads)
+CHART_BATCH = 1000
+
+
+def random_placements(count, seed=0):
+    """Deterministic D1 sign placements, Ketu opposite Rahu"""
+    rng = random.Random(seed)
+    charts = []
+    for _ in range(count):
+        signs = {body: rng.randint(1, 12) for body in ashtakavarga.CONTRIBUTORS + ('Ra',)}
+        signs['Ke'] = (signs['Ra'] + 5) % 12 + 1
+        charts.append(signs)
+    return charts
+
+
+def load_corpus(fixtures_dir=FIXTURES_DIR):
+    """Recorded chart SVGs and /planets outputs"""
+    svgs, planet_outputs = [], []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.svg'))):
+        with open(path, encoding='utf-8-sig') as f:
+            svgs.append(f.read())
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            body = json.load(f)
+        output = body.get('output', body) if isinstance(body, dict) else body
+        if isinstance(output, str) and '<svg' in output:
+            svgs.append(output)
+        elif isinstance(output, list):
+            planet_outputs.append(output)
+    if not svgs or not planet_outputs:
+        raise SystemExit(f'Corpus in {fixtures_dir} needs at least one SVG and one /planets output')
+    return svgs, planet_outputs
+
+
+def build_cases(svgs, planet_outputs):
+    """name -> zero-arg callable that runs one 'op' over the corpus"""
+    degrees = [
+        planet['fullDegree']
+        for output in planet_outputs
+        for item in output if isinstance(item, dict)
+        for planet in item.values() if isinstance(planet, dict) and 'fullDegree' in planet
+    ]
+    packed = [app.PackedPositions.from_dict(app.extract_positions_from_svg(svg)) for svg in svgs]
+    payload = app.create_payload(BIRTH)
+    placements = random_placements(CHART_BATCH)
+
+    def extract_positions():
+        for svg in svgs:
+            app.extract_positions_from_svg(svg)
+
+    def packed_positions_to_dict():
+        for positions in packed:
+            positions.to_dict()
+
+    def nakshatras():
+        for degree in degrees:
+            app.calculate_nakshatra(degree)
+
+    def d1_planets():
+        for output in planet_outputs:
+            app.build_d1_planets(output)
+
+    def ashtakavarga_bitset():
+        for signs in placements:
+            ashtakavarga.ashtakavarga(signs)
+
+    def ashtakavarga_nested_loop():
+        for signs in placements:
+            ashtakavarga.ashtakavarga_reference(signs)
+
+    def yogas():
+        for signs in placements:
+            ashtakavarga.yogas(signs)
+
+    return {
+        'extract_positions_from_svg': extract_positions,
+        'packed_positions_to_dict': packed_positions_to_dict,
+        'calculate_nakshatra': nakshatras,
+        'generate_chart_id': lambda: app.generate_chart_id(BIRTH),
+        'get_cache_key': lambda: app.get_cache_key('d9', payload),
+        'create_payload': lambda: app.create_payload(BIRTH),
+        'build_d1_planets': d1_planets,
+        'ashtakavarga_bitset_x1000': ashtakavarga_bitset,
+        'ashtakavarga_nested_loop_x1000': ashtakavarga_nested_loop,
+        'yogas_x1000': yogas,
+    }
+
+
+def measure(fn, repeat, min_time):
+    """Best-of-`repeat` ops/sec, each repeat running for at least `min_time` seconds"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    # Warm up caches (regex, allocator, CPU clocks) before anything is recorded
+    warm_until = time.perf_counter() + min_time
+    while time.perf_counter() < warm_until:
+        timer.timeit(number)
+    while number * (timer.timeit(number) / number) < min_time:
+        number *= 2
+    runs = [timer.timeit(number) / number for _ in range(repeat)]
+    best, median = min(runs), statistics.median(runs)
+    return {
+        'ops_per_sec': round(1.0 / best, 1),
+        'best_us': round(best * 1e6, 3),
+        'median_us': round(median * 1e6, 3),
+        'spread_pct': round((median - best) / best * 100.0, 2),
+        'loops': number,
+    }
+
+
+def median_ops(result):
+    return 1e6 / result['median_us']
+
+
+def compare(results, baseline, threshold):
+    """Return names of cases whose median slowed down beyond `threshold` (fraction)
+
+    A case's allowance widens to its own run-to-run spread (median vs best, in
+    the baseline or this run) when that is larger, so noisy cases are not
+    flagged for jitter the machine already showed.
+    """
+    regressions = []
+    print(f"\n{'case':<30}{'median/sec':>14}{'baseline':>14}{'change':>10}{'allowed':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<30}{median_ops(result):>14,.0f}{'-':>14}{'new':>10}")
+            continue
+        change = median_ops(result) / median_ops(base) - 1.0
+        allowed = max(threshold, base['spread_pct'] / 100.0, result['spread_pct'] / 100.0)
+        flag = '  REGRESSION' if change < -allowed else ''
+        print(f"{name:<30}{median_ops(result):>14,.0f}{median_ops(base):>14,.0f}"
+              f"{change:>+10.1%}{-allowed:>+10.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the per-request CPU hot paths')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per repeat')
+    parser.add_argument('--only', nargs='*', help='run only these cases')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown of the median vs baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    svgs, planet_outputs = load_corpus(args.fixtures)
+    cases = build_cases(svgs, planet_outputs)
+    if args.only:
+        cases = {name: fn for name, fn in cases.items() if name in args.only}
+
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, args.repeat, args.min_time)
+        print(f"{name:<30}{results[name]['ops_per_sec']:>14,.0f} ops/sec  (±{results[name]['spread_pct']}%)")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'corpus': {'svgs': len(svgs), 'planet_outputs': len(planet_outputs)},
+            'timestamp': int(time.time()),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond the allowed slowdown: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
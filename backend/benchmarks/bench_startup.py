@@ -0,0 +1,157 @@
+"""
+Cold-start benchmark: import-to-first-response latency of the backend.
+
+Each run starts a fresh interpreter, so nothing is warm from a previous run.
+
+    in-process   import app -> create_app() -> first GET / through the test client
+    server       spawn `python app.py` (or gunicorn) and poll until GET / answers 200
+
+    python benchmarks/bench_startup.py                         # in-process, 10 runs
+    python benchmarks/bench_startup.py --server --runs 5       # development server
+    python benchmarks/bench_startup.py --server --gunicorn     # pre-fork production launch
+    python benchmarks/bench_startup.py --output startup.json
+
+Reports the median (and min/max) of every phase in milliseconds.
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+# Runs inside the fresh interpreter; prints one JSON line of phase timings
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+response = flask_app.test_client().get('/')
+t3 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_response_ms': (t3 - t2) * 1000,
+    'import_to_response_ms': (t3 - t0) * 1000,
+}))
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    env['FLASK_DEBUG'] = '0'
+    env.pop('CACHE_WARM_FROM', None)
+    return env
+
+
+def run_in_process():
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=child_env(),
+        capture_output=True, text=True, check=True,
+    )
+    timings = json.loads(out.stdout.strip().splitlines()[-1])
+    timings['process_to_response_ms'] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_server(use_gunicorn, workers, timeout=30.0):
+    port = free_port()
+    env = child_env()
+    env['PORT'] = str(port)
+    if use_gunicorn:
+        env['BIND'] = f'127.0.0.1:{port}'
+        env['WEB_CONCURRENCY'] = str(workers)
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        cmd = [sys.executable, 'app.py']
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f'{" ".join(cmd)} exited with status {proc.returncode}')
+            try:
+                if requests.get(f'http://127.0.0.1:{port}/', timeout=1).status_code == 200:
+                    return {'process_to_response_ms': (time.perf_counter() - start) * 1000}
+            except requests.RequestException:
+                pass
+            time.sleep(0.005)
+        raise SystemExit(f'No response from {" ".join(cmd)} within {timeout:g}s')
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def summarize(runs):
+    return {
+        phase: {
+            'median': round(statistics.median(run[phase] for run in runs), 1),
+            'min': round(min(run[phase] for run in runs), 1),
+            'max': round(max(run[phase] for run in runs), 1),
+        }
+        for phase in runs[0]
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure import-to-first-response latency')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--server', action='store_true', help='time a real server process instead')
+    parser.add_argument('--gunicorn', action='store_true', help='with --server: launch via gunicorn.conf.py')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers (default 2)')
+    parser.add_argument('--output', help='write results JSON here')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.server:
+        mode = 'gunicorn' if args.gunicorn else 'dev-server'
+        runs = [run_server(args.gunicorn, args.workers) for _ in range(args.runs)]
+    else:
+        mode = 'in-process'
+        runs = [run_in_process() for _ in range(args.runs)]
+
+    summary = summarize(runs)
+    print(f"{mode}, {args.runs} runs")
+    print(f"{'phase':<26}{'median ms':>12}{'min':>10}{'max':>10}")
+    for phase, stats in summary.items():
+        print(f"{phase:<26}{stats['median']:>12.1f}{stats['min']:>10.1f}{stats['max']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'mode': mode,
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'timestamp': int(time.time()),
+                },
+                'results': summary,
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Seed chart SVGs for fixtures/upstream/ when no live recording is available.
+
+Draws South Indian charts in the layout and markup of the recorded
+d2-chart-svg-code.svg (same grid, text nodes and cell offsets), with
+placements from ephemeris.compute_planets. Retrograde grahas are written as
+"(Ju)" as upstream does. Uranus/Neptune/Pluto are not drawn, since the local
+ephemeris does not compute them.
+
+The seed birth's D1, D9 and D10 are written under their endpoint names, so
+mock_upstream.py serves them. The other births are written as
+sample-<date>-<division>.svg and only feed the benchmark corpus.
+
+    python benchmarks/make_svg_fixtures.py
+"""
+
+import argparse
+import os
+import re
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BACKEND_DIR, 'fixtures', 'upstream')
+TEMPLATE = 'd2-chart-svg-code.svg'
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from app import CHART_ENDPOINTS, PLANET_ABBREVIATIONS, SOUTH_SIGN_GRID  # noqa: E402
+from ephemeris import compute_planets  # noqa: E402
+
+# (label, birth in create_payload() form); the first is the seed birth of planets.json
+BIRTHS = [
+    ('seed', {'year': 2003, 'month': 11, 'date': 22, 'hours': 13, 'minutes': 30, 'seconds': 0,
+              'latitude': 14.82, 'longitude': 74.1359, 'timezone': 5.5}),
+    ('2022-08-11', {'year': 2022, 'month': 8, 'date': 11, 'hours': 6, 'minutes': 0, 'seconds': 0,
+                    'latitude': 17.38333, 'longitude': 78.4666, 'timezone': 5.5}),
+    ('1987-04-10', {'year': 1987, 'month': 4, 'date': 10, 'hours': 7, 'minutes': 0, 'seconds': 0,
+                    'latitude': 28.6139, 'longitude': 77.2090, 'timezone': 5.5}),
+    ('1995-12-25', {'year': 1995, 'month': 12, 'date': 25, 'hours': 23, 'minutes': 45, 'seconds': 0,
+                    'latitude': 19.0760, 'longitude': 72.8777, 'timezone': 5.5}),
+]
+SEED_DIVISIONS = ('d1', 'd9', 'd10')
+SAMPLE_DIVISIONS = ('d1', 'd9')
+
+TITLES = {'d1': 'Birth Chart', 'd9': 'Navamsa D9 Chart', 'd10': 'Dasamsa D10 Chart'}
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Text offsets inside a 100px cell, in the order upstream fills them
+CELL_SLOTS = [(x, y) for y in (20, 45, 70, 95) for x in (5, 40, 70)]
+SIGN_CELLS = {sign: (row, col) for row, cells in enumerate(SOUTH_SIGN_GRID) for col, sign in enumerate(cells) if sign}
+
+TEXT_NODE = '<text font-size="21px"  x="{x}" y="{y}" style="fill:#2A3D45;"  font-family="Roboto">{label}</text>'
+CAPTION_NODE = ('<text  font-family="Roboto" font-size="{size}px" style="fill:#{color};" x="50%" y="{y}%" '
+                'dominant-baseline="middle" text-anchor="middle">{text}</text>')
+
+
+def division_sign(longitude, division):
+    """Sign (1-12) of a sidereal longitude in D1, D9 (continuous navamsa) or D10 (Parashara dasamsa)"""
+    sign_index = int(longitude // 30)
+    if division == 'd1':
+        return sign_index + 1
+    if division == 'd9':
+        return int(longitude // (30.0 / 9)) % 12 + 1
+    if division == 'd10':
+        part = int((longitude % 30) // 3)
+        start = sign_index if sign_index % 2 == 0 else sign_index + 8  # odd signs from themselves, even from the 9th
+        return (start + part) % 12 + 1
+    raise ValueError(f'No rule for {division}')
+
+
+def placements(birth, division):
+    """[(label, sign)] with the ascendant first, then the grahas in /planets order"""
+    payload = {**birth, 'config': {'observation_point': 'topocentric', 'ayanamsha': 'lahiri'}}
+    out = []
+    for item in compute_planets(payload):
+        for planet in item.values():
+            label = PLANET_ABBREVIATIONS[planet['name']]
+            if label == 'As':
+                label = 'Asc'
+            elif planet['isRetro'] == 'true' and label not in ('Ra', 'Ke'):
+                label = f'({label})'
+            out.append((label, division_sign(planet['fullDegree'], division)))
+    return out
+
+
+def caption(birth):
+    offset = birth['timezone']
+    return [
+        f"{MONTHS[birth['month'] - 1]} {birth['date']}, {birth['year']}",
+        f"{birth['hours']}:{birth['minutes']}:{birth['seconds']} ({int(offset)}:{round(offset % 1 * 60):02d} EAST)",
+        f"{int(birth['longitude'])} E {round(birth['longitude'] % 1 * 60)}, "
+        f"{int(birth['latitude'])} N {round(birth['latitude'] % 1 * 60)}",
+    ]
+
+
+def render(template, birth, division):
+    frame = template[:template.index('<text')]
+    used = {}
+    nodes = []
+    for label, sign in placements(birth, division):
+        row, col = SIGN_CELLS[sign]
+        x, y = CELL_SLOTS[used.get(sign, 0)]
+        used[sign] = used.get(sign, 0) + 1
+        nodes.append(TEXT_NODE.format(x=col * 100 + x, y=row * 100 + y, label=label))
+    nodes.append(CAPTION_NODE.format(size=25, color='A5243D', y=30, text=TITLES[division]))
+    for line, y in zip(caption(birth), (60, 65, 70)):
+        nodes.append(CAPTION_NODE.format(size=15, color='2A3D45', y=y, text=line))
+    return frame + ''.join(nodes) + '</g></svg>'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write seed chart SVGs for fixtures/upstream/')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(args.fixtures, TEMPLATE), encoding='utf-8-sig') as f:
+        template = f.read()
+    if not re.search(r'<text\b', template):
+        raise SystemExit(f'{TEMPLATE} has no text nodes to take the layout from')
+
+    for label, birth in BIRTHS:
+        seed = label == 'seed'
+        for division in SEED_DIVISIONS if seed else SAMPLE_DIVISIONS:
+            name = CHART_ENDPOINTS[division] if seed else f'sample-{label}-{division}'
+            path = os.path.join(args.fixtures, f'{name}.svg')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(render(template, birth, division))
+            print(f'wrote {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
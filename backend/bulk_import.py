@@ -0,0 +1,494 @@
+"""
+Resumable bulk import of birth records for the AstroLearn backend.
+
+Streams birth records from CSV or JSONL, drops duplicates by canonical birth
+key, and for each record fetches D1 planetary data plus the requested
+divisional charts through the same fetch_chart_svg / fetch_planetary_data
+(and caches) the API uses. Results are streamed to JSONL, CSV or Parquet
+(one column per field).
+
+Upstream calls are throttled to the API key quota: before a record is
+processed its cache misses are counted and that many tokens are taken from a
+per-minute bucket sized to quota x number of keys. That bucket, the caches
+and the upstream priority queue all belong to this process, so a running
+server neither sees these calls nor gets ahead of them; keep --per-key-rpm
+well below the quota the server needs. With --server URL, records go through
+that server's /kundali/full instead, as bulk-class work behind its
+interactive requests, on its caches and quota.
+
+Every record is appended to a checkpoint file once it is on disk, so an
+interrupted run restarted with the same arguments skips what is already
+written and does not repeat its upstream calls. JSONL and CSV rows are on
+disk as soon as they are written; Parquet rows once their batch file is
+(--batch-size). The caches live in this process only, so records of an
+unwritten batch cost their upstream calls again on resume. Records that
+failed go to <output>.errors.jsonl and are retried on the next run.
+
+    python bulk_import.py --input people.csv --output charts.jsonl --divisions d1 d9 d10
+    python bulk_import.py --input people.jsonl --output charts.parquet --per-key-rpm 30
+    python bulk_import.py --input people.csv --output charts.jsonl --server http://localhost:5000
+
+Input fields: year, month, date, hours, minutes, seconds, latitude, longitude,
+timezone, and optionally ayanamsha, observation_point and an id column
+(--id-field) that is copied to the output.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import requests  # noqa: E402
+
+import app  # noqa: E402
+
+REQUIRED_FIELDS = ('year', 'month', 'date', 'hours', 'minutes', 'latitude', 'longitude', 'timezone')
+OUTPUT_FORMATS = ('jsonl', 'csv', 'parquet')
+PROGRESS_EVERY = 100
+# Bulk calls may queue on the server for as long as interactive traffic lasts
+SERVER_TIMEOUT = 600
+
+
+class QuotaLimiter:
+    """Token bucket refilled at `per_minute` tokens/minute (0 = unlimited)"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 6.0)  # at most ~10 s worth of burst
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count):
+        if self.per_minute <= 0 or count <= 0:
+            return
+        # A request larger than the bucket is admitted once the bucket is full
+        count = min(count, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_minute / 60.0)
+                self._updated = now
+                if self._tokens >= count:
+                    self._tokens -= count
+                    return
+                shortfall = count - self._tokens
+            time.sleep(shortfall * 60.0 / self.per_minute)
+
+
+def read_records(path, input_format):
+    """
+    Stream (row number, record dict, error) tuples. A line that cannot be
+    parsed comes back as (row number, None, message) so the run goes on.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if input_format == 'csv':
+            for row_number, row in enumerate(csv.DictReader(f), start=1):
+                yield row_number, {k.strip(): v.strip() for k, v in row.items() if k and v not in (None, '')}, None
+        else:
+            for row_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield row_number, None, f'invalid JSON: {e}'
+                    continue
+                if not isinstance(record, dict):
+                    yield row_number, None, 'record is not a JSON object'
+                    continue
+                yield row_number, record, None
+
+
+def normalize_record(record):
+    """Record -> flat, typed birth data as create_payload() reads it; raises ValueError"""
+    missing = [field for field in REQUIRED_FIELDS if field not in record]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    payload = app.create_payload(record)
+    return {**{k: v for k, v in payload.items() if k != 'config'}, **payload['config']}
+
+
+def upstream_calls_needed(data, divisions):
+    """Upstream calls a record will cost given what is already cached"""
+    now = time.time()
+    calls = 0
+    for division in divisions:
+        entry = app.CHART_CACHE.get(app.get_cache_key(division, data))
+        if entry is None or not entry.is_fresh(now):
+            calls += 1
+    if app.EPHEMERIS_MODE != 'local':
+        entry = app.PLANET_CACHE.get(app.get_planet_cache_key(data))
+        if entry is None or not entry.is_fresh(now):
+            calls += 1
+    return calls
+
+
+def process_record(data, divisions, include_svg):
+    """Fetch and extract one birth record; returns (result dict, errors dict)"""
+    errors = {}
+    divisions_result = {}
+    for division in divisions:
+        result = app.fetch_chart_svg(app.CHART_ENDPOINTS[division], data, chart_type=division)
+        if not result['success']:
+            errors[division] = result.get('error', 'Unknown error')
+            continue
+        positions = app.get_chart_positions(app.get_cache_key(division, data), result['svg'])
+        divisions_result[division] = {
+            'ascendant_sign': positions['ascendant_sign'],
+            'planet_signs': positions['planet_signs'],
+            'extraction_status': positions['extraction_status'],
+        }
+        if include_svg:
+            divisions_result[division]['svg'] = result['svg']
+
+    d1_planets = {}
+    planet_result = app.fetch_planetary_data(data)
+    if planet_result['success']:
+        d1_planets, _ = app.build_d1_planets(planet_result['output'])
+    else:
+        errors['planets'] = planet_result.get('error', 'Unknown error')
+    return {'divisions': divisions_result, 'd1_planets': d1_planets}, errors
+
+
+_sessions = threading.local()
+
+
+def server_session():
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def process_record_remote(server, data, divisions, include_svg):
+    """process_record() through a running server's /kundali/full, queued there as bulk work"""
+    body = {**data, 'divisions': divisions}
+    while True:
+        try:
+            response = server_session().post(
+                f'{server}/kundali/full', json=body, timeout=SERVER_TIMEOUT,
+                headers={app.UPSTREAM_PRIORITY_HEADER: 'bulk'},
+            )
+        except requests.RequestException as e:
+            return {'divisions': {}, 'd1_planets': {}}, {'server': str(e)}
+        if response.status_code != 503:
+            break
+        # Shed by admission control: come back when the server says to
+        try:
+            retry_after = float(response.headers.get('Retry-After', 1))
+        except ValueError:
+            retry_after = 1.0
+        time.sleep(max(retry_after, 0.1))
+    try:
+        document = response.json()
+    except ValueError:
+        document = None
+    if response.status_code != 200 or not isinstance(document, dict):
+        return {'divisions': {}, 'd1_planets': {}}, {'server': f'HTTP {response.status_code}'}
+
+    errors = dict(document.get('errors') or {})
+    divisions_result = {}
+    for division, chart in (document.get('divisions') or {}).items():
+        divisions_result[division] = {
+            'ascendant_sign': chart.get('ascendant_sign'),
+            'planet_signs': chart.get('planet_signs'),
+            'extraction_status': chart.get('extraction_status'),
+        }
+        if include_svg:
+            divisions_result[division]['svg'] = chart.get('svg')
+    d1_planets = document.get('d1_planets') or {}
+    if not d1_planets:
+        errors['planets'] = 'Planetary data unavailable'
+    return {'divisions': divisions_result, 'd1_planets': d1_planets}, errors
+
+
+def flatten_row(row, divisions):
+    """One scalar column per field, same columns for every row"""
+    record_id = row.get('id')
+    flat = {'key': row['key'], 'id': None if record_id is None else str(record_id)}
+    for field in REQUIRED_FIELDS + ('seconds', 'ayanamsha'):
+        flat[field] = row['birth'].get(field)
+    for name in app.PLANET_ABBREVIATIONS:
+        planet = row['d1_planets'].get(name, {})
+        flat[f'{name}_degree'] = planet.get('fullDegree')
+        flat[f'{name}_sign'] = planet.get('sign')
+        flat[f'{name}_nakshatra'] = planet.get('nakshatra')
+        flat[f'{name}_pada'] = planet.get('nakshatra_pada')
+        flat[f'{name}_retro'] = str(planet.get('isRetro')).lower() == 'true' if planet else None
+    for division in divisions:
+        chart = row['divisions'].get(division, {})
+        flat[f'{division}_As'] = chart.get('ascendant_sign')
+        for body in app.VALID_PLANETS:
+            flat[f'{division}_{body}'] = chart.get('planet_signs', {}).get(body)
+    return flat
+
+
+# Writers return the keys of rows that are now on disk from write() and close(),
+# so only those get checkpointed.
+
+class JsonlWriter:
+    def __init__(self, path, divisions):
+        self._f = open(path, 'a', encoding='utf-8')
+
+    def write(self, row):
+        self._f.write(json.dumps(row, separators=(',', ':')) + '\n')
+        self._f.flush()
+        return [row['key']]
+
+    def close(self):
+        self._f.close()
+        return []
+
+
+class CsvWriter:
+    def __init__(self, path, divisions):
+        self.divisions = divisions
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, 'a', newline='', encoding='utf-8')
+        columns = list(flatten_row({'key': '', 'birth': {}, 'd1_planets': {}, 'divisions': {}}, divisions))
+        self._writer = csv.DictWriter(self._f, fieldnames=columns)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(flatten_row(row, self.divisions))
+        self._f.flush()
+        return [row['key']]
+
+    def close(self):
+        self._f.close()
+        return []
+
+
+class ParquetWriter:
+    """
+    Buffers flattened rows and writes each `batch_size` rows as a complete
+    Parquet file: <output>, then <base>.part1<ext>, <base>.part2<ext>, ...
+    A Parquet file cannot be read back before its footer is written, so rows
+    only count as on disk once their file is.
+    """
+
+    def __init__(self, path, divisions, batch_size=500):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit('Parquet output needs pyarrow (pip install pyarrow)')
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self.divisions = divisions
+        self.batch_size = batch_size
+        self.path = path
+        self._base, self._ext = os.path.splitext(path)
+        self._part = 0
+        self._rows = []
+        self._schema = self._build_schema(divisions)
+
+    def _next_path(self):
+        # Parquet files cannot be appended to: every batch (and resumed run) takes the next free part
+        path = self.path
+        while os.path.exists(path):
+            self._part += 1
+            path = f'{self._base}.part{self._part}{self._ext}'
+        return path
+
+    def _build_schema(self, divisions):
+        pa = self._pa
+        columns = flatten_row({'key': '', 'birth': {}, 'd1_planets': {}, 'divisions': {}}, divisions)
+        fields = []
+        for name in columns:
+            if name in ('key', 'id', 'ayanamsha') or name.endswith('_nakshatra'):
+                kind = pa.string()
+            elif name in ('latitude', 'longitude', 'timezone') or name.endswith('_degree'):
+                kind = pa.float64()
+            elif name.endswith('_retro'):
+                kind = pa.bool_()
+            else:
+                kind = pa.int64()
+            fields.append(pa.field(name, kind))
+        return pa.schema(fields)
+
+    def write(self, row):
+        self._rows.append(flatten_row(row, self.divisions))
+        if len(self._rows) >= self.batch_size:
+            return self._flush()
+        return []
+
+    def _flush(self):
+        if not self._rows:
+            return []
+        table = self._pa.Table.from_pylist(self._rows, schema=self._schema)
+        path = self._next_path()
+        # Written aside and renamed, so a crash never leaves a truncated part behind
+        self._pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        keys = [row['key'] for row in self._rows]
+        self._rows = []
+        return keys
+
+    def close(self):
+        return self._flush()
+
+
+WRITERS = {'jsonl': JsonlWriter, 'csv': CsvWriter, 'parquet': ParquetWriter}
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def guess_format(path, choices):
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    return 'jsonl' if ext in ('json', 'ndjson') else ext if ext in choices else None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import birth records into charts (resumable)')
+    parser.add_argument('--input', required=True, help='CSV or JSONL birth records')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS)
+    parser.add_argument('--checkpoint', help='default: <output>.checkpoint')
+    parser.add_argument('--divisions', nargs='+', default=['d1', 'd9'])
+    parser.add_argument('--id-field', default='id', help='input field copied to the output as "id"')
+    parser.add_argument('--include-svg', action='store_true', help='keep chart SVGs in JSONL output')
+    parser.add_argument('--concurrency', type=int, default=max(1, len(app.API_KEYS)))
+    parser.add_argument('--per-key-rpm', type=float, default=10.0,
+                        help='upstream calls per minute allowed per API key (0 = unlimited). This process '
+                             'has its own quota and queue, so leave room for the server\'s traffic')
+    parser.add_argument('--server', help='base URL of a running server: fetch through it as bulk work '
+                                         '(its caches, quota and priority queue) instead of in-process')
+    parser.add_argument('--limit', type=int, default=0, help='stop after this many new records (0 = all)')
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='Parquet rows per output file. Resume skips only records in written files; '
+                             'the rest of an unfinished batch is fetched upstream again, since the '
+                             'caches do not outlive the process')
+    args = parser.parse_args(argv)
+
+    args.input_format = args.input_format or guess_format(args.input, ('csv', 'jsonl'))
+    args.output_format = args.output_format or guess_format(args.output, OUTPUT_FORMATS)
+    if args.input_format is None or args.output_format is None:
+        parser.error('cannot tell the file format from the extension; pass --input-format/--output-format')
+    args.divisions = [d.lower() for d in args.divisions]
+    unknown = [d for d in args.divisions if d not in app.CHART_ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown divisions: {', '.join(unknown)}")
+    if args.include_svg and args.output_format != 'jsonl':
+        parser.error('--include-svg only applies to JSONL output')
+    args.checkpoint = args.checkpoint or f'{args.output}.checkpoint'
+    if args.server:
+        args.server = args.server.rstrip('/')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app.configure_logging()
+    done = load_checkpoint(args.checkpoint)
+    limiter = QuotaLimiter(args.per_key_rpm * max(1, len(app.API_KEYS)))
+    if args.output_format == 'parquet':
+        writer = ParquetWriter(args.output, args.divisions, batch_size=args.batch_size)
+    else:
+        writer = WRITERS[args.output_format](args.output, args.divisions)
+    checkpoint = open(args.checkpoint, 'a', encoding='utf-8')
+    errors_out = open(f'{args.output}.errors.jsonl', 'a', encoding='utf-8')
+    output_lock = threading.Lock()
+
+    stats = {'read': 0, 'duplicates': 0, 'resumed': 0, 'invalid': 0, 'written': 0, 'failed': 0, 'upstream_calls': 0}
+    seen = set()
+    started = time.perf_counter()
+
+    def write_checkpoint(keys):
+        if keys:
+            checkpoint.write(''.join(key + '\n' for key in keys))
+            checkpoint.flush()
+
+    def run(row_number, record_id, key, data):
+        if args.server:
+            # The server meters its own quota; it does not report upstream calls
+            calls = 0
+            result, errors = process_record_remote(args.server, data, args.divisions, args.include_svg)
+        else:
+            calls = upstream_calls_needed(data, args.divisions)
+            limiter.acquire(calls)
+            # Pool threads start with the default (interactive) class, so set it per record
+            with app.UPSTREAM_QUEUE.priority('bulk'):
+                result, errors = process_record(data, args.divisions, args.include_svg)
+        row = {'key': key, 'id': record_id, 'birth': data, **result}
+        with output_lock:
+            stats['upstream_calls'] += calls
+            if errors:
+                stats['failed'] += 1
+                errors_out.write(json.dumps({'row': row_number, 'key': key, 'id': record_id, 'errors': errors}) + '\n')
+                errors_out.flush()
+                return
+            write_checkpoint(writer.write(row))
+            stats['written'] += 1
+            if stats['written'] % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{stats['written']} written, {stats['failed']} failed, "
+                      f"{stats['written'] / elapsed:.1f} records/s, {stats['upstream_calls']} upstream calls")
+
+    pending = set()
+    submitted = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for row_number, record, error in read_records(args.input, args.input_format):
+                stats['read'] += 1
+                if error is None:
+                    try:
+                        data = normalize_record(record)
+                    except (ValueError, TypeError) as e:
+                        error = str(e)
+                if error is not None:
+                    with output_lock:
+                        stats['invalid'] += 1
+                        errors_out.write(json.dumps({'row': row_number, 'errors': {'input': error}}) + '\n')
+                        errors_out.flush()
+                    continue
+                key = app.generate_chart_id(app.create_payload(data))
+                if key in seen:
+                    stats['duplicates'] += 1
+                    continue
+                seen.add(key)
+                if key in done:
+                    stats['resumed'] += 1
+                    continue
+                if args.limit and submitted >= args.limit:
+                    break
+
+                # Keep the input streaming: never more than 2x concurrency records in flight
+                while len(pending) >= args.concurrency * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                pending.add(pool.submit(run, row_number, record.get(args.id_field), key, data))
+                submitted += 1
+            for future in pending:
+                future.result()
+    except KeyboardInterrupt:
+        print('\nInterrupted; finished records are checkpointed, rerun the same command to resume')
+    finally:
+        write_checkpoint(writer.close())
+        checkpoint.close()
+        errors_out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nread {stats['read']}  written {stats['written']}  failed {stats['failed']}  "
+          f"invalid {stats['invalid']}  duplicates {stats['duplicates']}  already done {stats['resumed']}")
+    print(f"upstream calls {stats['upstream_calls']}  elapsed {elapsed:.1f} s")
+    return 0 if not stats['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Binary snapshots of CHART_CACHE / PLANET_CACHE for warming new nodes.
+
+A snapshot is a 6-byte header followed by one record per cache entry:
+
+    kind (1 byte) | timestamp (int64) | key length (uint16) | blob length (uint32)
+    | positions length (uint16) | raw text node count (uint16)
+    | key (utf-8) | blob | positions
+
+The blob is the entry's zlib data exactly as it is held in memory
+(ChartCacheEntry.svg_z / PlanetCacheEntry.data_z), so neither export nor
+import recompresses anything. `positions` is the PackedPositions byte string
+of a chart whose SVG has already been parsed (empty otherwise).
+
+Usage, against a running node started with ADMIN_TOKEN set:
+    python cache_snapshot.py save --url http://node-a:5000 --output cache.snap --max-age-hours 48
+    python cache_snapshot.py info cache.snap
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+import requests
+
+MAGIC = b'ALCS'
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION, 0])
+
+KIND_CHART = 1
+KIND_PLANET = 2
+
+RECORD = struct.Struct('<BqHIHH')
+CHUNK_BYTES = 64 * 1024
+
+
+class SnapshotError(ValueError):
+    """Input is not a readable cache snapshot"""
+
+
+def encode_record(kind, key, timestamp, blob, positions=b'', raw_text_node_count=0):
+    key_bytes = key.encode('utf-8')
+    positions = positions or b''
+    return b''.join((
+        RECORD.pack(kind, timestamp, len(key_bytes), len(blob), len(positions), raw_text_node_count),
+        key_bytes, blob, positions,
+    ))
+
+
+def iter_chunks(records):
+    """HEADER + encoded records, batched into ~64 KiB chunks for streaming"""
+    buffer = bytearray(HEADER)
+    for record in records:
+        buffer += encode_record(*record)
+        if len(buffer) >= CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            raise SnapshotError('Snapshot is truncated')
+        data += more
+    return data
+
+
+def read_snapshot(stream, since=None):
+    """
+    Yield (kind, key, timestamp, blob, positions, raw_text_node_count) from a
+    binary stream, skipping records older than `since` (epoch seconds).
+    """
+    header = stream.read(len(HEADER))
+    if len(header) < len(HEADER) or header[:4] != MAGIC:
+        raise SnapshotError('Not a cache snapshot')
+    if header[4] != VERSION:
+        raise SnapshotError(f'Unsupported snapshot version {header[4]}')
+    while True:
+        head = stream.read(RECORD.size)
+        if not head:
+            return
+        if len(head) < RECORD.size:
+            head += _read_exact(stream, RECORD.size - len(head))
+        kind, timestamp, key_len, blob_len, positions_len, raw_count = RECORD.unpack(head)
+        body = _read_exact(stream, key_len + blob_len + positions_len)
+        if since is not None and timestamp < since:
+            continue
+        yield (
+            kind,
+            body[:key_len].decode('utf-8'),
+            timestamp,
+            body[key_len:key_len + blob_len],
+            body[key_len + blob_len:],
+            raw_count,
+        )
+
+
+def open_source(source, timeout=60, headers=None):
+    """Readable binary stream for a snapshot file path or http(s) URL"""
+    if source.startswith(('http://', 'https://')):
+        response = requests.get(source, stream=True, timeout=timeout, headers=headers or {})
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return response.raw
+    return open(source, 'rb')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Save or inspect AstroLearn cache snapshots')
+    sub = parser.add_subparsers(dest='command', required=True)
+    save = sub.add_parser('save', help='Download a snapshot from a running node')
+    save.add_argument('--url', required=True, help='Base URL of the node, e.g. http://localhost:5000')
+    save.add_argument('--output', required=True)
+    save.add_argument('--max-age-hours', type=float, help='Only entries cached within this many hours')
+    save.add_argument('--no-positions', action='store_true', help='Leave out extracted positions')
+    save.add_argument('--token', default=os.environ.get('ADMIN_TOKEN', ''))
+    info = sub.add_parser('info', help='Summarize a snapshot file')
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'save':
+        params = {'positions': '0' if args.no_positions else '1'}
+        if args.max_age_hours is not None:
+            params['max_age_hours'] = args.max_age_hours
+        response = requests.get(
+            f"{args.url.rstrip('/')}/admin/cache/snapshot", params=params, stream=True,
+            headers={'X-Admin-Token': args.token}, timeout=60,
+        )
+        response.raise_for_status()
+        written = 0
+        with open(args.output, 'wb') as out:
+            for chunk in response.iter_content(CHUNK_BYTES):
+                out.write(chunk)
+                written += len(chunk)
+        print(f'{written} bytes -> {args.output}')
+        return 0
+
+    counts = {KIND_CHART: 0, KIND_PLANET: 0}
+    with_positions = 0
+    oldest = newest = None
+    with open(args.path, 'rb') as stream:
+        for kind, _, timestamp, _, positions, _ in read_snapshot(stream):
+            counts[kind] = counts.get(kind, 0) + 1
+            with_positions += bool(positions)
+            oldest = timestamp if oldest is None else min(oldest, timestamp)
+            newest = timestamp if newest is None else max(newest, timestamp)
+    print(f'charts: {counts[KIND_CHART]} ({with_positions} with positions), planets: {counts[KIND_PLANET]}')
+    if oldest is not None:
+        now = time.time()
+        print(f'age: {(now - newest) / 3600:.1f}h newest, {(now - oldest) / 3600:.1f}h oldest')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
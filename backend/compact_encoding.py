@@ -0,0 +1,212 @@
+"""
+Compact binary encodings (MessagePack, CBOR) for high-volume API consumers.
+
+/kundali/full and /charts/batch answer in one of these formats when the
+Accept header prefers it over JSON:
+
+    Accept: application/msgpack        (also application/x-msgpack, application/vnd.msgpack)
+    Accept: application/cbor
+    Accept: application/msgpack; svg=raw
+
+The document keeps the JSON response's field names and nesting; only these
+values change form:
+
+    svg                 zlib-compressed UTF-8 bytes, or plain UTF-8 bytes with svg=raw
+    planet_signs        [sign of Su, Mo, Ma, Me, Ju, Ve, Sa, Ra, Ke], 0 = not extracted
+    planets_in_houses   12 lists of planet indexes into the list above, house 1 first
+    house_signs         12 sign numbers, house 1 first (0 = unknown)
+
+The response Content-Type carries the svg form (e.g. `application/cbor;
+svg=zlib`), and CompactCodec.decode() turns a body back into the JSON
+document. msgpack and cbor2 are optional: a format whose library is not
+installed is not offered, and those clients get JSON.
+"""
+
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+MEDIA_TYPES = {
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+    'application/cbor': 'cbor',
+}
+CONTENT_TYPES = {'msgpack': 'application/msgpack', 'cbor': 'application/cbor'}
+SVG_MODES = ('zlib', 'raw')
+
+# Containers whose entries carry an svg (and, for /kundali/full, positions)
+CHART_CONTAINERS = ('divisions', 'charts')
+
+# JSON keys of the per-house maps, house 1 first
+HOUSE_KEYS = tuple(str(house) for house in range(1, 13))
+
+# Accept entries that mean "JSON is fine": anything ranked below them loses
+_JSON_TYPES = ('application/json', 'application/*', '*/*')
+
+
+def available_formats():
+    return tuple(fmt for fmt, lib in (('msgpack', msgpack), ('cbor', cbor2)) if lib is not None)
+
+
+def _media_params(params):
+    """'svg=raw; x=1' -> {'svg': 'raw', 'x': '1'}"""
+    result = {}
+    for part in params.split(';'):
+        name, _, value = part.partition('=')
+        if value:
+            result[name.strip().lower()] = value.strip().strip('"').lower()
+    return result
+
+
+def negotiate(accept):
+    """
+    (format, svg mode) for the client's most preferred compact media type, or
+    None when JSON ranks at least as high or no offered format is acceptable.
+    `accept` is a parsed Accept header of (value, quality) pairs; equal
+    qualities keep their order (werkzeug puts more specific types first).
+    """
+    offered = available_formats()
+    for value, quality in sorted(accept, key=lambda item: item[1], reverse=True):
+        if quality <= 0:
+            continue
+        mimetype, _, params = value.partition(';')
+        mimetype = mimetype.strip().lower()
+        if mimetype in _JSON_TYPES:
+            return None
+        fmt = MEDIA_TYPES.get(mimetype)
+        if fmt in offered:
+            svg_mode = _media_params(params).get('svg', 'zlib')
+            return fmt, svg_mode if svg_mode in SVG_MODES else 'zlib'
+    return None
+
+
+def content_type(fmt, svg_mode):
+    return f'{CONTENT_TYPES[fmt]}; svg={svg_mode}'
+
+
+def parse_content_type(value):
+    """'application/cbor; svg=raw' -> ('cbor', 'raw')"""
+    mimetype, _, params = value.partition(';')
+    fmt = MEDIA_TYPES.get(mimetype.strip().lower())
+    if fmt is None:
+        raise ValueError(f'Not a compact media type: {value}')
+    return fmt, _media_params(params).get('svg', 'zlib')
+
+
+def dumps(obj, fmt):
+    if fmt == 'msgpack':
+        return msgpack.packb(obj, use_bin_type=True)
+    return cbor2.dumps(obj)
+
+
+def loads(data, fmt):
+    """Compact bytes -> the document as sent (svg bytes, integer arrays)"""
+    if fmt == 'msgpack':
+        return msgpack.unpackb(data, raw=False)
+    return cbor2.loads(data)
+
+
+class CompactCodec:
+    """
+    Compact form of API response documents.
+
+    `planets` fixes the planet index order (VALID_PLANETS) and `sign_names`
+    the names restored for house signs on decode.
+    """
+
+    def __init__(self, planets, sign_names):
+        self.planets = list(planets)
+        self.sign_names = list(sign_names)
+        self._planet_index = {name: i for i, name in enumerate(self.planets)}
+
+    def compact_chart(self, chart, svg_mode, svg_blob=None):
+        """
+        Copy of one divisions/charts entry in compact form. `svg_blob` is the
+        svg already zlib-compressed (a CHART_CACHE entry), used in zlib mode.
+        """
+        out = dict(chart)
+        svg = chart.get('svg')
+        if isinstance(svg, str):
+            if svg_mode == 'raw':
+                out['svg'] = svg.encode('utf-8')
+            else:
+                out['svg'] = svg_blob if svg_blob is not None else zlib.compress(svg.encode('utf-8'))
+        if 'planet_signs' in chart:
+            signs = [0] * len(self.planets)
+            for name, sign in chart['planet_signs'].items():
+                signs[self._planet_index[name]] = sign
+            out['planet_signs'] = signs
+        if 'planets_in_houses' in chart:
+            index = self._planet_index
+            houses = chart['planets_in_houses']
+            # Most houses are empty; skip the inner loop for those
+            out['planets_in_houses'] = [
+                [index[name] for name in houses[key]] if houses[key] else [] for key in HOUSE_KEYS
+            ]
+        if 'house_signs' in chart:
+            house_signs = chart['house_signs']
+            out['house_signs'] = [house_signs[key]['sign_number'] for key in HOUSE_KEYS]
+        return out
+
+    def expand_chart(self, chart, svg_mode):
+        """Inverse of compact_chart()"""
+        out = dict(chart)
+        svg = chart.get('svg')
+        if isinstance(svg, bytes):
+            out['svg'] = (svg if svg_mode == 'raw' else zlib.decompress(svg)).decode('utf-8')
+        if 'planet_signs' in chart:
+            out['planet_signs'] = {
+                self.planets[i]: sign for i, sign in enumerate(chart['planet_signs']) if sign
+            }
+        if 'planets_in_houses' in chart:
+            out['planets_in_houses'] = {
+                key: [self.planets[i] for i in indexes] if indexes else []
+                for key, indexes in zip(HOUSE_KEYS, chart['planets_in_houses'])
+            }
+        if 'house_signs' in chart:
+            out['house_signs'] = {
+                key: {
+                    'sign_number': sign,
+                    'sign_name': self.sign_names[sign - 1] if sign > 0 else 'Unknown',
+                }
+                for key, sign in zip(HOUSE_KEYS, chart['house_signs'])
+            }
+        return out
+
+    def compact(self, body, svg_mode='zlib', svg_blobs=None):
+        """Compact copy of a response document; svg_blobs maps chart key -> zlib svg"""
+        out = dict(body)
+        for container in CHART_CONTAINERS:
+            charts = body.get(container)
+            if isinstance(charts, dict):
+                out[container] = {
+                    key: self.compact_chart(chart, svg_mode, (svg_blobs or {}).get(key))
+                    for key, chart in charts.items()
+                }
+        return out
+
+    def expand(self, body, svg_mode='zlib'):
+        out = dict(body)
+        for container in CHART_CONTAINERS:
+            charts = body.get(container)
+            if isinstance(charts, dict):
+                out[container] = {key: self.expand_chart(chart, svg_mode) for key, chart in charts.items()}
+        return out
+
+    def encode(self, body, fmt, svg_mode='zlib', svg_blobs=None):
+        """Response document -> compact bytes in `fmt` ('msgpack' or 'cbor')"""
+        return dumps(self.compact(body, svg_mode, svg_blobs), fmt)
+
+    def decode(self, data, content_type):
+        """Compact bytes + their Content-Type -> the JSON response document"""
+        fmt, svg_mode = parse_content_type(content_type)
+        return self.expand(loads(data, fmt), svg_mode)
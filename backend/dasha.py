@@ -0,0 +1,150 @@
+"""
+Vimshottari dasha timelines for the AstroLearn backend.
+
+Every level of the Vimshottari tree splits its parent in the same fixed
+proportions (lord years / 120, starting from the parent's own lord), so the
+split of each lord is precomputed once as offset/length fractions. Sub-periods
+are then generated on demand: walking to a given depth only touches the
+branches that are asked for, and the running period at a date is found by a
+bisect per level instead of building the tree.
+
+Times are UTC epoch seconds internally; a dasha year is 365.2425 days.
+"""
+
+import bisect
+from datetime import datetime, timezone
+
+DASHA_LORDS = ('Ketu', 'Venus', 'Sun', 'Moon', 'Mars', 'Rahu', 'Jupiter', 'Saturn', 'Mercury')
+DASHA_YEARS = {
+    'Ketu': 7, 'Venus': 20, 'Sun': 6, 'Moon': 10, 'Mars': 7,
+    'Rahu': 18, 'Jupiter': 16, 'Saturn': 19, 'Mercury': 17,
+}
+TOTAL_YEARS = 120
+YEAR_SECONDS = 365.2425 * 86400.0
+
+LEVEL_NAMES = ('mahadasha', 'antardasha', 'pratyantardasha', 'sookshma', 'prana')
+MAX_DEPTH = len(LEVEL_NAMES)
+
+
+def _build_tables():
+    """lord -> (sub-lords in order, start offsets as fractions of the parent, lengths as fractions)"""
+    tables = {}
+    for i, lord in enumerate(DASHA_LORDS):
+        sequence = DASHA_LORDS[i:] + DASHA_LORDS[:i]
+        lengths = tuple(DASHA_YEARS[sub] / TOTAL_YEARS for sub in sequence)
+        offsets, total = [], 0.0
+        for length in lengths:
+            offsets.append(total)
+            total += length
+        tables[lord] = (sequence, tuple(offsets), lengths)
+    return tables
+
+
+SUB_PERIODS = _build_tables()
+
+
+def _iso(seconds):
+    return datetime.fromtimestamp(round(seconds), tz=timezone.utc).isoformat()
+
+
+class DashaPeriod:
+    """One node of the tree; children are derived, never stored"""
+
+    __slots__ = ('lords', 'start', 'length')
+
+    def __init__(self, lords, start, length):
+        self.lords = lords      # tuple from mahadasha lord down to this period's lord
+        self.start = start      # epoch seconds
+        self.length = length    # seconds
+
+    @property
+    def lord(self):
+        return self.lords[-1]
+
+    @property
+    def level(self):
+        return len(self.lords)
+
+    @property
+    def end(self):
+        return self.start + self.length
+
+    def children(self):
+        sequence, offsets, lengths = SUB_PERIODS[self.lord]
+        for sub, offset, length in zip(sequence, offsets, lengths):
+            yield DashaPeriod(self.lords + (sub,), self.start + offset * self.length, length * self.length)
+
+    def child_at(self, seconds):
+        sequence, offsets, lengths = SUB_PERIODS[self.lord]
+        i = max(0, bisect.bisect_right(offsets, (seconds - self.start) / self.length) - 1)
+        # The fraction can round across a boundary; settle it on the starts children() reports
+        if i + 1 < len(offsets) and self.start + offsets[i + 1] * self.length <= seconds:
+            i += 1
+        elif i > 0 and self.start + offsets[i] * self.length > seconds:
+            i -= 1
+        return DashaPeriod(self.lords + (sequence[i],), self.start + offsets[i] * self.length, lengths[i] * self.length)
+
+    def to_dict(self):
+        return {
+            'level': self.level,
+            'level_name': LEVEL_NAMES[self.level - 1],
+            'lord': self.lord,
+            'lords': list(self.lords),
+            'start': _iso(self.start),
+            'end': _iso(self.end),
+            'years': round(self.length / YEAR_SECONDS, 6),
+        }
+
+
+class VimshottariTimeline:
+    """
+    The 120-year mahadasha sequence for one birth.
+
+    `birth_lord` is the lord of the Moon's nakshatra and `elapsed` the fraction
+    of that nakshatra the Moon had already traversed at birth, so the first
+    mahadasha began `elapsed * years` before birth.
+    """
+
+    def __init__(self, birth_lord, elapsed, birth_seconds):
+        self.birth_lord = birth_lord
+        self.elapsed = elapsed
+        self.birth_seconds = birth_seconds
+
+        first = DASHA_LORDS.index(birth_lord)
+        start = birth_seconds - elapsed * DASHA_YEARS[birth_lord] * YEAR_SECONDS
+        self.mahadashas = []
+        for lord in DASHA_LORDS[first:] + DASHA_LORDS[:first]:
+            length = DASHA_YEARS[lord] * YEAR_SECONDS
+            self.mahadashas.append(DashaPeriod((lord,), start, length))
+            start += length
+        self._starts = [period.start for period in self.mahadashas]
+
+    @property
+    def balance_years(self):
+        """Years of the first mahadasha still to run at birth"""
+        return (1.0 - self.elapsed) * DASHA_YEARS[self.birth_lord]
+
+    def walk(self, depth, start=None, end=None):
+        """
+        Pre-order generator of periods down to `depth`, skipping every
+        subtree that does not overlap [start, end) (epoch seconds, optional).
+        """
+        depth = max(1, min(depth, MAX_DEPTH))
+        stack = list(reversed(self.mahadashas))
+        while stack:
+            period = stack.pop()
+            if (start is not None and period.end <= start) or (end is not None and period.start >= end):
+                continue
+            yield period
+            if period.level < depth:
+                stack.extend(reversed(list(period.children())))
+
+    def running(self, seconds, depth=3):
+        """Chain of periods (mahadasha first) running at `seconds`, or [] outside the 120 years"""
+        i = bisect.bisect_right(self._starts, seconds) - 1
+        if i < 0 or seconds >= self.mahadashas[-1].end:
+            return []
+        chain = [self.mahadashas[i]]
+        for _ in range(max(1, min(depth, MAX_DEPTH)) - 1):
+            chain.append(chain[-1].child_at(seconds))
+        return chain
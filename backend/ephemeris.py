@@ -0,0 +1,439 @@
+"""
+Local ephemeris for the AstroLearn backend.
+
+Computes sidereal longitudes for the nine grahas and the ascendant in-process,
+in the same shape the Free Astrology API /planets endpoint returns, so that
+planetary data does not need an upstream call.
+
+Sources (all published analytical series, no data files):
+    Sun        Meeus, Astronomical Algorithms ch. 25 (low accuracy, ~0.01 deg)
+    Moon       Meeus ch. 47, main periodic terms (~0.01 deg), topocentric via ch. 40
+    Planets    Keplerian elements of date with Jupiter/Saturn perturbations
+               (P. Schlyter, "How to compute planetary positions"), light-time
+               and annual aberration applied (~1-2 arcmin)
+    Nodes      Meeus ch. 47 mean node, true node via its main periodic terms
+    Ascendant  Mean sidereal time (Meeus 12.4) and mean obliquity (22.2)
+    Delta T    Espenak & Meeus polynomial fits
+
+Positions are referred to the mean equinox of date and the selected ayanamsha
+(also a mean value) is subtracted, which is how sidereal positions are
+usually defined (no nutation in either term).
+"""
+
+import math
+
+# Mean ayanamsha at J2000.0 (degrees); precessed with IAU 2006 general precession
+AYANAMSHA_J2000 = {
+    'lahiri': 23.857092,
+    'raman': 22.410791,
+    'krishnamurti': 23.760240,
+    'fagan_bradley': 24.740300,
+    'yukteshwar': 22.478803,
+    'sayana': None,  # tropical
+}
+AYANAMSHA_ALIASES = {'kp': 'krishnamurti', 'fagan': 'fagan_bradley', 'tropical': 'sayana'}
+
+# Order and names as in the upstream /planets output
+GRAHA_ORDER = ['Ascendant', 'Sun', 'Moon', 'Mars', 'Mercury', 'Jupiter', 'Venus', 'Saturn', 'Rahu', 'Ketu']
+
+J2000 = 2451545.0
+EARTH_RADIUS_KM = 6378.14
+ABERRATION_CONSTANT = 20.49552 / 3600.0  # degrees
+LIGHT_DAYS_PER_AU = 0.0057755183
+
+_RAD = math.pi / 180.0
+
+
+def _norm(angle):
+    return angle % 360.0
+
+
+def _sin(deg):
+    return math.sin(deg * _RAD)
+
+
+def _cos(deg):
+    return math.cos(deg * _RAD)
+
+
+def julian_day(year, month, day, hours=0.0):
+    """Julian day for a Gregorian calendar date and UT hour"""
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return (
+        math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1))
+        + day + b - 1524.5 + hours / 24.0
+    )
+
+
+def delta_t_seconds(year):
+    """TT - UT in seconds for a decimal year (Espenak & Meeus fits)"""
+    y = year
+    if y < 1900 or y >= 2150:
+        u = (y - 1820) / 100.0
+        return -20 + 32 * u * u
+    if y < 1920:
+        t = y - 1900
+        return -2.79 + 1.494119 * t - 0.0598939 * t ** 2 + 0.0061966 * t ** 3 - 0.000197 * t ** 4
+    if y < 1941:
+        t = y - 1920
+        return 21.20 + 0.84493 * t - 0.076100 * t ** 2 + 0.0020936 * t ** 3
+    if y < 1961:
+        t = y - 1950
+        return 29.07 + 0.407 * t - t ** 2 / 233 + t ** 3 / 2547
+    if y < 1986:
+        t = y - 1975
+        return 45.45 + 1.067 * t - t ** 2 / 260 - t ** 3 / 718
+    if y < 2005:
+        t = y - 2000
+        return (63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3
+                + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5)
+    if y < 2050:
+        t = y - 2000
+        return 62.92 + 0.32217 * t + 0.005589 * t ** 2
+    return -20 + 32 * ((y - 1820) / 100.0) ** 2 - 0.5628 * (2150 - y)
+
+
+def mean_obliquity(jde):
+    t = (jde - J2000) / 36525.0
+    return 23.439291111 - 0.0130041667 * t - 1.6389e-7 * t * t + 5.0361e-7 * t ** 3
+
+
+def mean_sidereal_time(jd_ut):
+    """Greenwich mean sidereal time in degrees"""
+    t = (jd_ut - J2000) / 36525.0
+    return _norm(280.46061837 + 360.98564736629 * (jd_ut - J2000) + 0.000387933 * t * t - t ** 3 / 38710000.0)
+
+
+def ayanamsha(name, jde):
+    """Mean ayanamsha in degrees (0 for sayana/tropical)"""
+    key = AYANAMSHA_ALIASES.get(name, name)
+    if key not in AYANAMSHA_J2000:
+        raise ValueError(f'Unknown ayanamsha: {name}')
+    base = AYANAMSHA_J2000[key]
+    if base is None:
+        return 0.0
+    t = (jde - J2000) / 36525.0
+    return base + (5028.796195 * t + 1.1054348 * t * t) / 3600.0
+
+
+# ============== Sun ==============
+
+def sun_position(jde):
+    """Geometric (true) longitude and distance in AU of the Sun"""
+    t = (jde - J2000) / 36525.0
+    l0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+    m = 357.52911 + 35999.05029 * t - 0.0001537 * t * t
+    e = 0.016708634 - 0.000042037 * t - 0.0000001267 * t * t
+    c = ((1.914602 - 0.004817 * t - 0.000014 * t * t) * _sin(m)
+         + (0.019993 - 0.000101 * t) * _sin(2 * m)
+         + 0.000289 * _sin(3 * m))
+    v = m + c
+    r = 1.000001018 * (1 - e * e) / (1 + e * _cos(v))
+    return _norm(l0 + c), r
+
+
+# ============== Moon (Meeus ch. 47) ==============
+
+# (D, M, M', F, sum_l coefficient, sum_r coefficient), units 1e-6 deg / 1e-3 km
+_MOON_LR = (
+    (0, 0, 1, 0, 6288774, -20905355), (2, 0, -1, 0, 1274027, -3699111),
+    (2, 0, 0, 0, 658314, -2955968), (0, 0, 2, 0, 213618, -569925),
+    (0, 1, 0, 0, -185116, 48888), (0, 0, 0, 2, -114332, -3149),
+    (2, 0, -2, 0, 58793, 246158), (2, -1, -1, 0, 57066, -152138),
+    (2, 0, 1, 0, 53322, -170733), (2, -1, 0, 0, 45758, -204586),
+    (0, 1, -1, 0, -40923, -129620), (1, 0, 0, 0, -34720, 108743),
+    (0, 1, 1, 0, -30383, 104755), (2, 0, 0, -2, 15327, 10321),
+    (0, 0, 1, 2, -12528, 0), (0, 0, 1, -2, 10980, 79661),
+    (4, 0, -1, 0, 10675, -34782), (0, 0, 3, 0, 10034, -23210),
+    (4, 0, -2, 0, 8548, -21636), (2, 1, -1, 0, -7888, 24208),
+    (2, 1, 0, 0, -6766, 30824), (1, 0, -1, 0, -5163, -8379),
+    (1, 1, 0, 0, 4987, -16675), (2, -1, 1, 0, 4036, -12831),
+    (2, 0, 2, 0, 3994, -10445), (4, 0, 0, 0, 3861, -11650),
+    (2, 0, -3, 0, 3665, 14403), (0, 1, -2, 0, -2689, -7003),
+    (2, 0, -1, 2, -2602, 0), (2, -1, -2, 0, 2390, 10056),
+    (1, 0, 1, 0, -2348, 6322), (2, -2, 0, 0, 2236, -9884),
+    (0, 1, 2, 0, -2120, 5751), (0, 2, 0, 0, -2069, 0),
+    (2, -2, -1, 0, 2048, -4950), (2, 0, 1, -2, -1773, 4130),
+    (2, 0, 0, 2, -1595, 0), (4, -1, -1, 0, 1215, -3958),
+    (0, 0, 2, 2, -1110, 0), (3, 0, -1, 0, -892, 3258),
+    (2, 1, 1, 0, -810, 2616), (4, -1, -2, 0, 759, -1897),
+    (0, 2, -1, 0, -713, -2117), (2, 2, -1, 0, -700, 2354),
+    (2, 1, -2, 0, 691, 0), (2, -1, 0, -2, 596, 0),
+    (4, 0, 1, 0, 549, -1423), (0, 0, 4, 0, 537, -1117),
+    (4, -1, 0, 0, 520, -1571), (1, 0, -2, 0, -487, -1739),
+    (2, 1, 0, -2, -399, 0), (0, 0, 2, -2, -381, -4421),
+    (1, 1, 1, 0, 351, 0), (3, 0, -2, 0, -340, 0),
+    (4, 0, -3, 0, 330, 0), (2, -1, 2, 0, 327, 0),
+    (0, 2, 1, 0, -323, 1165), (1, 1, -1, 0, 299, 0),
+    (2, 0, 3, 0, 294, 0),
+)
+
+# (D, M, M', F, sum_b coefficient)
+_MOON_B = (
+    (0, 0, 0, 1, 5128122), (0, 0, 1, 1, 280602), (0, 0, 1, -1, 277693),
+    (2, 0, 0, -1, 173237), (2, 0, -1, 1, 55413), (2, 0, -1, -1, 46271),
+    (2, 0, 0, 1, 32573), (0, 0, 2, 1, 17198), (2, 0, 1, -1, 9266),
+    (0, 0, 2, -1, 8822), (2, -1, 0, -1, 8216), (2, 0, -2, -1, 4324),
+    (2, 0, 1, 1, 4200), (2, 1, 0, -1, -3359), (2, -1, -1, 1, 2463),
+    (2, -1, 0, 1, 2211), (2, -1, -1, -1, 2065), (0, 1, -1, -1, -1870),
+    (4, 0, -1, -1, 1828), (0, 1, 0, 1, -1794), (0, 0, 0, 3, -1749),
+    (0, 1, -1, 1, -1565), (1, 0, 0, 1, -1491), (0, 1, 1, 1, -1475),
+    (0, 1, 1, -1, -1410), (0, 1, 0, -1, -1344), (1, 0, 0, -1, -1335),
+    (0, 0, 3, 1, 1107), (4, 0, 0, -1, 1021), (4, 0, -1, 1, 833),
+)
+
+
+def _moon_arguments(t):
+    lp = 218.3164477 + 481267.88123421 * t - 0.0015786 * t * t + t ** 3 / 538841 - t ** 4 / 65194000
+    d = 297.8501921 + 445267.1114034 * t - 0.0018819 * t * t + t ** 3 / 545868 - t ** 4 / 113065000
+    m = 357.5291092 + 35999.0502909 * t - 0.0001536 * t * t + t ** 3 / 24490000
+    mp = 134.9633964 + 477198.8675055 * t + 0.0087414 * t * t + t ** 3 / 69699 - t ** 4 / 14712000
+    f = 93.2720950 + 483202.0175233 * t - 0.0036539 * t * t - t ** 3 / 3526000 + t ** 4 / 863310000
+    return lp, d, m, mp, f
+
+
+def moon_position(jde):
+    """Geocentric longitude, latitude (degrees) and distance (km) of the Moon"""
+    t = (jde - J2000) / 36525.0
+    lp, d, m, mp, f = _moon_arguments(t)
+    e = 1 - 0.002516 * t - 0.0000074 * t * t
+    e_factor = (1.0, e, e * e)
+
+    sum_l = sum_r = sum_b = 0.0
+    for cd, cm, cmp, cf, coeff_l, coeff_r in _MOON_LR:
+        arg = (cd * d + cm * m + cmp * mp + cf * f) * _RAD
+        scale = e_factor[abs(cm)]
+        sum_l += coeff_l * scale * math.sin(arg)
+        if coeff_r:
+            sum_r += coeff_r * scale * math.cos(arg)
+    for cd, cm, cmp, cf, coeff_b in _MOON_B:
+        arg = (cd * d + cm * m + cmp * mp + cf * f) * _RAD
+        sum_b += coeff_b * e_factor[abs(cm)] * math.sin(arg)
+
+    a1 = 119.75 + 131.849 * t
+    a2 = 53.09 + 479264.290 * t
+    a3 = 313.45 + 481266.484 * t
+    sum_l += 3958 * _sin(a1) + 1962 * _sin(lp - f) + 318 * _sin(a2)
+    sum_b += (-2235 * _sin(lp) + 382 * _sin(a3) + 175 * _sin(a1 - f)
+              + 175 * _sin(a1 + f) + 127 * _sin(lp - mp) - 115 * _sin(lp + mp))
+
+    return _norm(lp + sum_l / 1e6), sum_b / 1e6, 385000.56 + sum_r / 1000.0
+
+
+def lunar_nodes(jde, node_type='mean'):
+    """Longitude of Rahu (ascending node); Ketu is opposite"""
+    t = (jde - J2000) / 36525.0
+    node = 125.0445479 - 1934.1362891 * t + 0.0020754 * t * t + t ** 3 / 467441 - t ** 4 / 60616000
+    if node_type == 'true':
+        _, d, m, mp, f = _moon_arguments(t)
+        node += (-1.4979 * _sin(2 * (d - f)) - 0.1500 * _sin(m) - 0.1226 * _sin(2 * d)
+                 + 0.1176 * _sin(2 * f) - 0.0801 * _sin(2 * (mp - f)))
+    return _norm(node)
+
+
+def topocentric_moon(lon, lat, distance_km, jd_ut, jde, geo_lat, geo_lon, height_m=0.0):
+    """Correct the Moon's ecliptic longitude for parallax at an observer (Meeus ch. 40)"""
+    eps = mean_obliquity(jde)
+    # Ecliptic -> equatorial
+    ra = math.atan2(_sin(lon) * _cos(eps) - math.tan(lat * _RAD) * _sin(eps), _cos(lon))
+    dec = math.asin(_sin(lat) * _cos(eps) + _cos(lat) * _sin(eps) * _sin(lon))
+
+    u = math.atan(0.99664719 * math.tan(geo_lat * _RAD))
+    rho_sin = 0.99664719 * math.sin(u) + height_m / 6378140.0 * _sin(geo_lat)
+    rho_cos = math.cos(u) + height_m / 6378140.0 * _cos(geo_lat)
+    sin_par = EARTH_RADIUS_KM / distance_km
+    hour_angle = (mean_sidereal_time(jd_ut) + geo_lon) * _RAD - ra
+
+    denom = math.cos(dec) - rho_cos * sin_par * math.cos(hour_angle)
+    d_ra = math.atan2(-rho_cos * sin_par * math.sin(hour_angle), denom)
+    dec_topo = math.atan2((math.sin(dec) - rho_sin * sin_par) * math.cos(d_ra), denom)
+    ra_topo = ra + d_ra
+
+    # Equatorial -> ecliptic
+    lon_topo = math.atan2(
+        math.sin(ra_topo) * _cos(eps) + math.tan(dec_topo) * _sin(eps),
+        math.cos(ra_topo),
+    )
+    return _norm(lon_topo / _RAD)
+
+
+# ============== Planets (Keplerian elements of date) ==============
+
+# name: (N, N rate, i, i rate, w, w rate, a, a rate, e, e rate, M, M rate); d = days from 2000 Jan 0.0
+_ELEMENTS = {
+    'Mercury': (48.3313, 3.24587e-5, 7.0047, 5.00e-8, 29.1241, 1.01444e-5,
+                0.387098, 0.0, 0.205635, 5.59e-10, 168.6562, 4.0923344368),
+    'Venus': (76.6799, 2.46590e-5, 3.3946, 2.75e-8, 54.8910, 1.38374e-5,
+              0.723330, 0.0, 0.006773, -1.302e-9, 48.0052, 1.6021302244),
+    'Mars': (49.5574, 2.11081e-5, 1.8497, -1.78e-8, 286.5016, 2.92961e-5,
+             1.523688, 0.0, 0.093405, 2.516e-9, 18.6021, 0.5240207766),
+    'Jupiter': (100.4542, 2.76854e-5, 1.3030, -1.557e-7, 273.8777, 1.64505e-5,
+                5.20256, 0.0, 0.048498, 4.469e-9, 19.8950, 0.0830853001),
+    'Saturn': (113.6634, 2.38980e-5, 2.4886, -1.081e-7, 339.3939, 2.97661e-5,
+               9.55475, 0.0, 0.055546, -9.499e-9, 316.9670, 0.0334442282),
+}
+_DAY0 = 2451543.5
+
+
+def _mean_anomaly(name, d):
+    el = _ELEMENTS[name]
+    return el[10] + el[11] * d
+
+
+def _heliocentric(name, d):
+    """Heliocentric ecliptic rectangular coordinates (AU, equinox of date)"""
+    n_, n_rate, i_, i_rate, w_, w_rate, a_, a_rate, e_, e_rate, m_, m_rate = _ELEMENTS[name]
+    node = n_ + n_rate * d
+    incl = i_ + i_rate * d
+    peri = w_ + w_rate * d
+    a = a_ + a_rate * d
+    e = e_ + e_rate * d
+    m = _norm(m_ + m_rate * d) * _RAD
+
+    ecc = m + e * math.sin(m) * (1.0 + e * math.cos(m))
+    for _ in range(6):
+        delta = (ecc - e * math.sin(ecc) - m) / (1.0 - e * math.cos(ecc))
+        ecc -= delta
+        if abs(delta) < 1e-10:
+            break
+    xv = a * (math.cos(ecc) - e)
+    yv = a * math.sqrt(1.0 - e * e) * math.sin(ecc)
+    v = math.atan2(yv, xv) / _RAD
+    r = math.hypot(xv, yv)
+
+    vw = v + peri
+    x = r * (_cos(node) * _cos(vw) - _sin(node) * _sin(vw) * _cos(incl))
+    y = r * (_sin(node) * _cos(vw) + _cos(node) * _sin(vw) * _cos(incl))
+    z = r * _sin(vw) * _sin(incl)
+
+    if name in ('Jupiter', 'Saturn'):
+        mj = _mean_anomaly('Jupiter', d)
+        ms = _mean_anomaly('Saturn', d)
+        lon = math.atan2(y, x) / _RAD
+        lat = math.atan2(z, math.hypot(x, y)) / _RAD
+        if name == 'Jupiter':
+            lon += (-0.332 * _sin(2 * mj - 5 * ms - 67.6) - 0.056 * _sin(2 * mj - 2 * ms + 21)
+                    + 0.042 * _sin(3 * mj - 5 * ms + 21) - 0.036 * _sin(mj - 2 * ms)
+                    + 0.022 * _cos(mj - ms) + 0.023 * _sin(2 * mj - 3 * ms + 52)
+                    - 0.016 * _sin(mj - 5 * ms - 69))
+        else:
+            lon += (0.812 * _sin(2 * mj - 5 * ms - 67.6) - 0.229 * _cos(2 * mj - 4 * ms - 2)
+                    + 0.119 * _sin(mj - 2 * ms - 3) + 0.046 * _sin(2 * mj - 6 * ms - 69)
+                    + 0.014 * _sin(mj - 3 * ms + 32))
+            lat += -0.020 * _cos(2 * mj - 4 * ms - 2) + 0.018 * _sin(2 * mj - 6 * ms - 49)
+        x = r * _cos(lon) * _cos(lat)
+        y = r * _sin(lon) * _cos(lat)
+        z = r * _sin(lat)
+    return x, y, z
+
+
+def planet_longitude(name, jde, sun=None):
+    """Apparent geocentric ecliptic longitude of a planet (mean equinox of date)"""
+    sun_lon, sun_r = sun or sun_position(jde)
+    xs, ys = sun_r * _cos(sun_lon), sun_r * _sin(sun_lon)
+    d = jde - _DAY0
+
+    x, y, z = _heliocentric(name, d)
+    distance = math.sqrt((x + xs) ** 2 + (y + ys) ** 2 + z * z)
+    # Light-time: see the planet where it was when the light left it
+    x, y, z = _heliocentric(name, d - LIGHT_DAYS_PER_AU * distance)
+    xg, yg = x + xs, y + ys
+    lon = math.atan2(yg, xg) / _RAD
+    lat = math.atan2(z, math.hypot(xg, yg))
+    # Annual aberration
+    lon -= ABERRATION_CONSTANT * _cos(sun_lon - lon) / math.cos(lat)
+    return _norm(lon)
+
+
+def ascendant(jd_ut, jde, geo_lat, geo_lon):
+    """Tropical ascendant longitude (mean equinox of date)"""
+    ramc = mean_sidereal_time(jd_ut) + geo_lon
+    eps = mean_obliquity(jde)
+    asc = math.atan2(_cos(ramc), -(_sin(ramc) * _cos(eps) + math.tan(geo_lat * _RAD) * _sin(eps)))
+    return _norm(asc / _RAD)
+
+
+# ============== Chart assembly ==============
+
+def _tropical_longitudes(jd_ut, jde, latitude, longitude, topocentric, node_type):
+    sun_lon, sun_r = sun_position(jde)
+    sun = (sun_lon, sun_r)
+    moon_lon, moon_lat, moon_dist = moon_position(jde)
+    if topocentric:
+        moon_lon = topocentric_moon(moon_lon, moon_lat, moon_dist, jd_ut, jde, latitude, longitude)
+    rahu = lunar_nodes(jde, node_type)
+    return {
+        'Ascendant': ascendant(jd_ut, jde, latitude, longitude),
+        'Sun': _norm(sun_lon - ABERRATION_CONSTANT / sun_r),
+        'Moon': moon_lon,
+        'Mars': planet_longitude('Mars', jde, sun),
+        'Mercury': planet_longitude('Mercury', jde, sun),
+        'Jupiter': planet_longitude('Jupiter', jde, sun),
+        'Venus': planet_longitude('Venus', jde, sun),
+        'Saturn': planet_longitude('Saturn', jde, sun),
+        'Rahu': rahu,
+        'Ketu': _norm(rahu + 180.0),
+    }
+
+
+def _is_retrograde(name, jde, node_type):
+    if name in ('Ascendant', 'Sun', 'Moon'):
+        return False
+    if name in ('Rahu', 'Ketu'):
+        if node_type == 'mean':
+            return True
+        motion = lunar_nodes(jde + 0.5, node_type) - lunar_nodes(jde - 0.5, node_type)
+    else:
+        motion = planet_longitude(name, jde + 0.5) - planet_longitude(name, jde - 0.5)
+    return ((motion + 180.0) % 360.0) - 180.0 < 0
+
+
+def chart_times(payload):
+    """(jd_ut, jde) for an upstream-style payload given in local civil time"""
+    hours = payload['hours'] + payload['minutes'] / 60.0 + payload.get('seconds', 0) / 3600.0
+    jd_ut = julian_day(payload['year'], payload['month'], payload['date'], hours - payload['timezone'])
+    jde = jd_ut + delta_t_seconds(payload['year'] + (payload['month'] - 0.5) / 12.0) / 86400.0
+    return jd_ut, jde
+
+
+def sidereal_longitudes(payload, node_type='mean'):
+    """{graha name: sidereal longitude} for an upstream-style payload"""
+    config = payload.get('config', {})
+    jd_ut, jde = chart_times(payload)
+    topocentric = config.get('observation_point', 'topocentric') == 'topocentric'
+    ayan = ayanamsha(config.get('ayanamsha', 'lahiri'), jde)
+    tropical = _tropical_longitudes(
+        jd_ut, jde, payload['latitude'], payload['longitude'], topocentric, node_type,
+    )
+    return {name: _norm(lon - ayan) for name, lon in tropical.items()}
+
+
+def compute_planets(payload, node_type='mean'):
+    """
+    Planetary data in the shape of the upstream /planets `output`:
+    [{"0": {"name": "Ascendant", ...}}, {"1": {"name": "Sun", ...}}, ...]
+    House numbers are whole-sign houses from the ascendant.
+    """
+    _, jde = chart_times(payload)
+    longitudes = sidereal_longitudes(payload, node_type)
+    asc_sign = int(longitudes['Ascendant'] // 30) + 1
+
+    output = []
+    for index, name in enumerate(GRAHA_ORDER):
+        full_degree = longitudes[name]
+        sign = int(full_degree // 30) + 1
+        planet = {
+            'name': name,
+            'fullDegree': round(full_degree, 6),
+            'normDegree': round(full_degree % 30, 6),
+            'isRetro': 'true' if _is_retrograde(name, jde, node_type) else 'false',
+            'current_sign': sign,
+        }
+        if name != 'Ascendant':
+            planet['house_number'] = ((sign - asc_sign) % 12) + 1
+        output.append({str(index): planet})
+    return output
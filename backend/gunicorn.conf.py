@@ -0,0 +1,26 @@
+"""
+Production launch settings: pre-fork workers sharing a preloaded app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master imports wsgi.py (app factory, lookup tables, CACHE_WARM_FROM
+warm-up) once and forks WEB_CONCURRENCY workers from it. Each worker then
+keeps its own caches, metrics, admission limits and upstream queue, and
+builds its own upstream connection pool on first use; the log listener
+thread is restarted in every worker (see log_config.py).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 16))
+preload_app = True
+
+# Chart fetches can wait on the upstream queue plus UPSTREAM_TIMEOUT
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = None  # per-route latency is in /metrics
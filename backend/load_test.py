@@ -0,0 +1,254 @@
+"""
+End-to-end load test for the AstroLearn backend.
+
+Drives /kundali/full, /charts/batch and /chart/<division> at a fixed
+concurrency and reports p50/p95/p99 latency, throughput and how many
+upstream calls the run cost (read from mock_upstream's /__stats).
+
+Fully offline, spawning the mock upstream and the backend locally:
+    python load_test.py --spawn --scenario mixed --concurrency 16 --requests 2000 --latency-ms 250
+
+Against an already running backend + mock:
+    python load_test.py --app-url http://127.0.0.1:5000 --mock-url http://127.0.0.1:5050
+
+A spawned peer-cache cluster of 3 backends (requests are spread round-robin):
+    python load_test.py --spawn --nodes 3 --scenario kundali_full --births 20
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = ('kundali_full', 'charts_batch', 'chart_division')
+
+BASE_BIRTH = {
+    "year": 2003, "month": 11, "date": 22,
+    "hours": 13, "minutes": 30, "seconds": 0,
+    "latitude": 14.82, "longitude": 74.1359,
+    "timezone": 5.5, "ayanamsha": "lahiri",
+}
+
+
+def birth_record(index):
+    """Distinct, deterministic birth details: index 0..n-1 maps to n unique charts"""
+    return {**BASE_BIRTH, "minutes": index % 60, "hours": (index // 60) % 24, "date": 1 + (index // 1440) % 28}
+
+
+def build_request(scenario, index, args):
+    birth = birth_record(index % args.births)
+    if scenario == 'kundali_full':
+        return 'POST', '/kundali/full', {**birth, "divisions": args.divisions}
+    if scenario == 'charts_batch':
+        return 'POST', '/charts/batch', {**birth, "charts": args.divisions}
+    division = args.divisions[index % len(args.divisions)]
+    return 'POST', f'/chart/{division}', birth
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+def spawn_stack(args):
+    """Start mock upstream + backend(s) as child processes; returns (processes, app_urls, mock_url)"""
+    mock_port = free_port()
+    app_ports = [free_port() for _ in range(args.nodes)]
+    app_urls = [f'http://127.0.0.1:{port}' for port in app_ports]
+    mock_cmd = [
+        sys.executable, 'mock_upstream.py', '--port', str(mock_port),
+        '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+        '--rate-429', str(args.rate_429), '--timeout-rate', str(args.timeout_rate),
+        '--timeout-sleep', str(args.timeout_sleep),
+    ]
+    app_env = {
+        **os.environ,
+        'ASTRO_API_BASE_URL': f'http://127.0.0.1:{mock_port}',
+        'ASTRO_API_KEY_1': 'mock-key-1', 'ASTRO_API_KEY_2': 'mock-key-2', 'ASTRO_API_KEY_3': 'mock-key-3',
+        'UPSTREAM_TIMEOUT': str(args.upstream_timeout),
+        'LOG_LEVEL': 'WARNING',
+    }
+    if args.nodes > 1:
+        app_env['PEER_NODES'] = ','.join(app_urls)
+    devnull = subprocess.DEVNULL
+    processes = [subprocess.Popen(mock_cmd, cwd=BACKEND_DIR, stdout=devnull, stderr=devnull)]
+    for port, url in zip(app_ports, app_urls):
+        app_cmd = [
+            sys.executable, '-c',
+            f"import app; app.create_app().run(host='127.0.0.1', port={port}, threaded=True)",
+        ]
+        env = {**app_env, 'PEER_SELF': url} if args.nodes > 1 else app_env
+        processes.append(subprocess.Popen(app_cmd, cwd=BACKEND_DIR, env=env, stdout=devnull, stderr=devnull))
+    mock_url = f'http://127.0.0.1:{mock_port}'
+    try:
+        wait_until_up(f'{mock_url}/__stats')
+        for url in app_urls:
+            wait_until_up(f'{url}/')
+    except RuntimeError:
+        stop_stack(processes)
+        raise
+    return processes, app_urls, mock_url
+
+
+def stop_stack(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def upstream_calls(mock_url):
+    if not mock_url:
+        return None
+    try:
+        return requests.get(f'{mock_url}/__stats', timeout=5).json()
+    except requests.RequestException:
+        return None
+
+
+def run_scenario(scenario, app_urls, mock_url, args):
+    local = threading.local()
+
+    def one(index):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body = build_request(scenario, index, args)
+        start = time.perf_counter()
+        try:
+            app_url = app_urls[index % len(app_urls)]
+            response = session.request(method, app_url + path, json=body, timeout=args.request_timeout)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return time.perf_counter() - start, status
+
+    stats_before = upstream_calls(mock_url)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    stats_after = upstream_calls(mock_url)
+
+    latencies = sorted(seconds * 1000.0 for seconds, _ in results)
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    report = {
+        'scenario': scenario,
+        'requests': len(results),
+        'concurrency': args.concurrency,
+        'nodes': len(app_urls),
+        'distinct_births': args.births,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+        'statuses': statuses,
+    }
+    if stats_before is not None and stats_after is not None:
+        calls = stats_after['total_calls'] - stats_before['total_calls']
+        report['upstream_calls'] = calls
+        report['upstream_calls_per_request'] = round(calls / len(results), 3) if results else 0.0
+        report['upstream_rate_limited'] = (
+            sum(stats_after['rate_limited'].values()) - sum(stats_before['rate_limited'].values())
+        )
+        report['upstream_timeouts'] = sum(stats_after['timeouts'].values()) - sum(stats_before['timeouts'].values())
+    return report
+
+
+def print_report(report):
+    lat = report['latency_ms']
+    print(f"\n{report['scenario']}: {report['requests']} requests @ concurrency {report['concurrency']}"
+          f" across {report['nodes']} node(s)")
+    print(f"   throughput  {report['throughput_rps']:>9} req/s   ({report['elapsed_s']} s)")
+    print(f"   latency ms  p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print(f"   statuses    {report['statuses']}")
+    if 'upstream_calls' in report:
+        print(f"   upstream    {report['upstream_calls']} calls "
+              f"({report['upstream_calls_per_request']}/request), "
+              f"{report['upstream_rate_limited']} x 429, {report['upstream_timeouts']} timeouts")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the AstroLearn backend')
+    parser.add_argument('--scenario', choices=SCENARIOS + ('mixed',), default='mixed')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--births', type=int, default=50, help='distinct birth records to cycle through')
+    parser.add_argument('--divisions', nargs='+', default=['d1', 'd9', 'd10'])
+    parser.add_argument('--request-timeout', type=float, default=120.0)
+    parser.add_argument('--app-url', nargs='+', default=['http://127.0.0.1:5000'],
+                        help='one or more backend URLs, used round-robin')
+    parser.add_argument('--mock-url', default=None, help='mock_upstream base URL, for upstream call counts')
+    parser.add_argument('--json', dest='json_out', default=None, help='write reports to this file')
+    spawn = parser.add_argument_group('spawned stack (--spawn)')
+    spawn.add_argument('--spawn', action='store_true', help='start mock upstream + backend locally')
+    spawn.add_argument('--latency-ms', type=float, default=200.0)
+    spawn.add_argument('--jitter-ms', type=float, default=50.0)
+    spawn.add_argument('--rate-429', type=float, default=0.0)
+    spawn.add_argument('--timeout-rate', type=float, default=0.0)
+    spawn.add_argument('--timeout-sleep', type=float, default=10.0)
+    spawn.add_argument('--nodes', type=int, default=1, help='backends to spawn, as a peer-cache cluster if > 1')
+    spawn.add_argument('--upstream-timeout', type=float, default=5.0, help='backend UPSTREAM_TIMEOUT')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    processes = []
+    app_urls, mock_url = args.app_url, args.mock_url
+    if args.spawn:
+        processes, app_urls, mock_url = spawn_stack(args)
+    try:
+        scenarios = SCENARIOS if args.scenario == 'mixed' else (args.scenario,)
+        reports = [run_scenario(scenario, app_urls, mock_url, args) for scenario in scenarios]
+    finally:
+        stop_stack(processes)
+
+    for report in reports:
+        print_report(report)
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return reports
+
+
+if __name__ == '__main__':
+    main()
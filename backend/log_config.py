@@ -0,0 +1,142 @@
+"""
+Logging setup for the AstroLearn backend.
+
+Request threads only enqueue log records; a background QueueListener does the
+formatting and the (blocking) stream write. High-volume events are sampled,
+and every record carries an `event` name so output can be filtered/parsed.
+
+Environment:
+    LOG_LEVEL        DEBUG | INFO | WARNING | ... (default INFO)
+    LOG_FORMAT       text | json (default text)
+    LOG_SAMPLE_EVERY keep 1 in N records logged with extra={'sample': True} (default 100)
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+LOGGER_NAME = 'astrolearn'
+
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in `every` records per event for records flagged sample=True.
+    WARNING and above are never dropped.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False) or record.levelno >= logging.WARNING:
+            return True
+        if self.every == 1:
+            return True
+        event = getattr(record, 'event', record.msg)
+        with self._lock:
+            counter = self._counters.get(event)
+            if counter is None:
+                counter = self._counters[event] = itertools.count()
+            seen = next(counter)
+        if seen % self.every:
+            return False
+        record.sampled_1_in = self.every
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render records as `key=value` text or one JSON object per line"""
+
+    def __init__(self, fmt='text'):
+        super().__init__()
+        self.fmt = fmt
+
+    def _fields(self, record):
+        fields = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', None),
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in fields:
+                fields[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields['exc'] = record.exc_text
+        return fields
+
+    def format(self, record):
+        fields = self._fields(record)
+        if self.fmt == 'json':
+            return json.dumps(fields, default=str)
+        head = f"{fields.pop('ts')} {fields.pop('level'):<7} {fields.pop('msg')}"
+        fields.pop('logger')
+        return head + ''.join(f' {key}={value}' for key, value in fields.items() if value is not None)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves msg/args untouched so string formatting happens
+    on the listener thread instead of the request thread.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks cannot be rendered after the frame is gone
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level=None, fmt=None, sample_every=None, stream=None):
+    """Install the queue-backed handler on the 'astrolearn' logger (idempotent)"""
+    global _listener
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel((level or os.environ.get('LOG_LEVEL', 'INFO')).upper())
+    if _listener is not None:
+        return logger
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(StructuredFormatter(fmt or os.environ.get('LOG_FORMAT', 'text')))
+
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(
+        sample_every if sample_every is not None else int(os.environ.get('LOG_SAMPLE_EVERY', 100))
+    ))
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_listener)
+    return logger
+
+
+def _restart_listener():
+    """A forked worker (pre-fork servers) inherits the queue but not the listener thread"""
+    global _listener
+    _listener = logging.handlers.QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name=None):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
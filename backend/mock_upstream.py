@@ -0,0 +1,210 @@
+"""
+Local stand-in for the Free Astrology API.
+
+Replays recorded responses from fixtures/upstream/ for /planets and every
+chart endpoint in CHART_ENDPOINTS, with configurable latency, 429 and timeout
+injection, so the backend can be exercised offline and under load.
+
+Run:
+    python mock_upstream.py --port 5050 --latency-ms 300 --jitter-ms 100 --rate-429 0.05
+
+Then start the backend against it:
+    ASTRO_API_BASE_URL=http://127.0.0.1:5050 ASTRO_API_KEY_1=mock python app.py
+
+Record real responses (forwards to the live API and overwrites fixtures;
+/planets request/response pairs also go to fixtures/ephemeris/ for
+verify_ephemeris.py):
+    python mock_upstream.py --record
+
+Stats:
+    GET  /__stats   per-endpoint call counts, injected 429s/timeouts
+    POST /__reset   clear stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from flask import Flask, Response, jsonify, request
+
+from app import CHART_ENDPOINTS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'upstream')
+EPHEMERIS_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'ephemeris')
+DEFAULT_CHART_FIXTURE = 'd2-chart-svg-code.svg'
+LIVE_BASE_URL = 'https://json.freeastrologyapi.com'
+
+KNOWN_ENDPOINTS = {'planets'} | set(CHART_ENDPOINTS.values())
+
+
+class FixtureStore:
+    """Loads fixture bodies once; chart endpoints fall back to a default SVG"""
+
+    def __init__(self, fixtures_dir):
+        self.fixtures_dir = fixtures_dir
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _load(self, endpoint):
+        json_path = os.path.join(self.fixtures_dir, f'{endpoint}.json')
+        if os.path.exists(json_path):
+            with open(json_path, 'rb') as f:
+                return f.read()
+        svg_path = os.path.join(self.fixtures_dir, f'{endpoint}.svg')
+        if not os.path.exists(svg_path):
+            if endpoint == 'planets':
+                return None
+            svg_path = os.path.join(self.fixtures_dir, DEFAULT_CHART_FIXTURE)
+        with open(svg_path, encoding='utf-8-sig') as f:
+            return json.dumps({'statusCode': 200, 'output': f.read()}).encode('utf-8')
+
+    def get(self, endpoint):
+        with self._lock:
+            if endpoint not in self._bodies:
+                self._bodies[endpoint] = self._load(endpoint)
+            return self._bodies[endpoint]
+
+    def save(self, endpoint, body):
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        with open(os.path.join(self.fixtures_dir, f'{endpoint}.json'), 'wb') as f:
+            f.write(body)
+        with self._lock:
+            self._bodies[endpoint] = body
+
+
+def save_ephemeris_pair(request_body, response_body, directory=EPHEMERIS_FIXTURES_DIR):
+    """Keep a /planets request/response pair for verify_ephemeris.py"""
+    os.makedirs(directory, exist_ok=True)
+    name = hashlib.md5(request_body).hexdigest()[:12]
+    pair = {'request': json.loads(request_body), 'response': json.loads(response_body)}
+    with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+        json.dump(pair, f, indent=2)
+
+
+class UpstreamStats:
+    KINDS = ('calls', 'rate_limited', 'timeouts')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {kind: defaultdict(int) for kind in self.KINDS}
+
+    def record(self, kind, endpoint):
+        with self._lock:
+            self._counts[kind][endpoint] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counts = {kind: defaultdict(int) for kind in self.KINDS}
+
+    def snapshot(self):
+        with self._lock:
+            out = {kind: dict(counts) for kind, counts in self._counts.items()}
+        out['total_calls'] = sum(out['calls'].values())
+        return out
+
+
+class KeyQuota:
+    """Sliding one-minute request window per x-api-key (0 = unlimited)"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._windows = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def allow(self, api_key):
+        if self.per_minute <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows[api_key]
+            while window and now - window[0] > 60.0:
+                window.popleft()
+            if len(window) >= self.per_minute:
+                return False
+            window.append(now)
+            return True
+
+
+def create_mock_app(args):
+    mock = Flask(__name__)
+    fixtures = FixtureStore(args.fixtures)
+    stats = UpstreamStats()
+    quota = KeyQuota(args.key_quota)
+
+    @mock.route('/__stats', methods=['GET'])
+    def get_stats():
+        return jsonify(stats.snapshot())
+
+    @mock.route('/__reset', methods=['POST'])
+    def reset_stats():
+        stats.reset()
+        return jsonify({'success': True})
+
+    @mock.route('/<endpoint>', methods=['POST'])
+    def upstream(endpoint):
+        if endpoint not in KNOWN_ENDPOINTS:
+            return jsonify({'statusCode': 404, 'error': f'Unknown endpoint: {endpoint}'}), 404
+
+        stats.record('calls', endpoint)
+
+        api_key = request.headers.get('x-api-key', '')
+        if not api_key:
+            return jsonify({'statusCode': 403, 'error': 'Missing x-api-key'}), 403
+
+        delay = max(0.0, random.gauss(args.latency_ms, args.jitter_ms)) / 1000.0
+        if random.random() < args.timeout_rate:
+            stats.record('timeouts', endpoint)
+            delay = args.timeout_sleep
+        time.sleep(delay)
+
+        if random.random() < args.rate_429 or not quota.allow(api_key):
+            stats.record('rate_limited', endpoint)
+            return jsonify({'statusCode': 429, 'error': 'Too Many Requests'}), 429
+
+        if args.record:
+            live = requests.post(
+                f'{args.upstream}/{endpoint}',
+                headers={'Content-Type': 'application/json', 'x-api-key': api_key},
+                data=request.get_data(),
+                timeout=30,
+            )
+            if live.status_code == 200:
+                fixtures.save(endpoint, live.content)
+                if endpoint == 'planets':
+                    save_ephemeris_pair(request.get_data(), live.content)
+            return Response(live.content, status=live.status_code, mimetype='application/json')
+
+        body = fixtures.get(endpoint)
+        if body is None:
+            return jsonify({'statusCode': 500, 'error': f'No fixture recorded for {endpoint}'}), 500
+        return Response(body, mimetype='application/json')
+
+    return mock
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline stand-in for the Free Astrology API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='directory of recorded responses')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mean added latency per call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='std-dev of added latency')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='probability of answering 429')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='probability of stalling a call')
+    parser.add_argument('--timeout-sleep', type=float, default=35.0, help='seconds a stalled call hangs')
+    parser.add_argument('--key-quota', type=int, default=0, help='calls per minute per API key (0 = unlimited)')
+    parser.add_argument('--record', action='store_true', help='forward to the live API and save responses')
+    parser.add_argument('--upstream', default=LIVE_BASE_URL, help='live API base URL for --record')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(f"Mock upstream on http://{args.host}:{args.port} (fixtures: {args.fixtures})")
+    create_mock_app(args).run(host=args.host, port=args.port, threaded=True)
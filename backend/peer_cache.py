@@ -0,0 +1,166 @@
+"""
+Cluster-wide chart/planet cache for the AstroLearn backend.
+
+Every cache key has one owner node, picked by consistent hashing over the
+configured peer URLs (HashRing, with virtual nodes so keys spread evenly and
+only ~1/N of them move when a node joins or leaves). On a local miss a node
+asks the owner (POST <owner>/peer/fill) instead of calling upstream itself;
+the owner serves from its cache or fills it once, with concurrent fills of
+the same key coalesced by SingleFlight. A peer that cannot be connected to is
+skipped for `retry_after` seconds and the caller goes upstream directly; a
+slow or failed answer only sends that one lookup upstream.
+"""
+
+import bisect
+import hashlib
+import threading
+import time
+
+import requests
+
+from log_config import get_logger
+
+logger = get_logger('peer')
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring of node URLs"""
+
+    def __init__(self, nodes, vnodes=128):
+        points = sorted((_hash(f'{node}#{i}'), node) for node in nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key):
+        i = bisect.bisect(self._hashes, _hash(key))
+        return self._nodes[i % len(self._nodes)]
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run fn once per key at a time; concurrent callers share its result"""
+
+    def __init__(self, on_coalesced=None):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.on_coalesced = on_coalesced
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if self.on_coalesced is not None:
+                self.on_coalesced()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class PeerCache:
+    """
+    Owner lookup and peer requests for one node of the cluster.
+
+    `self_url` must appear in `nodes` exactly as the other nodes list it.
+    `on_request(outcome, seconds)` is called for every owner lookup that
+    leaves this node: outcome is 'ok', 'error', 'timeout' or 'down' (skipped).
+    """
+
+    def __init__(self, self_url, nodes, timeout=35.0, retry_after=30.0, token='', vnodes=128, on_request=None):
+        self.self_url = self_url.rstrip('/')
+        self.nodes = sorted({node.rstrip('/') for node in nodes} | {self.self_url})
+        self.ring = HashRing(self.nodes, vnodes)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.token = token
+        self.on_request = on_request
+        self._down_until = {}
+
+    def owner(self, key):
+        return self.ring.owner(key)
+
+    def _record(self, outcome, seconds=0.0):
+        if self.on_request is not None:
+            self.on_request(outcome, seconds)
+
+    def ask_owner(self, key, body):
+        """
+        The owner's fill result (a fetch_* style dict) for `key`, or None when
+        this node is the owner or the owner could not be reached.
+        """
+        owner = self.owner(key)
+        if owner == self.self_url:
+            return None
+        if self._down_until.get(owner, 0.0) > time.monotonic():
+            self._record('down')
+            return None
+        start = time.perf_counter()
+        try:
+            response = requests.post(
+                f'{owner}/peer/fill', json=body, timeout=self.timeout,
+                headers={'X-Peer-Token': self.token} if self.token else None,
+            )
+            if response.status_code != 200:
+                raise requests.RequestException(f'HTTP {response.status_code}')
+            result = response.json()
+            if not isinstance(result, dict) or 'success' not in result:
+                raise ValueError('malformed fill response')
+        except requests.ConnectionError as e:
+            # Includes ConnectTimeout: nothing is listening, so stop asking for a while
+            self._down_until[owner] = time.monotonic() + self.retry_after
+            self._record('error', time.perf_counter() - start)
+            logger.warning(
+                "peer %s unavailable (%s), going upstream directly for %ds", owner, e, self.retry_after,
+                extra={'event': 'peer.down'},
+            )
+            return None
+        except requests.Timeout as e:
+            # The owner is up but its own fill is slow (queued, or retrying keys)
+            self._record('timeout', time.perf_counter() - start)
+            logger.warning(
+                "peer %s did not answer in %.0fs (%s), going upstream directly", owner, self.timeout, e,
+                extra={'event': 'peer.timeout'},
+            )
+            return None
+        except (requests.RequestException, ValueError) as e:
+            self._record('error', time.perf_counter() - start)
+            logger.warning(
+                "peer %s failed (%s), going upstream directly", owner, e, extra={'event': 'peer.error'},
+            )
+            return None
+        self._down_until.pop(owner, None)
+        self._record('ok', time.perf_counter() - start)
+        return result
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            'self': self.self_url,
+            'nodes': self.nodes,
+            'down': sorted(node for node, until in self._down_until.items() if until > now),
+        }
@@ -0,0 +1,289 @@
+"""
+Inverted index over extracted chart placements for the AstroLearn backend.
+
+Every indexed chart gets a dense integer id. Each term - (division, body,
+'sign', n) or (division, body, 'house', n) - maps to a compressed bitmap of the
+ids that have it, so "Ju in house 1 of D9 and Mo in Cancer in D1" is the
+intersection of two bitmaps.
+
+Bitmaps are split roaring-style into 2^16-id chunks. A sparse chunk
+(<= 4096 ids) is a sorted array('H'); a dense one is an 8 KiB bytearray.
+Intersections go smallest-first, chunk by chunk, and only over chunks present
+in every operand.
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from array import array
+
+ARRAY_MAX = 4096
+CHUNK_BYTES = 8192  # 2^16 bits
+
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+def _bitmap_from_array(values):
+    chunk = bytearray(CHUNK_BYTES)
+    for low in values:
+        chunk[low >> 3] |= 1 << (low & 7)
+    return chunk
+
+
+def _array_from_int(value):
+    """Sorted low bits set in a 2^16-bit int"""
+    out = array('H')
+    data = value.to_bytes(CHUNK_BYTES, 'little')
+    for i, byte in enumerate(data):
+        if byte:
+            base = i << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    out.append(base | bit)
+    return out
+
+
+def _and_chunks(a, b):
+    """Intersect two chunks; returns (chunk, cardinality)"""
+    if isinstance(a, array) and isinstance(b, array):
+        if len(a) > len(b):
+            a, b = b, a
+        members = set(b)
+        out = array('H', (low for low in a if low in members))
+        return out, len(out)
+    if isinstance(a, array) or isinstance(b, array):
+        values, bits = (a, b) if isinstance(a, array) else (b, a)
+        out = array('H', (low for low in values if bits[low >> 3] >> (low & 7) & 1))
+        return out, len(out)
+    value = int.from_bytes(a, 'little') & int.from_bytes(b, 'little')
+    card = _popcount(value)
+    if card <= ARRAY_MAX:
+        return _array_from_int(value), card
+    return bytearray(value.to_bytes(CHUNK_BYTES, 'little')), card
+
+
+class CompressedBitmap:
+    """Set of non-negative ints stored as array/bitmap chunks of 2^16 ids"""
+
+    __slots__ = ('_chunks', '_cards')
+
+    def __init__(self):
+        self._chunks = {}  # high 16 bits -> array('H') | bytearray
+        self._cards = {}
+
+    def __len__(self):
+        return sum(self._cards.values())
+
+    def add(self, value):
+        high, low = value >> 16, value & 0xFFFF
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            self._chunks[high] = array('H', (low,))
+            self._cards[high] = 1
+            return
+        if isinstance(chunk, array):
+            # Ids are handed out in increasing order, so this is usually an append
+            if chunk and chunk[-1] < low:
+                chunk.append(low)
+            else:
+                i = bisect.bisect_left(chunk, low)
+                if i < len(chunk) and chunk[i] == low:
+                    return
+                chunk.insert(i, low)
+            self._cards[high] += 1
+            if len(chunk) > ARRAY_MAX:
+                self._chunks[high] = _bitmap_from_array(chunk)
+            return
+        mask = 1 << (low & 7)
+        if not chunk[low >> 3] & mask:
+            chunk[low >> 3] |= mask
+            self._cards[high] += 1
+
+    def discard(self, value):
+        high, low = value >> 16, value & 0xFFFF
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            return
+        if isinstance(chunk, array):
+            i = bisect.bisect_left(chunk, low)
+            if i == len(chunk) or chunk[i] != low:
+                return
+            del chunk[i]
+        else:
+            mask = 1 << (low & 7)
+            if not chunk[low >> 3] & mask:
+                return
+            chunk[low >> 3] &= ~mask & 0xFF
+        self._cards[high] -= 1
+        if not self._cards[high]:
+            del self._chunks[high], self._cards[high]
+        elif not isinstance(chunk, array) and self._cards[high] <= ARRAY_MAX // 2:
+            self._chunks[high] = _array_from_int(int.from_bytes(chunk, 'little'))
+
+    def __iter__(self):
+        for high in sorted(self._chunks):
+            chunk = self._chunks[high]
+            base = high << 16
+            lows = chunk if isinstance(chunk, array) else _array_from_int(int.from_bytes(chunk, 'little'))
+            for low in lows:
+                yield base | low
+
+    @classmethod
+    def intersection(cls, bitmaps):
+        """Intersection of several bitmaps, smallest first"""
+        result = cls()
+        if not bitmaps:
+            return result
+        bitmaps = sorted(bitmaps, key=len)
+        first = bitmaps[0]
+        for high, chunk in first._chunks.items():
+            card = first._cards[high]
+            for other in bitmaps[1:]:
+                other_chunk = other._chunks.get(high)
+                if other_chunk is None:
+                    card = 0
+                    break
+                chunk, card = _and_chunks(chunk, other_chunk)
+                if not card:
+                    break
+            if card:
+                if chunk is first._chunks[high]:
+                    chunk = chunk[:]  # never share storage with an index bitmap
+                result._chunks[high] = chunk
+                result._cards[high] = card
+        return result
+
+    def memory_bytes(self):
+        return sum(
+            len(chunk) * chunk.itemsize if isinstance(chunk, array) else len(chunk)
+            for chunk in self._chunks.values()
+        )
+
+
+class PlacementIndex:
+    """
+    Term -> CompressedBitmap of chart ids, maintained as charts are
+    extracted (add) and evicted (remove). Documents added with `expires_at`
+    drop out by themselves once it passes, and a chart's id is reused after
+    its last division leaves. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._term_ids = {}   # (division, body, 'sign'|'house', n) -> term id
+        self._postings = []   # term id -> CompressedBitmap
+        self._ids = {}        # chart key -> chart id
+        self._keys = []       # chart id -> chart key (None = free)
+        self._free_ids = []   # released chart ids, reused before new ones
+        self._docs = {}       # (chart id, division) -> array of term ids
+        self._divisions = {}  # chart id -> number of indexed divisions
+        self._expires = {}    # (chart id, division) -> expiry (epoch seconds)
+        self._expiry_heap = []  # (expiry, chart id, division); stale rows skipped on pop
+
+    def __len__(self):
+        """Charts with at least one indexed division"""
+        return len(self._divisions)
+
+    @staticmethod
+    def terms(division, ascendant_sign, planet_signs):
+        terms = []
+        if ascendant_sign > 0:
+            terms.append((division, 'As', 'sign', ascendant_sign))
+        for body, sign in planet_signs.items():
+            terms.append((division, body, 'sign', sign))
+            if ascendant_sign > 0:
+                terms.append((division, body, 'house', ((sign - ascendant_sign) % 12) + 1))
+        return terms
+
+    def _term_id(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self._postings)
+            self._postings.append(CompressedBitmap())
+        return term_id
+
+    def add(self, chart_key, division, ascendant_sign, planet_signs, expires_at=None):
+        terms = self.terms(division, ascendant_sign, planet_signs)
+        with self._lock:
+            chart_id = self._ids.get(chart_key)
+            if chart_id is not None:
+                self._remove_locked(chart_id, division)
+                chart_id = self._ids.get(chart_key)  # freed if that was its only division
+            if chart_id is None:
+                if self._free_ids:
+                    chart_id = heapq.heappop(self._free_ids)
+                    self._keys[chart_id] = chart_key
+                else:
+                    chart_id = len(self._keys)
+                    self._keys.append(chart_key)
+                self._ids[chart_key] = chart_id
+            term_ids = array('I', (self._term_id(term) for term in terms))
+            for term_id in term_ids:
+                self._postings[term_id].add(chart_id)
+            self._docs[(chart_id, division)] = term_ids
+            self._divisions[chart_id] = self._divisions.get(chart_id, 0) + 1
+            if expires_at is not None:
+                self._expires[(chart_id, division)] = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, chart_id, division))
+
+    def remove(self, chart_key, division):
+        with self._lock:
+            chart_id = self._ids.get(chart_key)
+            if chart_id is not None:
+                self._remove_locked(chart_id, division)
+
+    def _remove_locked(self, chart_id, division):
+        term_ids = self._docs.pop((chart_id, division), None)
+        if term_ids is None:
+            return
+        self._expires.pop((chart_id, division), None)
+        for term_id in term_ids:
+            self._postings[term_id].discard(chart_id)
+        self._divisions[chart_id] -= 1
+        if not self._divisions[chart_id]:
+            del self._divisions[chart_id]
+            del self._ids[self._keys[chart_id]]
+            self._keys[chart_id] = None
+            heapq.heappush(self._free_ids, chart_id)
+
+    def _expire_locked(self, now):
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, chart_id, division = heapq.heappop(heap)
+            # Rows for re-added or removed documents are stale; skip them
+            if self._expires.get((chart_id, division)) == expires_at:
+                self._remove_locked(chart_id, division)
+
+    def expire(self, now=None):
+        """Drop documents whose expiry has passed (search() also does this)"""
+        with self._lock:
+            self._expire_locked(time.time() if now is None else now)
+
+    def search(self, terms, limit=100, now=None):
+        """(total matches, first `limit` chart keys) for unexpired charts having every term"""
+        with self._lock:
+            self._expire_locked(time.time() if now is None else now)
+            bitmaps = []
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    return 0, []
+                bitmaps.append(self._postings[term_id])
+            matches = CompressedBitmap.intersection(bitmaps)
+            keys = []
+            for chart_id in matches:
+                if len(keys) >= limit:
+                    break
+                keys.append(self._keys[chart_id])
+        return len(matches), keys
+
+    def stats(self):
+        with self._lock:
+            return {
+                'charts': len(self._divisions),
+                'free_ids': len(self._free_ids),
+                'documents': len(self._docs),
+                'terms': len(self._term_ids),
+                'bitmap_bytes': sum(bitmap.memory_bytes() for bitmap in self._postings),
+            }
@@ -0,0 +1,118 @@
+"""
+Request-level timing and profiling helpers for the AstroLearn backend.
+
+RequestTimer collects named phases (optionally per division) for one request
+and renders them as a Server-Timing header and a JSON breakdown.
+SlowRequestProfiler runs cProfile on a sample of requests and keeps the
+stats of the N slowest ones on disk.
+"""
+
+import cProfile
+import heapq
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RequestTimer:
+    """Phase timings for a single request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # (name, division or None, seconds)
+
+    @contextmanager
+    def phase(self, name, division=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, division, time.perf_counter() - start))
+
+    def totals(self):
+        out = {}
+        for name, _, seconds in self.phases:
+            out[name] = out.get(name, 0.0) + seconds
+        return out
+
+    def breakdown(self):
+        """Per-phase totals and per-division phase totals, in milliseconds"""
+        divisions = {}
+        for name, division, seconds in self.phases:
+            if division is None:
+                continue
+            phases = divisions.setdefault(division, {})
+            phases[name] = phases.get(name, 0.0) + seconds * 1000.0
+        return {
+            'total_ms': round((time.perf_counter() - self.start) * 1000.0, 3),
+            'phases': {name: round(seconds * 1000.0, 3) for name, seconds in self.totals().items()},
+            'divisions': {
+                division: {name: round(ms, 3) for name, ms in phases.items()}
+                for division, phases in divisions.items()
+            },
+        }
+
+    def server_timing_header(self):
+        entries = [f'{name};dur={seconds * 1000.0:.3f}' for name, seconds in self.totals().items()]
+        entries.append(f'total;dur={(time.perf_counter() - self.start) * 1000.0:.3f}')
+        return ', '.join(entries)
+
+
+class SlowRequestProfiler:
+    """
+    Samples requests with cProfile and keeps .prof dumps for the N slowest.
+
+    Dumps are written to `output_dir` as <duration_ms>_<route>_<timestamp>.prof
+    and can be inspected with `python -m pstats <file>` or snakeviz.
+    """
+
+    def __init__(self, keep_slowest, sample_rate=1.0, output_dir='profiles'):
+        self.keep_slowest = keep_slowest
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self._slowest = []  # min-heap of (seconds, path)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.keep_slowest > 0 and self.sample_rate > 0
+
+    def start(self):
+        """Return an enabled profiler for this request, or None if not sampled"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this interpreter
+            return None
+        return profiler
+
+    def finish(self, profiler, seconds, route):
+        profiler.disable()
+        with self._lock:
+            if len(self._slowest) >= self.keep_slowest and seconds <= self._slowest[0][0]:
+                return None
+            os.makedirs(self.output_dir, exist_ok=True)
+            safe_route = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+            path = os.path.join(
+                self.output_dir,
+                f'{seconds * 1000.0:09.1f}ms_{safe_route}_{time.time_ns()}.prof',
+            )
+            profiler.dump_stats(path)
+            heapq.heappush(self._slowest, (seconds, path))
+            if len(self._slowest) > self.keep_slowest:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+            return path
+
+    def slowest(self):
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
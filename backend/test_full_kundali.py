@@ -5,9 +5,10 @@ Run: cd backend && python test_full_kundali.py
 
 import requests
 import json
+import os
 import sys
 
-BASE_URL = "http://localhost:5000"
+BASE_URL = os.environ.get("BACKEND_URL", "http://localhost:5000")
 
 # Test data: 22 Nov 2003, 1:30 PM, Goa India
 TEST_DATA = {
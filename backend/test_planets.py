@@ -1,8 +1,9 @@
 import requests
 import json
+import os
 
 # Local backend URL
-URL = "http://localhost:5000/planets"
+URL = os.environ.get("BACKEND_URL", "http://localhost:5000") + "/planets"
 
 # Sample Birth Details
 PAYLOAD = {
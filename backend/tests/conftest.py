@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(BACKEND_DIR, 'fixtures', 'upstream')
+
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8-sig') as f:
+        return f.read()
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    """Empty app caches and placement index for the duration of a test"""
+    import app
+    from placement_index import PlacementIndex
+    monkeypatch.setattr(app, 'CHART_CACHE', {})
+    monkeypatch.setattr(app, 'PLANET_CACHE', {})
+    monkeypatch.setattr(app, 'RESPONSE_CACHE', {})
+    monkeypatch.setattr(app, 'PLACEMENT_INDEX', PlacementIndex())
+    return app
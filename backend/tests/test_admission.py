@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+import compact_encoding
+from admission import AdmissionController
+
+BIRTH = {'year': 2003, 'month': 11, 'date': 22, 'hours': 13, 'minutes': 30, 'seconds': 0,
+         'latitude': 14.82, 'longitude': 74.1359, 'timezone': 5.5, 'divisions': ['d1']}
+
+
+def test_limits_and_defaults():
+    controller = AdmissionController({'default': 2, '/slow': 1})
+    assert controller.enter('/slow')
+    assert not controller.enter('/slow')
+    assert controller.enter('/fast') and controller.enter('/fast')
+    assert not controller.enter('/fast')
+    controller.leave('/slow', 0.5)
+    assert controller.enter('/slow')
+    assert controller.snapshot()['/fast'] == {
+        'limit': 2, 'in_flight': 2, 'waiting': 0, 'budget_seconds': 0.0, 'avg_hold_seconds': 1.0,
+    }
+
+
+def test_waits_within_budget_for_a_slot():
+    controller = AdmissionController({'default': 1}, {'default': 2.0})
+    assert controller.enter('/r')
+    timer = threading.Timer(0.05, controller.leave, args=('/r', 0.05))
+    timer.start()
+    start = time.monotonic()
+    assert controller.enter('/r')
+    assert 0.03 < time.monotonic() - start < 1.5
+    timer.join()
+
+
+def test_rejects_when_budget_runs_out():
+    controller = AdmissionController({'default': 1}, {'default': 0.05})
+    assert controller.enter('/r')
+    start = time.monotonic()
+    assert not controller.enter('/r')
+    assert time.monotonic() - start >= 0.05
+    assert controller.snapshot()['/r']['waiting'] == 0
+
+
+def test_retry_after_follows_hold_time_and_queue():
+    controller = AdmissionController({'default': 1}, {'default': 5.0})
+    assert controller.retry_after('/r') == 1
+    controller.enter('/r')
+    controller.leave('/r', 6.0)  # average 1.0 -> 2.0
+    assert controller.retry_after('/r') == 2
+    controller.enter('/r')
+    waiter = threading.Thread(target=controller.enter, args=('/r',))
+    waiter.start()
+    deadline = time.monotonic() + 2
+    while controller.snapshot()['/r']['waiting'] != 1 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert controller.retry_after('/r') == 4
+    controller.leave('/r', 2.0)
+    waiter.join()
+
+
+@pytest.fixture
+def full_route(caches, monkeypatch):
+    """/kundali/full with no free slot and no queue budget"""
+    app = caches
+    monkeypatch.setattr(app, 'ADMISSION_CONTROL_ENABLED', True)
+    monkeypatch.setattr(app, 'ADMISSION', AdmissionController({'default': 0}))
+    return app, app.create_app().test_client()
+
+
+def test_full_route_answers_503_with_retry_after(full_route):
+    app, client = full_route
+    response = client.post('/kundali/full', json=BIRTH)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json() == {'success': False, 'error': 'Server busy, please retry', 'retry_after': 1}
+
+
+@pytest.mark.parametrize('accept, compact', [('application/json', None), ('application/msgpack', ('msgpack', 'zlib'))])
+def test_cached_responses_skip_admission(full_route, accept, compact):
+    app, client = full_route
+    if 'msgpack' not in compact_encoding.available_formats():
+        pytest.skip('msgpack not installed')
+    key = app.full_kundali_response_key(BIRTH, BIRTH['divisions'], compact)
+    app.set_cached_response(key, b'cached', accept)
+    response = client.post('/kundali/full', json=BIRTH, headers={'Accept': accept})
+    assert response.status_code == 200 and response.data == b'cached'
+    # The other format is not cached, so it still needs a slot
+    other = 'application/json' if compact else 'application/msgpack'
+    assert client.post('/kundali/full', json=BIRTH, headers={'Accept': other}).status_code == 503
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from ashtakavarga import CONTRIBUTORS, GRAHA_NAMES, ashtakavarga, ashtakavarga_reference, yogas
+
+# Bindus each graha's Bhinnashtakavarga holds whatever the placement (BPHS)
+BAV_TOTALS = {'Sun': 48, 'Moon': 49, 'Mars': 39, 'Mercury': 54, 'Jupiter': 56, 'Venus': 52, 'Saturn': 39}
+
+
+def random_charts(count, seed=7):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {body: rng.randint(1, 12) for body in CONTRIBUTORS + ('Ra', 'Ke')}
+
+
+def test_matches_reference():
+    for signs in random_charts(2000):
+        assert ashtakavarga(signs) == ashtakavarga_reference(signs), signs
+
+
+@pytest.mark.parametrize('contributor', CONTRIBUTORS)
+def test_every_contributor_sign_matches_reference(contributor):
+    base = dict.fromkeys(CONTRIBUTORS, 1)
+    for sign in range(1, 13):
+        signs = {**base, contributor: sign}
+        assert ashtakavarga(signs) == ashtakavarga_reference(signs)
+
+
+def test_all_in_one_sign_saturates_no_lane():
+    for sign in range(1, 13):
+        signs = dict.fromkeys(CONTRIBUTORS, sign)
+        assert ashtakavarga(signs) == ashtakavarga_reference(signs)
+
+
+def test_totals():
+    for signs in random_charts(50, seed=11):
+        result = ashtakavarga(signs)
+        assert {name: sum(row) for name, row in result['bav'].items()} == BAV_TOTALS
+        assert result['sav_total'] == sum(result['sav']) == 337
+        assert all(len(row) == 12 for row in result['bav'].values())
+        assert list(result['bav']) == list(GRAHA_NAMES.values())
+
+
+@pytest.mark.parametrize('bad', [None, 0, 13, -1, '1'])
+@pytest.mark.parametrize('body', ['As', 'Su', 'Sa'])
+def test_invalid_or_missing_sign(body, bad):
+    signs = dict.fromkeys(CONTRIBUTORS, 5)
+    signs[body] = bad
+    assert ashtakavarga(signs) is None
+    assert ashtakavarga_reference(signs) is None
+    assert yogas(signs) is None
+    del signs[body]
+    assert ashtakavarga(signs) is None
+    assert yogas(signs) is None
+
+
+def test_nodes_do_not_contribute():
+    signs = dict.fromkeys(CONTRIBUTORS, 3)
+    assert ashtakavarga({**signs, 'Ra': 1, 'Ke': 7}) == ashtakavarga(signs)
+
+
+def test_yogas_from_moon():
+    # Moon in Aries, Jupiter in Cancer (4th from the Moon), Mars in Taurus (2nd)
+    signs = {'As': 1, 'Su': 6, 'Mo': 1, 'Ma': 2, 'Me': 6, 'Ju': 4, 'Ve': 7, 'Sa': 9, 'Ra': 3, 'Ke': 9}
+    result = yogas(signs)
+    assert result['Gajakesari'] and result['Hamsa']   # Jupiter exalted in a kendra from the ascendant
+    assert result['Sunapha'] and not result['Kemadruma']
+    assert result['Budhaditya']
+    assert not result['Kala Sarpa']
+
+
+def test_kemadruma_and_kala_sarpa():
+    # Everything between Rahu (Aries) and Ketu (Libra), nothing beside the Moon
+    signs = {'As': 1, 'Su': 2, 'Mo': 4, 'Ma': 6, 'Me': 2, 'Ju': 7, 'Ve': 1, 'Sa': 6, 'Ra': 1, 'Ke': 7}
+    result = yogas(signs)
+    assert result['Kemadruma']
+    assert result['Kala Sarpa']
@@ -0,0 +1,53 @@
+import glob
+import json
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR, read_fixture
+
+import app
+from app import ChartCacheEntry, PackedPositions, PlanetCacheEntry
+
+SVG_FIXTURES = sorted(os.path.basename(p) for p in glob.glob(os.path.join(FIXTURES_DIR, '*.svg')))
+
+
+@pytest.mark.parametrize('name', SVG_FIXTURES)
+def test_packed_positions_round_trip_matches_extraction(name):
+    positions = app.extract_positions_from_svg(read_fixture(name))
+    packed = PackedPositions.from_dict(positions)
+    assert packed.to_dict() == positions
+    # JSON form too, so list order inside planets_in_houses is covered
+    assert json.dumps(packed.to_dict()) == json.dumps(positions)
+
+
+@pytest.mark.parametrize('svg', [
+    '<svg></svg>',
+    '<svg><text x="150" y="20">Asc</text></svg>',
+    '<svg><text x="150" y="20">Su</text><text x="240" y="20">(Ju)</text></svg>',
+])
+def test_packed_positions_partial_and_failed_extractions(svg):
+    positions = app.extract_positions_from_svg(svg)
+    assert PackedPositions.from_dict(positions).to_dict() == positions
+
+
+def test_chart_entry_keeps_svg_and_derives_name():
+    svg = read_fixture('d2-chart-svg-code.svg')
+    entry = ChartCacheEntry(svg, 'd2', timestamp=1000.7)
+    assert entry.svg == svg
+    assert entry.timestamp == 1000
+    assert entry.chart_name == app.CHART_NAMES['d2']
+    assert ChartCacheEntry.from_compressed(entry.svg_z, 'd2', entry.timestamp).svg == svg
+
+
+def test_chart_entry_freshness():
+    entry = ChartCacheEntry('<svg/>', 'd1', timestamp=1000)
+    assert entry.is_fresh(now=1000 + app.CACHE_EXPIRY_SECONDS - 1)
+    assert not entry.is_fresh(now=1000 + app.CACHE_EXPIRY_SECONDS)
+
+
+def test_planet_entry_round_trip():
+    output = json.loads(read_fixture('planets.json'))['output']
+    entry = PlanetCacheEntry(output, timestamp=5)
+    assert entry.data == output
+    assert PlanetCacheEntry.from_compressed(entry.data_z, 5).data == output
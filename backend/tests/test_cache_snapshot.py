@@ -0,0 +1,123 @@
+import io
+import json
+import time
+
+import pytest
+
+from conftest import read_fixture
+
+import app
+from cache_snapshot import HEADER, KIND_CHART, KIND_PLANET, RECORD, SnapshotError, encode_record, iter_chunks, read_snapshot
+
+BIRTH = {'year': 2022, 'month': 8, 'date': 11, 'hours': 6, 'minutes': 0,
+         'latitude': 17.38333, 'longitude': 78.4666}
+
+
+def snapshot_bytes(records):
+    return b''.join(iter_chunks(records))
+
+
+def fill_caches(now):
+    """One parsed chart, one unparsed chart and one /planets entry"""
+    svg = read_fixture('d2-chart-svg-code.svg')
+    parsed_key = app.get_cache_key('d2', BIRTH)
+    app.store_chart_entry(parsed_key, app.ChartCacheEntry(svg, 'd2', timestamp=now - 60))
+    app.get_chart_positions(parsed_key, svg)
+    app.store_chart_entry(app.get_cache_key('d9', BIRTH),
+                          app.ChartCacheEntry(read_fixture('navamsa-chart-svg-code.svg'), 'd9', timestamp=now - 30))
+    output = json.loads(read_fixture('planets.json'))['output']
+    app.PLANET_CACHE[app.get_planet_cache_key(BIRTH)] = app.PlanetCacheEntry(output, timestamp=now - 10)
+
+
+def test_records_round_trip():
+    records = [
+        (KIND_CHART, 'd1_2022_8_11_6_0_17.38_78.47', 1700000000, b'\x78\x9c' + b'x' * 70000, b'\x04\x15', 31),
+        (KIND_PLANET, 'planets_x_lahiri_topocentric', 1700000001, b'blob', b'', 0),
+    ]
+    data = snapshot_bytes(records)
+    assert data.startswith(HEADER)
+    assert list(read_snapshot(io.BytesIO(data))) == records
+    assert list(read_snapshot(io.BytesIO(data), since=1700000001)) == records[1:]
+
+
+def test_cache_round_trip(caches):
+    now = int(time.time())
+    fill_caches(now)
+    chart_before = {key: (e.svg_z, e.timestamp, e.positions and e.positions.signs) for key, e in app.CHART_CACHE.items()}
+    planets_before = {key: (e.data, e.timestamp) for key, e in app.PLANET_CACHE.items()}
+    data = snapshot_bytes(app.iter_cache_records())
+
+    app.CHART_CACHE.clear()
+    app.PLANET_CACHE.clear()
+    counts = app.load_cache_records(read_snapshot(io.BytesIO(data)))
+
+    assert counts == {'charts': 2, 'planets': 1, 'skipped': 0}
+    assert {key: (e.svg_z, e.timestamp, e.positions and e.positions.signs)
+            for key, e in app.CHART_CACHE.items()} == chart_before
+    assert {key: (e.data, e.timestamp) for key, e in app.PLANET_CACHE.items()} == planets_before
+    # The parsed chart is searchable again without re-reading its SVG
+    key = app.get_cache_key('d2', BIRTH)
+    birth_key, _ = app.split_cache_key(key)
+    ascendant = app.CHART_CACHE[key].positions.ascendant_sign
+    assert app.PLACEMENT_INDEX.search([('d2', 'As', 'sign', ascendant)]) == (1, [birth_key])
+
+def test_without_positions_and_since(caches):
+    now = int(time.time())
+    fill_caches(now)
+    records = list(app.iter_cache_records(include_positions=False))
+    assert all(record[4] == b'' for record in records)
+    assert [r[1] for r in app.iter_cache_records(since=now - 20)] == [app.get_planet_cache_key(BIRTH)]
+
+
+def test_stale_and_older_records_are_skipped(caches):
+    now = int(time.time())
+    key = app.get_cache_key('d9', BIRTH)
+    app.store_chart_entry(key, app.ChartCacheEntry('<svg>new</svg>', 'd9', timestamp=now))
+    records = [
+        (KIND_CHART, key, now - 100, app.ChartCacheEntry('<svg>old</svg>', 'd9').svg_z, b'', 0),
+        (KIND_CHART, app.get_cache_key('d1', BIRTH), now - app.CACHE_EXPIRY_SECONDS, b'', b'', 0),
+        (9, 'future-kind', now, b'', b'', 0),
+    ]
+    counts = app.load_cache_records(read_snapshot(io.BytesIO(snapshot_bytes(records))))
+    assert counts == {'charts': 0, 'planets': 0, 'skipped': 3}
+    assert app.CHART_CACHE[key].svg == '<svg>new</svg>'
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'', 'Not a cache snapshot'),
+    (b'GIF89a', 'Not a cache snapshot'),
+    (b'ALCS' + bytes([2, 0]), 'Unsupported snapshot version'),
+    (HEADER + RECORD.pack(KIND_CHART, 0, 10, 0, 0, 0)[:5], 'truncated'),
+    (HEADER + RECORD.pack(KIND_CHART, 0, 10, 100, 0, 0) + b'd1_x', 'truncated'),
+])
+def test_unreadable_snapshots(data, message):
+    with pytest.raises(SnapshotError, match=message):
+        list(read_snapshot(io.BytesIO(data)))
+
+
+@pytest.mark.parametrize('key, positions', [
+    ('no-separator', b''),
+    ('d99_2022_8_11_6_0_17.38_78.47', b''),
+    ('d1_2022_8_11_6_0_17.38_78.47', b'\x0d'),             # ascendant sign 13
+    ('d1_2022_8_11_6_0_17.38_78.47', b'\x01\x10'),         # planet sign 0
+    ('d1_2022_8_11_6_0_17.38_78.47', b'\x01\xf1'),         # planet index 15
+])
+def test_corrupt_chart_records_are_rejected(caches, key, positions):
+    record = (KIND_CHART, key, int(time.time()), b'', positions, 0)
+    with pytest.raises(SnapshotError):
+        app.load_cache_records(read_snapshot(io.BytesIO(snapshot_bytes([record]))))
+    assert not app.CHART_CACHE
+
+
+def test_import_endpoint_rejects_corrupt_body(caches, monkeypatch):
+    monkeypatch.setattr(app, 'ADMIN_TOKEN', 'secret')
+    client = app.create_app().test_client()
+    headers = {'X-Admin-Token': 'secret'}
+    assert client.post('/admin/cache/snapshot', data=b'nope').status_code == 403
+    response = client.post('/admin/cache/snapshot', data=b'garbage', headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Not a cache snapshot'
+
+    record = (KIND_PLANET, 'planets_k', int(time.time()), app.PlanetCacheEntry([]).data_z, b'', 0)
+    response = client.post('/admin/cache/snapshot', data=snapshot_bytes([record]), headers=headers)
+    assert response.get_json() == {'success': True, 'charts': 0, 'planets': 1, 'skipped': 0}
@@ -0,0 +1,118 @@
+import json
+import zlib
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from conftest import read_fixture
+
+import app
+import compact_encoding
+from compact_encoding import CompactCodec, negotiate, parse_content_type
+
+FORMATS = compact_encoding.available_formats()
+
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+
+@pytest.fixture
+def codec():
+    return CompactCodec(app.VALID_PLANETS, app.SIGN_NAMES)
+
+
+@pytest.fixture
+def body():
+    """A /kundali/full document as the JSON client sees it (string house keys)"""
+    divisions = {}
+    for division, name in (('d2', 'd2-chart-svg-code.svg'), ('d9', 'navamsa-chart-svg-code.svg')):
+        svg = read_fixture(name)
+        divisions[division] = {'chart_name': app.CHART_NAMES[division], 'svg': svg,
+                               **app.extract_positions_from_svg(svg)}
+    failed = app.extract_positions_from_svg('<svg></svg>')
+    divisions['d10'] = {'chart_name': app.CHART_NAMES['d10'], 'svg': '<svg></svg>', **failed}
+    divisions['d60'] = {'success': False, 'error': 'upstream timed out'}
+    return json.loads(json.dumps({'success': True, 'chart_id': 'abc', 'divisions': divisions,
+                                  'd1_planets': [{'name': 'Sun', 'fullDegree': 215.5}]}))
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('svg_mode', compact_encoding.SVG_MODES)
+def test_round_trip(codec, body, fmt, svg_mode):
+    data = codec.encode(body, fmt, svg_mode)
+    assert codec.decode(data, compact_encoding.content_type(fmt, svg_mode)) == body
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_compact_form(codec, body, fmt):
+    sent = compact_encoding.loads(codec.encode(body, fmt, 'raw'), fmt)
+    chart = sent['divisions']['d2']
+    assert chart['svg'] == body['divisions']['d2']['svg'].encode('utf-8')
+    assert len(chart['planet_signs']) == len(app.VALID_PLANETS)
+    assert len(chart['planets_in_houses']) == len(chart['house_signs']) == 12
+    assert sent['divisions']['d10']['house_signs'] == [0] * 12
+    assert sent['divisions']['d60'] == body['divisions']['d60']
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_cached_svg_blob_is_sent_as_is(codec, body, fmt):
+    blob = zlib.compress(body['divisions']['d2']['svg'].encode('utf-8'), 1)
+    sent = compact_encoding.loads(codec.encode(body, fmt, 'zlib', {'d2': blob}), fmt)
+    assert sent['divisions']['d2']['svg'] == blob
+    assert codec.decode(codec.encode(body, fmt, 'zlib', {'d2': blob}), f'application/{fmt}') == body
+
+
+def test_charts_container_round_trips(codec):
+    batch = {'success': True, 'charts': {'d1': {'svg': '<svg/>', 'chart_name': 'Birth Chart'}}}
+    for fmt in FORMATS:
+        assert codec.decode(codec.encode(batch, fmt), compact_encoding.content_type(fmt, 'zlib')) == batch
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('', None),
+    ('application/json', None),
+    ('*/*', None),
+    ('text/html', None),
+    ('application/msgpack', ('msgpack', 'zlib')),
+    ('application/x-msgpack', ('msgpack', 'zlib')),
+    ('application/vnd.msgpack', ('msgpack', 'zlib')),
+    ('application/cbor', ('cbor', 'zlib')),
+    ('application/cbor; svg=raw', ('cbor', 'raw')),
+    ('application/msgpack; svg="RAW"', ('msgpack', 'raw')),
+    ('application/msgpack; svg=brotli', ('msgpack', 'zlib')),
+    ('application/json;q=0.5, application/cbor', ('cbor', 'zlib')),
+    ('application/msgpack;q=0.5, application/json', None),
+    ('application/msgpack, */*;q=0.1', ('msgpack', 'zlib')),
+    ('application/cbor;q=0, application/msgpack;q=0.2', ('msgpack', 'zlib')),
+    ('application/cbor;q=0', None),
+    ('application/msgpack;q=0.9, application/cbor', ('cbor', 'zlib')),
+])
+def test_negotiate(header, expected):
+    if expected is not None and expected[0] not in FORMATS:
+        pytest.skip(f'{expected[0]} library not installed')
+    assert negotiate(accept(header)) == expected
+
+
+def test_negotiate_skips_formats_without_a_library(monkeypatch):
+    monkeypatch.setattr(compact_encoding, 'msgpack', None)
+    assert negotiate(accept('application/msgpack')) is None
+    if 'cbor' in FORMATS:
+        assert negotiate(accept('application/msgpack, application/cbor;q=0.5')) == ('cbor', 'zlib')
+
+
+def test_parse_content_type():
+    assert parse_content_type('application/cbor; svg=raw') == ('cbor', 'raw')
+    assert parse_content_type('application/x-msgpack') == ('msgpack', 'zlib')
+    with pytest.raises(ValueError):
+        parse_content_type('application/json')
+
+
+def test_response_encoding_honours_the_switch(monkeypatch):
+    flask_app = app.create_app()
+    headers = {'Accept': 'application/msgpack'}
+    with flask_app.test_request_context('/kundali/full', method='POST', headers=headers):
+        assert app.response_encoding() == (('msgpack', 'zlib') if 'msgpack' in FORMATS else None)
+        monkeypatch.setattr(app, 'COMPACT_RESPONSES_ENABLED', False)
+        assert app.response_encoding() is None
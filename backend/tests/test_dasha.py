@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from dasha import DASHA_LORDS, DASHA_YEARS, MAX_DEPTH, YEAR_SECONDS, VimshottariTimeline
+
+BIRTH = 1069488000.0  # 2003-11-22 08:00 UTC
+
+
+@pytest.fixture
+def timeline():
+    return VimshottariTimeline('Mercury', 0.25, BIRTH)
+
+
+def test_mahadashas(timeline):
+    lords = [period.lord for period in timeline.mahadashas]
+    first = DASHA_LORDS.index('Mercury')
+    assert lords == list(DASHA_LORDS[first:] + DASHA_LORDS[:first])
+    assert timeline.mahadashas[0].start == pytest.approx(BIRTH - 0.25 * 17 * YEAR_SECONDS)
+    assert timeline.balance_years == pytest.approx(0.75 * 17)
+    total = sum(period.length for period in timeline.mahadashas)
+    assert total == pytest.approx(120 * YEAR_SECONDS)
+    for before, after in zip(timeline.mahadashas, timeline.mahadashas[1:]):
+        assert after.start == before.end
+
+
+def test_children_tile_their_parent(timeline):
+    for period in timeline.walk(3):
+        if period.level == 3:
+            continue
+        children = list(period.children())
+        assert [child.lord for child in children][0] == period.lord
+        assert children[0].start == period.start
+        assert children[-1].end == pytest.approx(period.end, abs=1e-3)
+        for before, after in zip(children, children[1:]):
+            assert after.start == pytest.approx(before.end, abs=1e-3)
+
+
+@pytest.mark.parametrize('depth, count', [(0, 9), (1, 9), (2, 9 + 81), (3, 9 + 81 + 729), (99, None)])
+def test_walk_depth(timeline, depth, count):
+    periods = list(timeline.walk(depth))
+    if count is None:
+        assert max(period.level for period in timeline.walk(depth, BIRTH, BIRTH + 1)) == MAX_DEPTH
+    else:
+        assert len(periods) == count
+
+
+def test_walk_is_pre_order(timeline):
+    periods = list(timeline.walk(2))
+    assert [p.level for p in periods[:11]] == [1] + [2] * 9 + [1]
+    assert all(p.lords[:1] == periods[0].lords for p in periods[1:10])
+
+
+def test_walk_window_boundaries(timeline):
+    second = timeline.mahadashas[1]
+    # [start, end) exactly covering the second mahadasha: neighbours that only touch it are left out
+    window = list(timeline.walk(1, second.start, second.end))
+    assert [p.lords for p in window] == [second.lords]
+    # One second either way pulls the neighbour in
+    assert len(list(timeline.walk(1, second.start - 1, second.end))) == 2
+    assert len(list(timeline.walk(1, second.start, second.end + 1))) == 2
+    # Sub-periods outside the window are skipped too
+    inner = list(timeline.walk(2, second.start, second.start + 1))
+    assert [p.lords for p in inner] == [second.lords, second.lords + (second.lord,)]
+
+
+def test_running_at_boundaries(timeline):
+    first, second, last = timeline.mahadashas[0], timeline.mahadashas[1], timeline.mahadashas[-1]
+    assert timeline.running(first.start - 1) == []
+    assert timeline.running(last.end) == []
+    assert timeline.running(first.start, 1)[0].lords == first.lords
+    assert timeline.running(second.start - 1e-3, 1)[0].lords == first.lords
+    assert timeline.running(second.start, 1)[0].lords == second.lords
+    assert timeline.running(last.end - 1, 1)[0].lords == last.lords
+
+
+def test_running_starts_each_sub_period(timeline):
+    for period in timeline.walk(3):
+        chain = timeline.running(period.start, period.level)
+        assert chain[-1].lords == period.lords
+        # just before it, the previous sibling (or the previous parent's last child) runs
+        if period.start > timeline.mahadashas[0].start:
+            assert timeline.running(period.start - 1, period.level)[-1].lords != period.lords
+
+
+def test_running_matches_walk():
+    rng = random.Random(3)
+    for _ in range(200):
+        timeline = VimshottariTimeline(rng.choice(DASHA_LORDS), rng.random(), BIRTH)
+        t = BIRTH + rng.uniform(0, 100) * YEAR_SECONDS
+        chain = timeline.running(t, MAX_DEPTH)
+        walked = list(timeline.walk(MAX_DEPTH, t, t + 1e-6))
+        assert [p.lords for p in chain] == [p.lords for p in walked]
+        assert all(p.start <= t < p.end for p in chain)
+
+
+def test_running_depth_is_clamped(timeline):
+    assert len(timeline.running(BIRTH, 0)) == 1
+    assert len(timeline.running(BIRTH, 99)) == MAX_DEPTH
+
+
+def test_to_dict(timeline):
+    period = timeline.running(BIRTH, 2)[-1]
+    doc = period.to_dict()
+    assert doc['level'] == 2 and doc['level_name'] == 'antardasha'
+    assert doc['lords'] == list(period.lords)
+    assert doc['years'] == pytest.approx(DASHA_YEARS[period.lords[0]] * DASHA_YEARS[period.lord] / 120, abs=1e-6)
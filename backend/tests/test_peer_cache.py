@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+import requests
+
+import app
+import peer_cache
+from peer_cache import HashRing, PeerCache, SingleFlight
+
+NODES = ['http://node-a:5000', 'http://node-b:5000', 'http://node-c:5000']
+KEYS = [f'd1_2000_1_{i % 28 + 1}_{i % 24}_{i % 60}_{i % 90}.0_{i % 180}.0' for i in range(3000)]
+BIRTH = {'year': 2003, 'month': 11, 'date': 22, 'hours': 13, 'minutes': 30, 'seconds': 0,
+         'latitude': 14.82, 'longitude': 74.1359, 'timezone': 5.5}
+
+
+def test_ring_is_deterministic_and_even():
+    ring = HashRing(NODES)
+    owners = Counter(ring.owner(key) for key in KEYS)
+    assert set(owners) == set(NODES)
+    assert all(0.2 < count / len(KEYS) < 0.47 for count in owners.values())
+    assert [HashRing(list(reversed(NODES))).owner(key) for key in KEYS[:100]] == [ring.owner(key) for key in KEYS[:100]]
+
+
+def test_joining_node_only_takes_keys():
+    before = HashRing(NODES)
+    after = HashRing(NODES + ['http://node-d:5000'])
+    moved = [key for key in KEYS if before.owner(key) != after.owner(key)]
+    assert all(after.owner(key) == 'http://node-d:5000' for key in moved)
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+
+
+def test_leaving_node_only_gives_its_keys_away():
+    before = HashRing(NODES)
+    after = HashRing(NODES[:2])
+    assert all(before.owner(key) == NODES[2] for key in KEYS if before.owner(key) != after.owner(key))
+
+
+def run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    coalesced = []
+    flights = SingleFlight(on_coalesced=lambda: coalesced.append(1))
+    calls = []
+
+    def fill():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'svg': '<svg/>'}
+
+    results, errors = run_concurrently(6, lambda: flights.do('k', fill))
+    assert not errors and len(calls) == 1
+    assert len(results) == 6 and all(result is results[0] for result in results)
+    assert len(coalesced) == 5
+    # Once the flight lands, the next call runs again
+    flights.do('k', fill)
+    assert len(calls) == 2
+
+
+def test_single_flight_shares_errors_and_recovers():
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError('upstream down')
+
+    results, errors = run_concurrently(4, lambda: flights.do('k', fail))
+    assert not results and len(errors) == 4
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flights.do('k', lambda: 'ok') == 'ok'
+
+
+def test_single_flight_keys_are_independent():
+    flights = SingleFlight()
+    order = []
+    gate = threading.Event()
+
+    def slow():
+        gate.wait(2)
+        order.append('slow')
+
+    thread = threading.Thread(target=flights.do, args=('a', slow))
+    thread.start()
+    flights.do('b', lambda: order.append('fast'))
+    gate.set()
+    thread.join()
+    assert order == ['fast', 'slow']
+
+
+class Answer:
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+@pytest.fixture
+def peer(monkeypatch):
+    """PeerCache on node-a whose requests.post answers from `peer.answers`"""
+    outcomes = []
+    cache = PeerCache(NODES[0], NODES, retry_after=30, token='t', on_request=lambda o, s: outcomes.append(o))
+    cache.outcomes = outcomes
+    cache.posts = []
+
+    def post(url, json=None, timeout=None, headers=None):
+        cache.posts.append((url, headers))
+        answer = cache.answer
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(peer_cache.requests, 'post', post)
+    cache.remote_key = next(key for key in KEYS if cache.owner(key) != NODES[0])
+    cache.local_key = next(key for key in KEYS if cache.owner(key) == NODES[0])
+    return cache
+
+
+def test_ask_owner(peer):
+    assert peer.ask_owner(peer.local_key, {}) is None and not peer.posts
+    peer.answer = Answer(body={'success': True, 'svg': '<svg/>'})
+    assert peer.ask_owner(peer.remote_key, {}) == {'success': True, 'svg': '<svg/>'}
+    url, headers = peer.posts[0]
+    assert url == f'{peer.owner(peer.remote_key)}/peer/fill' and headers == {'X-Peer-Token': 't'}
+    assert peer.outcomes == ['ok']
+
+
+@pytest.mark.parametrize('answer', [
+    Answer(500, {'success': False}), Answer(body=ValueError('not json')), Answer(body=['x']), Answer(body={'svg': 'x'}),
+])
+def test_failed_answers_fall_back_without_marking_down(peer, answer):
+    peer.answer = answer
+    assert peer.ask_owner(peer.remote_key, {}) is None
+    assert peer.ask_owner(peer.remote_key, {}) is None
+    assert peer.outcomes == ['error', 'error'] and len(peer.posts) == 2
+
+
+def test_unreachable_owner_is_skipped_for_a_while(peer, monkeypatch):
+    peer.answer = requests.ConnectionError('refused')
+    assert peer.ask_owner(peer.remote_key, {}) is None
+    assert peer.ask_owner(peer.remote_key, {}) is None
+    assert peer.outcomes == ['error', 'down'] and len(peer.posts) == 1
+    assert peer.status()['down'] == [peer.owner(peer.remote_key)]
+    later = time.monotonic() + 31
+    monkeypatch.setattr(peer_cache.time, 'monotonic', lambda: later)
+    peer.answer = Answer(body={'success': True, 'output': []})
+    assert peer.ask_owner(peer.remote_key, {}) == {'success': True, 'output': []}
+    assert peer.status()['down'] == []
+
+
+def test_slow_owner_is_not_marked_down(peer):
+    peer.answer = requests.ReadTimeout('slow')
+    assert peer.ask_owner(peer.remote_key, {}) is None
+    assert peer.outcomes == ['timeout'] and peer.status()['down'] == []
+
+
+class OwnerStub:
+    def __init__(self, result):
+        self.result = result
+
+    def ask_owner(self, key, body):
+        return self.result
+
+
+@pytest.fixture
+def cluster(caches, monkeypatch):
+    """app with a stubbed owner answer and a recording local fill"""
+    local = []
+    monkeypatch.setattr(app, 'EPHEMERIS_MODE', 'upstream')
+
+    def upstream_chart_svg(endpoint, data, chart_type, cache_key):
+        local.append(chart_type)
+        app.set_cached_chart(cache_key, '<svg>local</svg>', chart_type)
+        return {'success': True, 'svg': '<svg>local</svg>'}
+
+    def upstream_planetary_data(data, cache_key):
+        local.append('planets')
+        return {'success': True, 'output': [{'local': True}]}
+
+    monkeypatch.setattr(app, 'upstream_chart_svg', upstream_chart_svg)
+    monkeypatch.setattr(app, 'upstream_planetary_data', upstream_planetary_data)
+
+    def answer(result):
+        monkeypatch.setattr(app, 'PEER_CACHE', OwnerStub(result))
+    caches.local_fills = local
+    caches.answer = answer
+    return caches
+
+
+def test_owner_answer_is_stored_with_its_timestamp(cluster):
+    cluster.answer({'success': True, 'svg': '<svg>peer</svg>', 'timestamp': 1700000000})
+    assert cluster.fetch_chart_svg('horoscope-chart-svg-code', BIRTH, chart_type='d1')['svg'] == '<svg>peer</svg>'
+    entry = cluster.CHART_CACHE[cluster.get_cache_key('d1', BIRTH)]
+    assert entry.svg == '<svg>peer</svg>' and entry.timestamp == 1700000000
+    assert cluster.local_fills == []
+
+
+def test_owner_failure_is_passed_on(cluster):
+    cluster.answer({'success': False, 'error': 'All API keys failed'})
+    assert cluster.fetch_chart_svg('horoscope-chart-svg-code', BIRTH, chart_type='d1') == {
+        'success': False, 'error': 'All API keys failed',
+    }
+    assert cluster.local_fills == [] and not cluster.CHART_CACHE
+
+
+@pytest.mark.parametrize('result', [
+    None,
+    {'success': True},
+    {'success': True, 'svg': ['<svg/>']},
+    {'success': True, 'svg': '<svg/>', 'timestamp': 'yesterday'},
+])
+def test_missing_or_malformed_chart_answers_fill_locally(cluster, result):
+    cluster.answer(result)
+    assert cluster.fetch_chart_svg('horoscope-chart-svg-code', BIRTH, chart_type='d1')['svg'] == '<svg>local</svg>'
+    assert cluster.local_fills == ['d1']
+    assert cluster.CHART_CACHE[cluster.get_cache_key('d1', BIRTH)].svg == '<svg>local</svg>'
+
+
+@pytest.mark.parametrize('result, local', [
+    ({'success': True, 'output': [{'peer': True}], 'timestamp': 1700000000.5}, False),
+    ({'success': True, 'output': {'peer': True}}, True),
+    ({'success': True, 'output': [], 'timestamp': [1]}, True),
+])
+def test_planet_answers(cluster, result, local):
+    cluster.answer(result)
+    output = cluster.fetch_planetary_data(BIRTH)['output']
+    assert output == ([{'local': True}] if local else [{'peer': True}])
+    assert cluster.local_fills == (['planets'] if local else [])
+    if not local:
+        assert cluster.PLANET_CACHE[cluster.get_planet_cache_key(BIRTH)].timestamp == 1700000000
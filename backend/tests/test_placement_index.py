@@ -0,0 +1,164 @@
+import random
+
+import pytest
+
+from placement_index import ARRAY_MAX, CompressedBitmap, PlacementIndex
+
+
+def bitmap_of(values):
+    bitmap = CompressedBitmap()
+    for value in values:
+        bitmap.add(value)
+    return bitmap
+
+
+def test_bitmap_matches_a_set():
+    rng = random.Random(5)
+    bitmap, expected = CompressedBitmap(), set()
+    # Enough ids in one chunk to turn it dense and back, plus a few other chunks
+    for _ in range(20000):
+        value = rng.choice((rng.randrange(ARRAY_MAX * 3), rng.randrange(1 << 20)))
+        if rng.random() < 0.3:
+            bitmap.discard(value)
+            expected.discard(value)
+        else:
+            bitmap.add(value)
+            expected.add(value)
+        assert len(bitmap) == len(expected)
+    assert list(bitmap) == sorted(expected)
+    for value in list(expected):
+        bitmap.discard(value)
+    assert len(bitmap) == 0 and list(bitmap) == []
+
+
+@pytest.mark.parametrize('sizes', [(10, 10), (ARRAY_MAX * 2, 50), (ARRAY_MAX * 2, ARRAY_MAX * 3), (5, 5, 5)])
+def test_intersection_matches_sets(sizes):
+    rng = random.Random(sum(sizes))
+    sets = [set(rng.sample(range(ARRAY_MAX * 4), size)) | {70000, 70001} for size in sizes]
+    bitmaps = [bitmap_of(values) for values in sets]
+    before = [list(bitmap) for bitmap in bitmaps]
+    result = CompressedBitmap.intersection(bitmaps)
+    assert list(result) == sorted(set.intersection(*sets))
+    assert len(result) == len(set.intersection(*sets))
+    # The operands are index postings: they must come out untouched
+    result.add(3)
+    assert [list(bitmap) for bitmap in bitmaps] == before
+
+
+def test_intersection_edge_cases():
+    assert list(CompressedBitmap.intersection([])) == []
+    assert list(CompressedBitmap.intersection([bitmap_of([1, 2]), bitmap_of([70000])])) == []
+    single = bitmap_of([4, 9])
+    assert list(CompressedBitmap.intersection([single])) == [4, 9]
+
+
+@pytest.fixture
+def index():
+    index = PlacementIndex()
+    # Aries ascendant: Ju in Cancer is house 4, Mo in Aries house 1
+    index.add('birth-a', 'd1', 1, {'Ju': 4, 'Mo': 1})
+    index.add('birth-b', 'd1', 4, {'Ju': 4, 'Mo': 10})
+    index.add('birth-b', 'd9', 2, {'Ju': 2})
+    return index
+
+
+def test_search(index):
+    assert index.search([('d1', 'Ju', 'sign', 4)]) == (2, ['birth-a', 'birth-b'])
+    assert index.search([('d1', 'Ju', 'house', 4)]) == (1, ['birth-a'])
+    assert index.search([('d1', 'Ju', 'sign', 4), ('d9', 'As', 'sign', 2)]) == (1, ['birth-b'])
+    assert index.search([('d1', 'Ju', 'sign', 4), ('d1', 'Mo', 'sign', 7)]) == (0, [])
+    assert index.search([('d60', 'Ju', 'sign', 4)]) == (0, [])
+
+
+def test_search_limit_keeps_total(index):
+    assert index.search([('d1', 'Ju', 'sign', 4)], limit=1) == (2, ['birth-a'])
+
+
+def test_terms_without_ascendant():
+    assert PlacementIndex.terms('d1', 0, {'Su': 3}) == [('d1', 'Su', 'sign', 3)]
+
+
+def test_replace_drops_old_terms(index):
+    index.add('birth-a', 'd1', 1, {'Ju': 5, 'Mo': 1})
+    assert index.search([('d1', 'Ju', 'sign', 4)]) == (1, ['birth-b'])
+    assert index.search([('d1', 'Ju', 'sign', 5)]) == (1, ['birth-a'])
+    assert index.stats()['documents'] == 3
+    assert len(index) == 2
+
+
+def test_remove_frees_id_after_last_division(index):
+    index.remove('birth-b', 'd1')
+    assert len(index) == 2 and index.stats()['free_ids'] == 0
+    assert index.search([('d9', 'Ju', 'sign', 2)]) == (1, ['birth-b'])
+    index.remove('birth-b', 'd9')
+    index.remove('birth-b', 'd9')  # already gone
+    assert len(index) == 1 and index.stats()['free_ids'] == 1
+    assert index.search([('d9', 'Ju', 'sign', 2)]) == (0, [])
+    # The freed id goes to the next new chart; it must not inherit birth-b's postings
+    index.add('birth-c', 'd1', 7, {'Sa': 7})
+    assert index.stats()['free_ids'] == 0
+    assert index.search([('d1', 'Sa', 'sign', 7)]) == (1, ['birth-c'])
+    assert index.search([('d1', 'Ju', 'sign', 4)]) == (1, ['birth-a'])
+
+
+def test_replacing_a_single_division_keeps_the_chart(index):
+    index.add('birth-a', 'd1', 2, {'Ju': 4})
+    assert len(index) == 2
+    assert index.search([('d1', 'As', 'sign', 2)]) == (1, ['birth-a'])
+
+
+def test_expiry():
+    index = PlacementIndex()
+    index.add('old', 'd1', 1, {'Su': 1}, expires_at=100)
+    index.add('new', 'd1', 1, {'Su': 1}, expires_at=200)
+    index.add('forever', 'd1', 1, {'Su': 1})
+    term = [('d1', 'Su', 'sign', 1)]
+    assert index.search(term, now=99) == (3, ['old', 'new', 'forever'])
+    assert index.search(term, now=100) == (2, ['new', 'forever'])
+    index.expire(now=250)
+    assert index.search(term, now=250) == (1, ['forever'])
+    assert index.stats()['free_ids'] == 2
+
+
+def test_re_adding_extends_expiry():
+    index = PlacementIndex()
+    index.add('chart', 'd1', 1, {'Su': 1}, expires_at=100)
+    index.add('chart', 'd1', 1, {'Su': 1}, expires_at=300)
+    term = [('d1', 'Su', 'sign', 1)]
+    # The row queued for t=100 is stale and must not drop the refreshed chart
+    assert index.search(term, now=150) == (1, ['chart'])
+    assert index.search(term, now=300) == (0, [])
+
+
+def test_expiry_of_a_removed_and_reused_id():
+    index = PlacementIndex()
+    index.add('a', 'd1', 1, {'Su': 1}, expires_at=100)
+    index.remove('a', 'd1')
+    index.add('b', 'd1', 1, {'Su': 1}, expires_at=500)  # reuses a's id
+    assert index.search([('d1', 'Su', 'sign', 1)], now=200) == (1, ['b'])
+
+
+def test_cached_charts_are_indexed_until_they_expire(caches):
+    import app
+    from conftest import read_fixture
+
+    birth = {'year': 2003, 'month': 11, 'date': 22, 'hours': 13, 'minutes': 30, 'latitude': 14.82, 'longitude': 74.1359}
+    key = app.get_cache_key('d1', birth)
+    birth_key, _ = app.split_cache_key(key)
+    svg = read_fixture('horoscope-chart-svg-code.svg')
+    app.set_cached_chart(key, svg, 'd1')
+    ascendant = app.get_chart_positions(key, svg)['ascendant_sign']
+    entry = app.CHART_CACHE[key]
+
+    term = [('d1', 'As', 'sign', ascendant)]
+    assert app.PLACEMENT_INDEX.search(term, now=entry.timestamp) == (1, [birth_key])
+
+    # A replaced chart leaves the index until its new SVG is parsed
+    app.set_cached_chart(key, svg, 'd1')
+    assert app.PLACEMENT_INDEX.search(term, now=entry.timestamp) == (0, [])
+    app.get_chart_positions(key, svg)
+    entry = app.CHART_CACHE[key]
+    assert app.PLACEMENT_INDEX.search(term, now=entry.timestamp) == (1, [birth_key])
+
+    assert app.PLACEMENT_INDEX.search(term, now=entry.timestamp + app.CACHE_EXPIRY_SECONDS) == (0, [])
+    assert app.PLACEMENT_INDEX.stats()['free_ids'] == 1
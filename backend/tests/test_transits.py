@@ -0,0 +1,156 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app
+from transits import TransitService, grid_time, natal_overlay, parse_utc
+
+T0 = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+class Source:
+    """Snapshot source: Moon moving `moon_step` degrees per grid point, Mars 0.5 back"""
+
+    def __init__(self, moon_step=0.6, delay=0.0, failures=0):
+        self.moon_step = moon_step
+        self.delay = delay
+        self.failures = failures
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, when, ayanamsha):
+        with self._lock:
+            self.calls.append((when, ayanamsha))
+            fail = self.failures > 0
+            self.failures -= fail
+        time.sleep(self.delay)
+        if fail:
+            raise RuntimeError('upstream down')
+        hours = (when - T0).total_seconds() / 3600.0
+        return {'Moon': (359.0 + self.moon_step * hours) % 360.0, 'Mars': 100.0 - 0.5 * hours}
+
+
+def test_grid_points_are_exact():
+    service = TransitService(Source())
+    positions = service.positions(T0)
+    assert positions['Moon']['fullDegree'] == 359.0
+    assert positions['Moon']['current_sign'] == 12
+    assert positions['Mars']['normDegree'] == 10.0
+
+
+def test_interpolation_wraps_past_pisces():
+    service = TransitService(Source(moon_step=2.0))
+    moon = service.positions(T0 + timedelta(minutes=30))['Moon']
+    assert moon['fullDegree'] == 0.0 and moon['current_sign'] == 1
+    moon = service.positions(T0 + timedelta(minutes=45))['Moon']
+    assert moon['fullDegree'] == pytest.approx(0.5)
+    assert moon['speed'] == pytest.approx(48.0) and moon['isRetro'] is False
+
+
+def test_retrograde_speed():
+    mars = TransitService(Source()).positions(T0 + timedelta(minutes=20))['Mars']
+    assert mars['fullDegree'] == pytest.approx(100.0 - 0.5 / 3, abs=1e-6)
+    assert mars['speed'] == pytest.approx(-12.0) and mars['isRetro'] is True
+
+
+def test_step_hours():
+    service = TransitService(Source(), step_hours=6.0)
+    moon = service.positions(T0 + timedelta(hours=3))['Moon']
+    assert moon['fullDegree'] == pytest.approx((359.0 + 1.8) % 360.0)
+    assert [when for when, _ in service.source.calls] == [T0, T0 + timedelta(hours=6)]
+
+
+def test_bodies_missing_from_either_snapshot_are_left_out():
+    def source(when, ayanamsha):
+        return {'Sun': 10.0, 'Moon': 20.0} if when == T0 else {'Sun': 11.0}
+    assert list(TransitService(source).positions(T0 + timedelta(minutes=1))) == ['Sun']
+
+
+def test_snapshots_are_shared_and_keyed_by_ayanamsha():
+    source = Source()
+    lookups = []
+    service = TransitService(source, on_lookup=lookups.append)
+    service.positions(T0 + timedelta(minutes=10))
+    service.positions(T0 + timedelta(minutes=50))
+    assert len(source.calls) == 2
+    assert service.has(T0 + timedelta(minutes=5)) and not service.has(T0 + timedelta(hours=1))
+    assert not service.has(T0, ayanamsha='raman')
+    service.positions(T0, ayanamsha='raman')
+    assert [a for _, a in source.calls] == ['lahiri', 'lahiri', 'raman', 'raman']
+    assert lookups == [False, False, True, True, False, False]
+
+
+def test_oldest_snapshots_are_evicted():
+    source = Source()
+    service = TransitService(source, max_snapshots=3)
+    service.warm(T0, 4)
+    assert len(service) == 3
+    assert not service.has(T0) and service.has(T0 + timedelta(hours=3))
+    assert len(source.calls) == 5
+
+
+def test_concurrent_fills_call_the_source_once():
+    source = Source(delay=0.05)
+    service = TransitService(source)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(service.snapshot('lahiri', 10))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(source.calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert service._fill_locks == {}
+
+
+def test_failed_fill_is_retried_and_releases_its_lock():
+    source = Source(failures=1)
+    service = TransitService(source)
+    with pytest.raises(RuntimeError):
+        service.snapshot('lahiri', 0)
+    assert service._fill_locks == {} and len(service) == 0
+    assert set(service.snapshot('lahiri', 0)) == {'Moon', 'Mars'}
+    assert [when for when, _ in source.calls] == [grid_time(0, 1.0)] * 2
+
+
+def test_parse_utc():
+    assert parse_utc('2024-03-01T05:30:00+05:30') == T0
+    assert parse_utc('2024-03-01T00:00:00Z') == T0
+    assert parse_utc('2024-03-01T00:00:00') == T0
+    assert parse_utc(None).tzinfo is timezone.utc
+    with pytest.raises(TypeError):
+        parse_utc(20240301)
+    with pytest.raises(ValueError):
+        parse_utc('yesterday')
+
+
+def test_natal_overlay():
+    transits = {'Saturn': {'current_sign': 11}}
+    natal = {'Ascendant': {'sign': 11}, 'Moon': {'sign': 7}, 'Mars': {'sign': 11}}
+    overlay = natal_overlay(transits, natal)['Saturn']
+    assert overlay['house_from_ascendant'] == 1
+    assert overlay['house_from_moon'] == 5
+    assert overlay['natal_in_sign'] == ['Mars']
+    assert natal_overlay(transits, {})['Saturn']['house_from_moon'] is None
+
+
+def test_ayanamsha_is_checked_and_part_of_the_planet_key():
+    assert app.parse_ayanamsha('LAHIRI') == 'lahiri'
+    for bad in ('tropical-ish', None, ['lahiri']):
+        with pytest.raises(ValueError):
+            app.parse_ayanamsha(bad)
+    birth = {'year': 2024, 'month': 3, 'date': 1, 'hours': 0, 'minutes': 0, 'latitude': 0.0, 'longitude': 0.0}
+    keys = {
+        app.get_planet_cache_key(birth),
+        app.get_planet_cache_key({**birth, 'ayanamsha': 'raman'}),
+        app.get_planet_cache_key({**birth, 'observation_point': 'geocentric'}),
+    }
+    assert len(keys) == 3
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+import app
+from upstream_queue import UpstreamDispatcher, UpstreamQueueTimeout, parse_class_setting
+
+
+class Recorder:
+    """Stand-in for a labelled metric"""
+
+    def __init__(self):
+        self.calls = []
+
+    def inc(self, **labels):
+        self.calls.append(labels)
+
+    def set(self, value, **labels):
+        self.calls.append((value, labels))
+
+    def observe(self, value, **labels):
+        self.calls.append(labels)
+
+
+def dispatcher(total=4, concurrency=None, shares=None, calls_per_minute=0, **kwargs):
+    return UpstreamDispatcher(total, concurrency or {}, shares or {}, calls_per_minute=calls_per_minute, **kwargs)
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out waiting'
+        time.sleep(0.005)
+
+
+def test_parse_class_setting():
+    assert parse_class_setting('interactive=16, bulk=4', int) == {'interactive': 16, 'bulk': 4}
+    assert parse_class_setting('') == {}
+    assert parse_class_setting('prefetch=0.25,junk') == {'prefetch': 0.25}
+
+
+def test_priority_context():
+    queue = dispatcher()
+    assert queue.current_priority() == 'interactive'
+    with queue.priority('prefetch'):
+        with queue.priority('bulk'):
+            assert queue.current_priority() == 'bulk'
+        assert queue.current_priority() == 'prefetch'
+    assert queue.current_priority() == 'interactive'
+    with pytest.raises(ValueError):
+        with queue.priority('urgent'):
+            pass
+
+
+def test_class_concurrency_limit_and_timeout():
+    timeouts = Recorder()
+    queue = dispatcher(concurrency={'bulk': 1}, timeout_counter=timeouts)
+    with queue.slot('bulk'):
+        with pytest.raises(UpstreamQueueTimeout):
+            with queue.slot('bulk', max_wait=0.05):
+                pass
+        # Other classes still have room
+        with queue.slot('interactive', max_wait=0.05):
+            assert queue.snapshot()['interactive']['in_flight'] == 1
+    assert timeouts.calls == [{'priority': 'bulk'}]
+    assert queue.snapshot()['bulk'] == {'waiting': 0, 'in_flight': 0, 'concurrency': 1, 'share': 0.0, 'tokens': None}
+
+
+def test_slot_uses_the_current_class():
+    queue = dispatcher(concurrency={'prefetch': 0})
+    with queue.priority('prefetch'):
+        with pytest.raises(UpstreamQueueTimeout):
+            with queue.slot(max_wait=0.02):
+                pass
+    with queue.slot(max_wait=0.02):
+        pass
+
+
+def test_interactive_is_admitted_before_waiting_lower_classes():
+    queue = dispatcher(total=1)
+    order = []
+
+    def call(name):
+        with queue.slot(name, max_wait=5):
+            order.append(name)
+
+    with queue.slot('bulk'):
+        threads = []
+        for name in ('bulk', 'prefetch', 'interactive'):
+            threads.append(threading.Thread(target=call, args=(name,)))
+            threads[-1].start()
+            wait_for(lambda name=name: queue.snapshot()[name]['waiting'] == 1)
+    for thread in threads:
+        thread.join()
+    assert order == ['interactive', 'prefetch', 'bulk']
+
+
+def test_interactive_borrows_quota_from_lower_classes():
+    # 60 calls/min: interactive gets 0.1/s (one token), bulk 0.9/s (nine)
+    queue = dispatcher(shares={'interactive': 0.1, 'bulk': 0.9}, calls_per_minute=60)
+    with queue.slot('interactive', max_wait=0.05):
+        pass
+    for _ in range(3):
+        with queue.slot('interactive', max_wait=0.05):
+            pass
+    tokens = queue.snapshot()
+    assert tokens['interactive']['tokens'] < 1.0
+    assert 5.9 <= tokens['bulk']['tokens'] < 6.5
+    # Prefetch has no share, so it is not metered at all
+    assert tokens['prefetch']['tokens'] is None
+    for _ in range(20):
+        with queue.slot('prefetch', max_wait=0.05):
+            pass
+
+
+def test_lower_classes_never_borrow():
+    queue = dispatcher(shares={'interactive': 0.9, 'bulk': 0.01}, calls_per_minute=60)
+    with queue.slot('bulk', max_wait=0.05):
+        pass
+    with pytest.raises(UpstreamQueueTimeout):
+        with queue.slot('bulk', max_wait=0.05):
+            pass
+    assert queue.snapshot()['interactive']['tokens'] >= 8.9
+
+
+def test_waiting_for_a_token_admits_when_it_refills():
+    queue = dispatcher(shares={'interactive': 1.0}, calls_per_minute=600)   # 10 tokens/s, capacity 100
+    queue._by_name['interactive'].tokens = 0.0
+    start = time.monotonic()
+    with queue.slot('interactive', max_wait=1.0):
+        pass
+    assert 0.05 <= time.monotonic() - start < 0.5
+
+
+def test_queue_metrics():
+    depth, waits = Recorder(), Recorder()
+    queue = dispatcher(depth_gauge=depth, wait_histogram=waits)
+    with queue.slot('prefetch'):
+        pass
+    assert depth.calls == [(1, {'priority': 'prefetch'}), (0, {'priority': 'prefetch'})]
+    assert waits.calls == [{'priority': 'prefetch'}]
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, 'interactive'), ('bulk', 'bulk'), ('Prefetch', 'prefetch'), ('interactive', 'interactive'), ('vip', 'interactive'),
+])
+def test_priority_header_lasts_one_request(header, expected):
+    flask_app = app.create_app()
+    headers = {app.UPSTREAM_PRIORITY_HEADER: header} if header else {}
+    with flask_app.test_request_context('/health', headers=headers):
+        flask_app.preprocess_request()
+        assert app.UPSTREAM_QUEUE.current_priority() == expected
+        flask_app.do_teardown_request()
+    assert app.UPSTREAM_QUEUE.current_priority() == 'interactive'
@@ -0,0 +1,158 @@
+"""
+Shared transit snapshots for the AstroLearn backend.
+
+Current planetary positions are the same for every user (geocentric, no
+ascendant), so they are computed or fetched once per point of a fixed UTC
+time grid (hourly by default) and shared. Positions at any instant are
+linearly interpolated between the two surrounding grid points; the Moon
+moves ~0.55 deg/hour, which keeps the interpolation error well under an
+arcsecond. Speed and retrograde state come from the same two points.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def _wrap(delta):
+    """Shortest signed difference in degrees, in [-180, 180)"""
+    return (delta + 180.0) % 360.0 - 180.0
+
+
+def grid_time(index, step_hours):
+    return datetime.fromtimestamp(index * step_hours * 3600.0, tz=timezone.utc)
+
+
+def parse_utc(value):
+    """ISO 8601 timestamp -> aware UTC datetime (naive input is taken as UTC); None -> now"""
+    if not value:
+        return datetime.now(timezone.utc)
+    if not isinstance(value, str):
+        raise TypeError(f'expected an ISO 8601 string, got {type(value).__name__}')
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class TransitService:
+    """
+    Grid of {body: sidereal longitude} snapshots keyed by (ayanamsha, grid index).
+
+    `source(when_utc, ayanamsha)` returns the snapshot for one grid point and
+    raises on failure; it is called at most once per grid point while the
+    snapshot stays in memory.
+    """
+
+    def __init__(self, source, step_hours=1.0, max_snapshots=24 * 31, on_lookup=None):
+        self.source = source
+        self.step_hours = step_hours
+        self.max_snapshots = max_snapshots
+        self.on_lookup = on_lookup
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        self._fill_locks = {}
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def grid_index(self, when):
+        return math.floor(when.timestamp() / (self.step_hours * 3600.0))
+
+    def has(self, when, ayanamsha='lahiri'):
+        """True if positions(when) needs no snapshot fill"""
+        index = self.grid_index(when)
+        with self._lock:
+            return (ayanamsha, index) in self._snapshots and (ayanamsha, index + 1) in self._snapshots
+
+    def snapshot(self, ayanamsha, index):
+        key = (ayanamsha, index)
+        with self._lock:
+            cached = self._snapshots.get(key)
+            if cached is None:
+                fill_lock = self._fill_locks.setdefault(key, threading.Lock())
+        if cached is not None:
+            self._record(True)
+            return cached
+
+        # One fill per grid point: concurrent callers wait for the first
+        with fill_lock:
+            with self._lock:
+                cached = self._snapshots.get(key)
+            if cached is not None:
+                self._record(True)
+                return cached
+            self._record(False)
+            try:
+                longitudes = self.source(grid_time(index, self.step_hours), ayanamsha)
+                with self._lock:
+                    self._snapshots[key] = longitudes
+                    while len(self._snapshots) > self.max_snapshots:
+                        self._snapshots.popitem(last=False)
+            finally:
+                # A failed fill must not leave its lock behind; waiters retry the source
+                with self._lock:
+                    self._fill_locks.pop(key, None)
+            return longitudes
+
+    def _record(self, hit):
+        if self.on_lookup is not None:
+            self.on_lookup(hit)
+
+    def warm(self, start, hours, ayanamsha='lahiri'):
+        """Fill every grid point from `start` for the next `hours` hours"""
+        first = self.grid_index(start)
+        for index in range(first, first + int(math.ceil(hours / self.step_hours)) + 1):
+            self.snapshot(ayanamsha, index)
+
+    def positions(self, when, ayanamsha='lahiri'):
+        """
+        {body: {fullDegree, normDegree, current_sign, speed, isRetro}} at `when`.
+        speed is in degrees per day.
+        """
+        index = self.grid_index(when)
+        before = self.snapshot(ayanamsha, index)
+        after = self.snapshot(ayanamsha, index + 1)
+        fraction = when.timestamp() / (self.step_hours * 3600.0) - index
+
+        result = {}
+        for name, start in before.items():
+            if name not in after:
+                continue
+            delta = _wrap(after[name] - start)
+            full_degree = (start + delta * fraction) % 360.0
+            speed = delta * 24.0 / self.step_hours
+            result[name] = {
+                'fullDegree': round(full_degree, 6),
+                'normDegree': round(full_degree % 30.0, 6),
+                'current_sign': int(full_degree // 30.0) + 1,
+                'speed': round(speed, 6),
+                'isRetro': speed < 0,
+            }
+        return result
+
+
+def natal_overlay(transits, natal_planets):
+    """
+    Place transiting bodies against a natal D1 (as built by build_d1_planets):
+    house counted from the natal ascendant and from the natal Moon (gochara),
+    and the natal bodies sharing the transit sign.
+    """
+    asc_sign = natal_planets.get('Ascendant', {}).get('sign', 0)
+    moon_sign = natal_planets.get('Moon', {}).get('sign', 0)
+    natal_by_sign = {}
+    for name, planet in natal_planets.items():
+        if name != 'Ascendant':
+            natal_by_sign.setdefault(planet.get('sign', 0), []).append(name)
+
+    overlay = {}
+    for name, transit in transits.items():
+        sign = transit['current_sign']
+        overlay[name] = {
+            **transit,
+            'house_from_ascendant': ((sign - asc_sign) % 12) + 1 if asc_sign else None,
+            'house_from_moon': ((sign - moon_sign) % 12) + 1 if moon_sign else None,
+            'natal_in_sign': natal_by_sign.get(sign, []),
+        }
+    return overlay
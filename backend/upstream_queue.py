@@ -0,0 +1,217 @@
+"""
+Priority dispatch for upstream (Free Astrology API) calls.
+
+Every upstream HTTP attempt takes a slot from UpstreamDispatcher first.
+Callers belong to one of three classes, highest priority first:
+
+    interactive  app users waiting on a response (default for request threads)
+    prefetch     cache warm-up / refresh and shared transit snapshots
+    bulk         batch jobs such as bulk_import.py
+
+The dispatcher lives in one process: work from another process only yields
+to this one's users if it is sent here (bulk_import.py --server).
+
+Each class has its own concurrency limit and its own share of the per-minute
+call budget. A waiting call is only admitted when no higher class has a call
+that could be admitted right now, and interactive calls may borrow quota
+tokens from the lower classes' buckets. A class with no share is not
+metered. In-flight HTTP calls are never
+aborted; lower classes are pre-empted at every attempt boundary instead
+(each key-rotation retry goes back through the queue).
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from log_config import get_logger
+
+logger = get_logger('upstream')
+
+PRIORITIES = ('interactive', 'prefetch', 'bulk')
+
+_current_priority = contextvars.ContextVar('upstream_priority', default='interactive')
+
+
+class UpstreamQueueTimeout(Exception):
+    """A call waited longer than its class's queue-time budget"""
+
+
+def parse_class_setting(value, cast=float):
+    """'interactive=16,bulk=4' -> {'interactive': 16.0, 'bulk': 4.0}"""
+    result = {}
+    for part in (value or '').split(','):
+        if '=' in part:
+            name, raw = part.split('=', 1)
+            result[name.strip()] = cast(raw)
+    return result
+
+
+class _ClassState:
+    __slots__ = ('name', 'concurrency', 'share', 'max_wait', 'waiting', 'in_flight', 'tokens', 'rate', 'capacity')
+
+    def __init__(self, name, concurrency, share, max_wait, calls_per_minute):
+        self.name = name
+        self.concurrency = concurrency
+        self.share = share
+        self.max_wait = max_wait
+        self.waiting = 0
+        self.in_flight = 0
+        self.rate = max(0.0, share) * calls_per_minute / 60.0  # tokens per second (0 = unmetered)
+        self.capacity = max(1.0, self.rate * 10.0)
+        self.tokens = self.capacity
+
+
+class UpstreamDispatcher:
+    """
+    Admits upstream calls by priority class.
+
+    `concurrency`, `shares` and `max_wait` are dicts keyed by class name;
+    `calls_per_minute` = 0 disables quota metering. Optional metrics
+    (labelled by `priority`) are updated as calls queue, wait and time out.
+    """
+
+    def __init__(self, total_concurrency, concurrency, shares, max_wait=None, calls_per_minute=0,
+                 depth_gauge=None, wait_histogram=None, timeout_counter=None):
+        self.total_concurrency = total_concurrency
+        self.calls_per_minute = calls_per_minute
+        self._classes = [
+            _ClassState(
+                name, int(concurrency.get(name, total_concurrency)), shares.get(name, 0.0),
+                (max_wait or {}).get(name, 0.0), calls_per_minute,
+            )
+            for name in PRIORITIES
+        ]
+        self._by_name = {state.name: state for state in self._classes}
+        if calls_per_minute:
+            unmetered = [state.name for state in self._classes if not state.rate]
+            if unmetered:
+                # A zero-rate bucket would never refill and stall the class for good
+                logger.warning(
+                    "no quota share for %s; these calls are not metered", ', '.join(unmetered),
+                    extra={'event': 'upstream.queue.unmetered'},
+                )
+        self._in_flight = 0
+        self._refilled = time.monotonic()
+        self._cond = threading.Condition()
+        self._depth_gauge = depth_gauge
+        self._wait_histogram = wait_histogram
+        self._timeout_counter = timeout_counter
+
+    @contextmanager
+    def priority(self, name):
+        """Run the enclosed upstream calls in class `name`"""
+        if name not in self._by_name:
+            raise ValueError(f'Unknown priority class: {name}')
+        token = _current_priority.set(name)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+
+    @staticmethod
+    def current_priority():
+        return _current_priority.get()
+
+    @contextmanager
+    def slot(self, name=None, max_wait=None):
+        """Hold one upstream slot for the enclosed call"""
+        state = self._acquire(self._by_name[name or _current_priority.get()], max_wait)
+        try:
+            yield
+        finally:
+            self._release(state)
+
+    # -- bucket/admission helpers, called with self._cond held --
+
+    def _refill(self, now):
+        elapsed = now - self._refilled
+        self._refilled = now
+        for state in self._classes:
+            if state.rate:
+                state.tokens = min(state.capacity, state.tokens + elapsed * state.rate)
+
+    def _token_source(self, state):
+        """Bucket to charge for `state`, or None if no token is available"""
+        if not state.rate or state.tokens >= 1.0:
+            return state
+        if state.name == 'interactive':
+            for lower in reversed(self._classes[1:]):
+                if lower.rate and lower.tokens >= 1.0:
+                    return lower
+        return None
+
+    def _admissible(self, state):
+        return state.in_flight < state.concurrency and self._token_source(state) is not None
+
+    def _try_admit(self, state):
+        if self._in_flight >= self.total_concurrency or state.in_flight >= state.concurrency:
+            return False
+        for higher in self._classes[:PRIORITIES.index(state.name)]:
+            if higher.waiting and self._admissible(higher):
+                return False
+        source = self._token_source(state)
+        if source is None:
+            return False
+        if source.rate:
+            source.tokens -= 1.0
+        return True
+
+    def _seconds_to_token(self, state):
+        if not self.calls_per_minute or state.tokens >= 1.0 or not state.rate:
+            return None
+        return (1.0 - state.tokens) / state.rate
+
+    def _set_depth(self, state):
+        if self._depth_gauge is not None:
+            self._depth_gauge.set(state.waiting, priority=state.name)
+
+    def _acquire(self, state, max_wait):
+        max_wait = state.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        deadline = start + max_wait if max_wait else None
+        with self._cond:
+            state.waiting += 1
+            self._set_depth(state)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._try_admit(state):
+                        break
+                    if deadline is not None and now >= deadline:
+                        if self._timeout_counter is not None:
+                            self._timeout_counter.inc(priority=state.name)
+                        raise UpstreamQueueTimeout(
+                            f'Upstream queue wait exceeded {max_wait:g}s ({state.name})'
+                        )
+                    timeouts = [t for t in (self._seconds_to_token(state), deadline and deadline - now) if t]
+                    self._cond.wait(min(timeouts) if timeouts else None)
+            finally:
+                state.waiting -= 1
+                self._set_depth(state)
+            state.in_flight += 1
+            self._in_flight += 1
+        if self._wait_histogram is not None:
+            self._wait_histogram.observe(time.monotonic() - start, priority=state.name)
+        return state
+
+    def _release(self, state):
+        with self._cond:
+            state.in_flight -= 1
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                state.name: {
+                    'waiting': state.waiting,
+                    'in_flight': state.in_flight,
+                    'concurrency': state.concurrency,
+                    'share': state.share,
+                    'tokens': round(state.tokens, 2) if state.rate else None,
+                }
+                for state in self._classes
+            }
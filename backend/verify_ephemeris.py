@@ -0,0 +1,131 @@
+"""
+Compare the local ephemeris against recorded Free Astrology API /planets responses.
+
+Each file in fixtures/ephemeris/ holds one recorded request/response pair:
+    {"request": <upstream payload>, "response": <upstream /planets body>}
+Pairs are written by `python mock_upstream.py --record` whenever /planets is
+proxied to the live API.
+
+Before the recorded pairs, a few worked examples from Meeus, Astronomical
+Algorithms are checked against the underlying series, so a broken term is
+caught even without a corpus.
+
+Run:
+    python verify_ephemeris.py --tolerance-arcmin 5
+Exits non-zero if a reference example is off, if any body is further off than
+the tolerance or differs from upstream in sign, nakshatra or retrograde flag,
+or if there are no recorded pairs (unless --allow-empty).
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from ephemeris import (
+    compute_planets, mean_obliquity, mean_sidereal_time, moon_position, planet_longitude, sun_position,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'ephemeris')
+NAKSHATRA_SPAN = 360.0 / 27.0
+
+# (label, computed degrees, Meeus's value, tolerance in arcmin)
+REFERENCE_CASES = (
+    ('Sun true longitude, ex. 25.a', lambda: sun_position(2448908.5)[0], 199.90988, 0.1),
+    ('Moon geocentric longitude, ex. 47.a', lambda: moon_position(2448724.5)[0], 133.162655, 0.1),
+    # Meeus's value includes nutation (~0.3'), which the local series omit
+    ('Venus apparent longitude, ex. 33.a', lambda: planet_longitude('Venus', 2448976.5), 313.08102, 1.0),
+    ('Mean sidereal time, ex. 12.a', lambda: mean_sidereal_time(2446895.5), 197.693195, 0.01),
+    ('Mean obliquity, ex. 22.a', lambda: mean_obliquity(2446895.5), 23.440946, 0.01),
+)
+
+
+def planets_by_name(output):
+    """{name: planet dict} from a /planets `output` list"""
+    planets = {}
+    for item in output:
+        for planet in item.values():
+            if isinstance(planet, dict) and 'name' in planet:
+                planets[planet['name']] = planet
+    return planets
+
+
+def angular_error_arcmin(a, b):
+    diff = abs(a - b) % 360.0
+    return min(diff, 360.0 - diff) * 60.0
+
+
+def compare_pair(pair, node_type):
+    """Per-body comparison rows for one recorded pair"""
+    expected = planets_by_name(pair['response'].get('output', []))
+    actual = planets_by_name(compute_planets(pair['request'], node_type=node_type))
+    rows = []
+    for name, ref in expected.items():
+        mine = actual.get(name)
+        if mine is None:
+            continue  # Uranus/Neptune/Pluto are not computed locally
+        ref_deg, my_deg = float(ref['fullDegree']), mine['fullDegree']
+        rows.append({
+            'name': name,
+            'error_arcmin': angular_error_arcmin(ref_deg, my_deg),
+            'sign_match': int(ref_deg // 30) == int(my_deg // 30),
+            'nakshatra_match': int(ref_deg // NAKSHATRA_SPAN) == int(my_deg // NAKSHATRA_SPAN),
+            'retro_match': str(ref.get('isRetro')).lower() == mine['isRetro'],
+        })
+    return rows
+
+
+def check_references():
+    """Failed REFERENCE_CASES as (label, error in arcmin, tolerance)"""
+    failures = []
+    for label, compute, expected, tolerance in REFERENCE_CASES:
+        error = angular_error_arcmin(compute(), expected)
+        if error > tolerance:
+            failures.append((label, error, tolerance))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify the local ephemeris against recorded upstream responses')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--tolerance-arcmin', type=float, default=5.0)
+    parser.add_argument('--node-type', choices=('mean', 'true'), default='mean')
+    parser.add_argument('--allow-empty', action='store_true', help='pass with only the reference checks')
+    args = parser.parse_args(argv)
+
+    reference_failures = check_references()
+    print(f"{len(REFERENCE_CASES)} Meeus reference examples, {len(reference_failures)} failed")
+    for label, error, tolerance in reference_failures:
+        print(f"   FAIL {label}: {error:.3f}' (tolerance {tolerance}')")
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, '*.json')))
+    if not paths:
+        print(f"WARNING: no recorded pairs in {args.fixtures}, the ephemeris was not compared "
+              f"with upstream (record some with mock_upstream.py --record)", file=sys.stderr)
+        return 1 if reference_failures or not args.allow_empty else 0
+
+    per_body = {}
+    failures = []
+    for path in paths:
+        with open(path) as f:
+            pair = json.load(f)
+        for row in compare_pair(pair, args.node_type):
+            per_body.setdefault(row['name'], []).append(row['error_arcmin'])
+            if row['error_arcmin'] > args.tolerance_arcmin or not (
+                    row['sign_match'] and row['nakshatra_match'] and row['retro_match']):
+                failures.append((os.path.basename(path), row))
+
+    print(f"{len(paths)} recorded charts, tolerance {args.tolerance_arcmin}'")
+    print(f"   {'body':<10} {'max':>8} {'mean':>8}")
+    for name, errors in per_body.items():
+        print(f"   {name:<10} {max(errors):>7.2f}' {sum(errors) / len(errors):>7.2f}'")
+    for filename, row in failures:
+        print(f"   FAIL {filename} {row['name']}: {row['error_arcmin']:.2f}' "
+              f"sign_match={row['sign_match']} nakshatra_match={row['nakshatra_match']} "
+              f"retro_match={row['retro_match']}")
+    return 1 if failures or reference_failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
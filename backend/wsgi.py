@@ -0,0 +1,13 @@
+"""
+WSGI entry point for the AstroLearn backend.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the master runs this once before forking, so the lookup
+tables and any CACHE_WARM_FROM snapshot are built a single time and shared
+copy-on-write by the workers.
+"""
+
+from app import create_app
+
+app = create_app(preload=True)